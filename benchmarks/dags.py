@@ -0,0 +1,61 @@
+import random
+
+from uniflow import Uniflow
+from uniflow.decorators.task import Task
+
+FAN_OUT = "fan_out"
+CHAIN = "chain"
+DIAMOND = "diamond"
+RANDOM = "random"
+
+SHAPES = [FAN_OUT, CHAIN, DIAMOND, RANDOM]
+
+
+def _get_fan_out_dependencies(task_count: int, seed: int) -> [[int]]:
+    # One source feeding every other task.
+    return [[]] + [[0] for _ in range(1, task_count)]
+
+
+def _get_chain_dependencies(task_count: int, seed: int) -> [[int]]:
+    return [[index - 1] if index else [] for index in range(task_count)]
+
+
+def _get_diamond_dependencies(task_count: int, seed: int) -> [[int]]:
+    # A source, a wide middle level and a sink gathering it.
+    if task_count < 3:
+        return _get_chain_dependencies(task_count, seed)
+    return [[]] + [[0] for _ in range(1, task_count - 1)] + [list(range(1, task_count - 1))]
+
+
+def _get_random_dependencies(task_count: int, seed: int) -> [[int]]:
+    # Each task depends on up to three earlier tasks, which keeps the graph acyclic.
+    generator = random.Random(seed)
+    return [
+        sorted(generator.sample(range(index), min(index, generator.randint(1, 3)))) if index else []
+        for index in range(task_count)
+    ]
+
+
+_DEPENDENCY_GENERATORS = {
+    FAN_OUT: _get_fan_out_dependencies,
+    CHAIN: _get_chain_dependencies,
+    DIAMOND: _get_diamond_dependencies,
+    RANDOM: _get_random_dependencies
+}
+
+
+def generate_flow_class(shape: str, task_count: int, seed: int = 0) -> type:
+    """
+    Builds a Uniflow subclass of task_count tasks in the given shape. Tasks return the number of their parents, so
+    outputs stay small whatever the shape.
+    """
+    if shape not in _DEPENDENCY_GENERATORS:
+        raise ValueError(f"Unknown shape {shape}, expected one of {SHAPES}.")
+
+    tasks = {}
+    for index, dependencies in enumerate(_DEPENDENCY_GENERATORS[shape](task_count, seed)):
+        def function(*args):
+            return len(args)
+        function.__name__ = f"task_{index}"
+        tasks[function.__name__] = Task(depends_on=[f"task_{dependency}" for dependency in dependencies])(function)
+    return type(f"{shape.title().replace('_', '')}Flow{task_count}", (Uniflow,), tasks)
@@ -0,0 +1,163 @@
+"""
+Orchestration overhead of uniflow on synthetic flows, measured against the local stand-ins of uniflow.local.
+
+    python -m benchmarks.orchestration --shape random --tasks 2000
+
+Prints one JSON object per benchmark and flow shape to stdout, so results can be compared between releases.
+Anything else the benchmarked code prints goes to stderr.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+from .dags import SHAPES, generate_flow_class
+
+# Models read their table from the environment when imported, the tables themselves are in memory.
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("TASK_TABLE", "BenchmarkTaskTable")
+os.environ.setdefault("FLOW_TABLE", "BenchmarkFlowTable")
+
+READ_OPERATIONS = ("GetItem", "Query", "Scan", "BatchGetItem")
+WRITE_OPERATIONS = ("PutItem", "UpdateItem", "DeleteItem", "BatchWriteItem")
+
+
+def count_operations(calls: {str: int}, operations: (str,)) -> int:
+    return sum(calls.get(operation, 0) for operation in operations)
+
+
+def benchmark_task_graph(shape: str, task_count: int, seed: int) -> dict:
+    start = time.perf_counter()
+    flow_class = generate_flow_class(shape, task_count, seed)
+    tasks = flow_class.compile_and_list_tasks()
+    discovered = time.perf_counter()
+
+    from uniflow.core.unigraph import Unigraph
+    task_graph = Unigraph(tasks, fuse=flow_class.fuse_tasks)
+    built = time.perf_counter()
+    return {
+        "benchmark": "task_graph",
+        "task_discovery_seconds": discovered - start,
+        "graph_construction_seconds": built - discovered,
+        "graph_construction_us_per_task": (built - discovered) / task_count * 1e6,
+        "levels": len(task_graph.levels)
+    }
+
+
+def benchmark_flow_start(shape: str, task_count: int, seed: int) -> dict:
+    from uniflow.local.dynamodb import InMemoryTableConnection
+    from uniflow.models.task_model import TaskModel
+
+    task_graph = generate_flow_class(shape, task_count, seed).generate_task_graph()
+    connection = InMemoryTableConnection(TaskModel)
+    previous_connection, TaskModel._connection = TaskModel._connection, connection
+    try:
+        start = time.perf_counter()
+        TaskModel.create_tasks_for_flow("benchmark-flow", task_graph)
+        elapsed = time.perf_counter() - start
+    finally:
+        TaskModel._connection = previous_connection
+    return {
+        "benchmark": "flow_start",
+        "seconds": elapsed,
+        "us_per_task": elapsed / task_count * 1e6,
+        "requests": sum(connection.calls.values()),
+        "requests_per_task": sum(connection.calls.values()) / task_count
+    }
+
+
+def benchmark_status_propagation(shape: str, task_count: int, seed: int) -> dict:
+    """
+    Runs one flow through the stream handlers and the task state machine, tasks themselves do almost nothing.
+    """
+    from uniflow.local.emulator import LocalEmulator
+
+    with LocalEmulator(generate_flow_class(shape, task_count, seed)) as emulator:
+        stats = emulator.run(1)
+        task_calls = dict(emulator.task_table.calls)
+        s3_calls = dict(emulator.s3_client.calls)
+    return {
+        "benchmark": "status_propagation",
+        "completed": stats.completed_flows == 1,
+        "seconds": stats.elapsed_seconds,
+        "transitions_per_second": stats.transitions_per_second,
+        "stream_records_per_task": stats.stream_records / task_count,
+        "executions_per_task": stats.executions / task_count,
+        "task_table_reads_per_task": count_operations(task_calls, READ_OPERATIONS) / task_count,
+        "task_table_writes_per_task": count_operations(task_calls, WRITE_OPERATIONS) / task_count,
+        "datastore_requests_per_task": sum(s3_calls.values()) / task_count,
+        "task_table_calls": task_calls
+    }
+
+
+def get_payloads(payload_bytes: int) -> {str: object}:
+    payloads = {
+        "list": list(range(payload_bytes // 32)),
+        "bytes": os.urandom(payload_bytes)
+    }
+    try:
+        import numpy as np
+    except ImportError:
+        return payloads
+    payloads["ndarray"] = np.arange(payload_bytes // 8, dtype=np.float64)
+    return payloads
+
+
+def benchmark_serialization(payload_bytes: int) -> [dict]:
+    from uniflow.datastore.serializers import serializers
+
+    results = []
+    for name, payload in get_payloads(payload_bytes).items():
+        serializer = serializers.for_object(payload)
+        stream = io.BytesIO()
+        start = time.perf_counter()
+        serializer.dump(payload, stream)
+        dumped = time.perf_counter()
+        size = stream.tell()
+        stream.seek(0)
+        serializer.load(stream)
+        loaded = time.perf_counter()
+        results.append({
+            "benchmark": "serialization",
+            "payload": name,
+            "format": serializer.name,
+            "bytes": size,
+            "dump_mb_per_second": size / (dumped - start) / 1024 ** 2,
+            "load_mb_per_second": size / (loaded - dumped) / 1024 ** 2
+        })
+    return results
+
+
+def main(argv: [str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", nargs="+", choices=SHAPES, default=SHAPES)
+    parser.add_argument("--tasks", nargs="+", type=int, default=[100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--payload-mb", type=int, default=64)
+    parser.add_argument("--skip-propagation", action="store_true", help="Skip running flows through the emulator")
+    args = parser.parse_args(argv)
+
+    # Task logs would dominate the measurements.
+    logging.disable(logging.CRITICAL)
+    benchmarks = [benchmark_task_graph, benchmark_flow_start]
+    if not args.skip_propagation:
+        benchmarks.append(benchmark_status_propagation)
+
+    # Tasks print while they are compiled, stdout only carries results.
+    output = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for shape in args.shape:
+            for task_count in args.tasks:
+                for benchmark in benchmarks:
+                    result = {"shape": shape, "tasks": task_count, **benchmark(shape, task_count, args.seed)}
+                    print(json.dumps(result), file=output, flush=True)
+        for result in benchmark_serialization(args.payload_mb * 1024 ** 2):
+            print(json.dumps(result), file=output, flush=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+from uniflow import Uniflow
+from uniflow.decorators import task
+from uniflow.core.flow_timeline import FlowTimeline
+from uniflow.models.task_model import TaskModel
+
+FLOW_START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+class DiamondFlow(Uniflow):
+
+    @task
+    def a():
+        return 1
+
+    @task(depends_on=["a"])
+    def b(a):
+        return a
+
+    @task(depends_on=["a"])
+    def c(a):
+        return a
+
+    @task(depends_on=["b", "c"])
+    def d(b, c):
+        return b + c
+
+
+def create_task(name: str, claimed: float, started: float, finished: float, completed: float) -> TaskModel:
+    return TaskModel(
+        task_name=name,
+        run_id=f"run-{name}",
+        flow_id="flow-id",
+        created=FLOW_START,
+        status="COMPLETED",
+        claimed=FLOW_START + timedelta(seconds=claimed),
+        started=FLOW_START + timedelta(seconds=started),
+        finished=FLOW_START + timedelta(seconds=finished),
+        status_updated=FLOW_START + timedelta(seconds=completed)
+    )
+
+
+def create_timeline() -> FlowTimeline:
+    tasks = [
+        create_task("a", 0, 1, 3, 3.5),
+        create_task("b", 4, 5, 10, 10.5),
+        create_task("c", 4, 4.5, 6, 6.5),
+        create_task("d", 11, 12, 13, 13.5)
+    ]
+    return FlowTimeline("flow-id", tasks, DiamondFlow.generate_task_graph())
+
+
+def test_critical_path_follows_the_parents_completed_last():
+    report = create_timeline().to_json()
+
+    assert report["wall_seconds"] == 13.5
+    assert report["critical_path"] == ["a", "b", "d"]
+    assert report["critical_path_run_seconds"] == 2 + 5 + 1
+    b = next(task for task in report["tasks"] if task["task"] == "b")
+    assert (b["ready"], b["dispatch_seconds"], b["queue_seconds"], b["completion_seconds"]) == (3.5, 0.5, 1, 0.5)
+
+
+def test_levels_and_idle_gaps():
+    report = create_timeline().to_json()
+
+    assert [level["max_concurrency"] for level in report["levels"]] == [1, 2, 1]
+    assert [(gap["start"], gap["end"], gap["waiting"]) for gap in report["idle_gaps"]] == [
+        (0, 1, ["a"]),
+        (3, 4.5, ["b", "c"]),
+        (10, 12, ["d"]),
+        (13, 13.5, [])
+    ]
+    assert "<table>" in create_timeline().to_html()
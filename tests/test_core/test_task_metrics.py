@@ -0,0 +1,33 @@
+from uniflow.constants import TaskPhase
+from uniflow.core.task_metrics import TaskMetrics
+
+
+def test_repeated_phases_are_summed():
+    metrics = TaskMetrics()
+    with metrics.phase(TaskPhase.DOWNLOAD):
+        pass
+    with metrics.phase(TaskPhase.COMPUTE):
+        pass
+    with metrics.phase(TaskPhase.DOWNLOAD):
+        pass
+    metrics.finish()
+
+    download_seconds = sum(
+        (finished - started).total_seconds() for phase, started, finished in metrics.phases
+        if phase == TaskPhase.DOWNLOAD
+    )
+    assert len(metrics.phases) == 3
+    assert metrics.to_json()["phases"] == metrics.get_phase_seconds()
+    assert set(metrics.get_phase_seconds()) == {"download", "compute"}
+    assert metrics.get_phase_seconds()["download"] == download_seconds
+
+
+def test_phase_raising_is_recorded():
+    metrics = TaskMetrics()
+    try:
+        with metrics.phase(TaskPhase.COMPUTE):
+            raise ValueError("Cannot compute.")
+    except ValueError:
+        pass
+
+    assert [phase for phase, _, _ in metrics.phases] == [TaskPhase.COMPUTE]
@@ -0,0 +1,56 @@
+from uniflow import Uniflow
+from uniflow.decorators import task
+
+
+class BaseFlow(Uniflow):
+
+    @task
+    def a():
+        return 1
+
+    @task(depends_on=["a"])
+    def b(a):
+        return a
+
+
+class LeftFlow(BaseFlow):
+
+    @task(depends_on=["b"])
+    def c(b):
+        return b
+
+
+class RightFlow(BaseFlow):
+
+    @task(depends_on=["a"], compute="lambda")
+    def b(a):
+        return a + 1
+
+    @task(depends_on=["b"])
+    def d(b):
+        return b
+
+
+class CombinedFlow(LeftFlow, RightFlow):
+    pass
+
+
+class DisabledFlow(BaseFlow):
+
+    b = None
+
+
+def test_tasks_of_every_base_are_registered():
+    assert CombinedFlow.list_task_name() == ["a", "b", "d", "c"]
+
+
+def test_overrides_follow_the_method_resolution_order():
+    task_graph = CombinedFlow.generate_task_graph()
+
+    nodes = {node.name: node for node in task_graph.nodes}
+    assert nodes["b"].task.compute == "lambda"
+    assert [child.name for child in nodes["b"].children] == ["d", "c"]
+
+
+def test_task_replaced_by_another_attribute_is_dropped():
+    assert DisabledFlow.list_task_name() == ["a"]
@@ -0,0 +1,96 @@
+import pytest
+
+from uniflow.constants import JobPriority
+from uniflow.core.unigraph import Unigraph, load_task_graph
+from uniflow.decorators.task import Task
+from uniflow.exceptions.errors import TaskDefinitionError
+
+
+def create_tasks(dependencies: {str: [str]}, **kwargs) -> [Task]:
+    tasks = []
+    for name, depends_on in dependencies.items():
+        def function(*args):
+            return None
+        function.__name__ = name
+        tasks.append(Task(depends_on=depends_on, **kwargs)(function))
+    return tasks
+
+
+def test_automatic_priority_follows_slack_off_the_critical_path():
+    # a -> b -> c -> d is the critical path, e can slip by one task and f by two.
+    task_graph = Unigraph(create_tasks({
+        "a": [],
+        "b": ["a"],
+        "c": ["b"],
+        "d": ["c", "e", "f"],
+        "e": ["a"],
+        "f": []
+    }, priority="auto"))
+
+    priorities = {node.name: node.priority for node in task_graph.nodes}
+    assert priorities == {
+        "a": JobPriority.HIGH,
+        "b": JobPriority.HIGH,
+        "c": JobPriority.HIGH,
+        "d": JobPriority.HIGH,
+        "e": JobPriority.MEDIUM,
+        "f": JobPriority.LOW
+    }
+
+
+def test_explicit_priority_is_kept():
+    tasks = create_tasks({"a": []}, priority="auto") + create_tasks({"b": ["a"]}, priority="low")
+    task_graph = Unigraph(tasks)
+
+    assert {node.name: node.priority for node in task_graph.nodes} == {"a": JobPriority.HIGH, "b": JobPriority.LOW}
+
+
+def test_cycle_is_reported_as_a_path_with_the_tasks_it_blocks():
+    tasks = create_tasks({"s": [], "a": ["c"], "b": ["a", "s"], "c": ["b"], "d": ["c"]})
+
+    with pytest.raises(Exception) as error:
+        Unigraph(tasks)
+
+    assert str(error.value) == "Found cycle b -> c -> a -> b, tasks blocked by it: a, b, c, d"
+
+
+def test_task_cannot_depend_on_itself():
+    with pytest.raises(TaskDefinitionError):
+        create_tasks({"a": ["a"]})
+
+
+def test_order_is_deterministic():
+    dependencies = {"e": [], "a": [], "d": ["a", "e"], "c": ["e"], "b": ["d"]}
+    orders = [[node.name for node in Unigraph(create_tasks(dependencies)).topological_order] for _ in range(3)]
+
+    # Sources in declaration order, then every task once its last parent is ordered.
+    assert orders == [["e", "a", "c", "d", "b"]] * 3
+    assert [[node.name for node in level] for level in Unigraph(create_tasks(dependencies)).levels] == [
+        ["e", "a"], ["c", "d"], ["b"]
+    ]
+
+
+def test_dumped_graph_loads_with_the_same_order_depths_and_fusion(tmp_path):
+    tasks = create_tasks({"a": [], "b": ["a"], "c": ["b"], "d": ["a"], "e": ["c", "d"]}, priority="auto", fuse=True)
+    task_graph = Unigraph(tasks)
+    path = tmp_path.joinpath("task_graph.json")
+    task_graph.dump(path)
+
+    loaded = Unigraph.load(path)
+
+    assert [node.to_json() for node in loaded.topological_order] == [
+        node.to_json() for node in task_graph.topological_order
+    ]
+    assert [[node.name for node in level] for level in loaded.levels] == [
+        [node.name for node in level] for level in task_graph.levels
+    ]
+    assert [[node.name for node in chain] for chain in loaded.fused_chains] == [["b", "c"]]
+    assert load_task_graph(path.as_posix()) is load_task_graph(path.as_posix())
+
+
+def test_cached_tasks_are_not_fused():
+    tasks = create_tasks({"a": [], "b": ["a"]}) + create_tasks({"c": ["b"]}, cache=True) + create_tasks({"d": ["c"]})
+
+    task_graph = Unigraph(tasks, fuse=True)
+
+    assert [[node.name for node in chain] for chain in task_graph.fused_chains] == [["a", "b"]]
@@ -0,0 +1,74 @@
+import multiprocessing
+import time
+
+from uniflow.datastore.local_cache import LocalObjectCache
+
+KEY_COUNT = 8
+OBJECT_SIZE = 64 * 1024
+
+
+def get_payload(key: str) -> bytes:
+    return key.encode().ljust(OBJECT_SIZE, b".")
+
+
+def read_objects(directory: str, seed: int, errors) -> None:
+    # Room for two objects, every miss evicts the entries other processes are reading.
+    cache = LocalObjectCache(directory, 2 * OBJECT_SIZE)
+    try:
+        for index in range(50):
+            key = f"key-{(seed + index) % KEY_COUNT}"
+            with cache.fetch(key, "etag", OBJECT_SIZE, lambda file: file.write(get_payload(key))) as path:
+                time.sleep(0.001)
+                if path.read_bytes() != get_payload(key):
+                    errors.put(f"{key} has unexpected content")
+    except Exception as error:
+        errors.put(repr(error))
+
+
+def test_entries_are_not_evicted_while_other_processes_read_them(tmp_path):
+    context = multiprocessing.get_context("fork")
+    errors = context.Queue()
+    processes = [context.Process(target=read_objects, args=(str(tmp_path), seed, errors)) for seed in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    assert errors.empty(), errors.get()
+
+
+class SingleStripeCache(LocalObjectCache):
+
+    LOCK_STRIPES = 1
+
+
+def download_slowly(directory: str, started) -> None:
+    def download(file):
+        started.set()
+        time.sleep(2)
+        file.write(b"slow")
+
+    with SingleStripeCache(directory, 1024).fetch("slow", "etag", 4, download):
+        pass
+
+
+def test_downloads_do_not_block_readers_of_other_entries(tmp_path):
+    cache = SingleStripeCache(str(tmp_path), 1024)
+    with cache.fetch("fast", "etag", 4, lambda file: file.write(b"fast")):
+        pass
+
+    context = multiprocessing.get_context("fork")
+    started = context.Event()
+    process = context.Process(target=download_slowly, args=(str(tmp_path), started))
+    process.start()
+    try:
+        assert started.wait(timeout=10)
+        start = time.perf_counter()
+        with cache.fetch("fast", "etag", 4, lambda file: file.write(b"fast")) as path:
+            assert path.read_bytes() == b"fast"
+        assert time.perf_counter() - start < 1
+        assert cache.hits == 1
+    finally:
+        process.join(timeout=10)
+    assert process.exitcode == 0
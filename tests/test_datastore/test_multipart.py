@@ -0,0 +1,63 @@
+import os
+import pytest
+import numpy as np
+
+from uniflow.datastore.multipart import MultipartUploadWriter
+from uniflow.datastore.serializers import serializers, FORMAT_METADATA_KEY
+from uniflow.datastore.streams import open_streaming_body
+from uniflow.local.s3 import InMemoryS3Client
+
+PART_SIZE = MultipartUploadWriter.MIN_PART_SIZE
+
+
+def test_small_object_is_sent_in_a_single_put():
+    client = InMemoryS3Client()
+    with MultipartUploadWriter(client, "bucket", "key", PART_SIZE, 2) as writer:
+        writer.write(b"hello")
+
+    assert client.get_object(Bucket="bucket", Key="key")['Body'].read() == b"hello"
+    assert client.calls.get('CreateMultipartUpload') is None
+
+
+def test_large_object_is_uploaded_in_parts():
+    client = InMemoryS3Client()
+    payload = os.urandom(2 * PART_SIZE + 123)
+    with MultipartUploadWriter(client, "bucket", "key", PART_SIZE, 2, metadata={"a": "b"}) as writer:
+        writer.write(payload[:10])
+        writer.write(payload[10:])
+
+    response = client.get_object(Bucket="bucket", Key="key")
+    assert response['Body'].read() == payload
+    assert response['Metadata'] == {"a": "b"}
+    assert response['ETag'].endswith('-3"')
+    assert client.calls['UploadPart'] == 3
+    assert client.open_uploads == 0
+
+
+def test_failed_upload_is_aborted():
+    client = InMemoryS3Client()
+    with pytest.raises(RuntimeError):
+        with MultipartUploadWriter(client, "bucket", "key", PART_SIZE, 2) as writer:
+            writer.write(os.urandom(PART_SIZE + 1))
+            raise RuntimeError("task failed")
+
+    assert client.calls['AbortMultipartUpload'] == 1
+    assert client.open_uploads == 0
+    assert client.list_objects_v2(Bucket="bucket")['KeyCount'] == 0
+
+
+def test_serialized_array_round_trip():
+    client = InMemoryS3Client()
+    array = np.random.rand(1024, 1024)
+    serializer = serializers.for_object(array)
+    with MultipartUploadWriter(client, "bucket", "key", PART_SIZE, 4,
+                               metadata={FORMAT_METADATA_KEY: serializer.name}) as writer:
+        serializer.dump(array, writer)
+
+    response = client.get_object(Bucket="bucket", Key="key")
+    with open_streaming_body(response['Body']) as stream:
+        loaded = serializers.for_format(response['Metadata'][FORMAT_METADATA_KEY]).load(stream)
+
+    assert serializer.name == "npy"
+    assert client.calls['UploadPart'] == 2
+    np.testing.assert_array_equal(loaded, array)
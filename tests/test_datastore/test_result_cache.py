@@ -0,0 +1,59 @@
+import os
+
+from uniflow.datastore.multipart import MultipartUploadWriter
+from uniflow.datastore.result_cache import ResultCache
+from uniflow.local.s3 import InMemoryS3Client
+
+PART_SIZE = MultipartUploadWriter.MIN_PART_SIZE
+
+
+def upload(client, key, payload, part_size):
+    with MultipartUploadWriter(client, "bucket", key, part_size, 2) as writer:
+        writer.write(payload)
+    return writer.sha256
+
+
+def create_cache(client, max_age=60, eviction_probability=0.0):
+    return ResultCache(client, "bucket", "flow/cache/task", 1024 ** 3, max_age, eviction_probability)
+
+
+def test_digest_does_not_depend_on_part_size():
+    client = InMemoryS3Client()
+    payload = os.urandom(3 * PART_SIZE)
+    first = upload(client, "first", payload, PART_SIZE)
+    second = upload(client, "second", payload, 2 * PART_SIZE)
+
+    etags = [client.head_object(Bucket="bucket", Key=key)['ETag'] for key in ("first", "second")]
+    assert etags[0] != etags[1]
+    assert first == second
+
+
+def test_hit_returns_the_metadata_of_the_entry():
+    client = InMemoryS3Client()
+    client.put_object(Bucket="bucket", Key="output", Body=b"result")
+    cache = create_cache(client)
+    metadata = {ResultCache.DIGEST_METADATA_KEY: "digest", ResultCache.OUTPUT_LENGTH_METADATA_KEY: "3"}
+
+    assert cache.link("fingerprint", "linked") is None
+    cache.put("fingerprint", "output", metadata)
+
+    assert cache.link("fingerprint", "linked") == metadata
+    assert client.get_object(Bucket="bucket", Key="linked")['Body'].read() == b"result"
+
+
+def test_expired_entry_is_a_miss_before_it_is_evicted():
+    client = InMemoryS3Client()
+    client.put_object(Bucket="bucket", Key="output", Body=b"result")
+    create_cache(client).put("fingerprint", "output", {ResultCache.DIGEST_METADATA_KEY: "digest"})
+
+    assert create_cache(client, max_age=-1).link("fingerprint", "linked") is None
+
+
+def test_eviction_runs_with_its_probability():
+    client = InMemoryS3Client()
+    client.put_object(Bucket="bucket", Key="output", Body=b"result")
+    create_cache(client).put("fingerprint", "output", {ResultCache.DIGEST_METADATA_KEY: "digest"})
+    assert client.calls.get('ListObjectsV2') is None
+
+    create_cache(client, eviction_probability=1.0).put("fingerprint", "output", {ResultCache.DIGEST_METADATA_KEY: "d"})
+    assert client.calls['ListObjectsV2'] == 1
@@ -0,0 +1,68 @@
+import io
+import pytest
+import numpy as np
+
+from uniflow.datastore.serializers import serializers, NumpySerializer, PickleSerializer
+
+
+def round_trip(obj):
+    serializer = serializers.for_object(obj)
+    stream = io.BytesIO()
+    serializer.dump(obj, stream)
+    stream.seek(0)
+    return serializer, serializers.for_format(serializer.name).load(stream)
+
+
+def test_ndarray_round_trips_as_npy():
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    serializer, loaded = round_trip(array)
+
+    assert isinstance(serializer, NumpySerializer)
+    assert loaded.dtype == array.dtype
+    assert np.array_equal(loaded, array)
+
+
+def test_fortran_ordered_array_keeps_its_layout():
+    array = np.asfortranarray(np.arange(12).reshape(3, 4))
+    _, loaded = round_trip(array)
+
+    assert loaded.flags.f_contiguous
+    assert np.array_equal(loaded, array)
+
+
+@pytest.mark.parametrize("array", [
+    np.arange("2020-01-01", "2020-01-10", dtype="datetime64[D]").reshape(3, 3),
+    np.array([1, -2, 3], dtype="timedelta64[ms]"),
+])
+def test_datetime_arrays_round_trip_as_npy(array):
+    serializer, loaded = round_trip(array)
+
+    assert isinstance(serializer, NumpySerializer)
+    assert loaded.dtype == array.dtype
+    assert np.array_equal(loaded, array)
+
+
+def test_masked_array_keeps_its_mask():
+    array = np.ma.masked_array([1, 2, 3], mask=[False, True, False])
+    serializer, loaded = round_trip(array)
+
+    assert isinstance(serializer, PickleSerializer)
+    assert isinstance(loaded, np.ma.MaskedArray)
+    assert loaded.mask.tolist() == [False, True, False]
+
+
+def test_object_array_is_pickled():
+    array = np.array([{"a": 1}, None, "b"], dtype=object)
+    serializer, loaded = round_trip(array)
+
+    assert isinstance(serializer, PickleSerializer)
+    assert loaded.tolist() == array.tolist()
+
+
+def test_unknown_npy_version_is_rejected():
+    stream = io.BytesIO()
+    np.lib.format.write_array(stream, np.arange(3), version=(3, 0))
+    stream.seek(0)
+
+    with pytest.raises(Exception, match="Unsupported npy format version"):
+        NumpySerializer().load(stream)
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import pytest
+
+from pathlib import Path
+
+REPO_DIRECTORY = Path(__file__).parents[2]
+
+# Imported by the handlers of every Lambda, cold starts pay for everything imported here.
+HANDLER_MODULES = [
+    "uniflow.models.task_model",
+    "uniflow.lambda_handlers.task_table_event_handler",
+    "uniflow.lambda_handlers.flow_table_event_handler",
+    "uniflow.lambda_handlers.task_executor_handler"
+]
+
+# Only needed once a handler reaches AWS or runs a task, not to import it.
+LAZY_MODULES = [
+    "boto3",
+    "numpy",
+    "logging.config",
+    "uniflow.core.uniflow",
+    "uniflow.core.task_manager"
+]
+
+# Self time of the uniflow modules, 2 to 4 ms today. Twice the slowest handler, so noise passes and regressions fail.
+UNIFLOW_IMPORT_BUDGET_US = 10000
+
+
+def get_import_times(module: str, environment: dict) -> {str: int}:
+    """
+    Imports the module in a fresh interpreter with -X importtime, returns the self time of each imported module in
+    microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=environment,
+        cwd=REPO_DIRECTORY,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        import_times[name.strip()] = int(self_time)
+    return import_times
+
+
+@pytest.fixture(scope="module")
+def environment(tmp_path_factory):
+    from uniflow.core.unigraph import Unigraph
+
+    task_graph = tmp_path_factory.mktemp("task_graph").joinpath("task_graph.json")
+    Unigraph([]).dump(task_graph)
+    return {
+        **os.environ,
+        "PYTHONPATH": REPO_DIRECTORY.as_posix(),
+        "AWS_REGION": "us-east-1",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "TASK_TABLE": "TaskTable",
+        "FLOW_TABLE": "FlowTable",
+        "FLOW_TASK_GRAPH": task_graph.as_posix(),
+        "TASK_EXECUTATION_STATE_MACHINE_ARN": "arn:aws:states:us-east-1:123456789012:stateMachine:Flow"
+    }
+
+
+@pytest.mark.parametrize("module", HANDLER_MODULES)
+def test_handler_imports_stay_lazy(module, environment):
+    import_times = get_import_times(module, environment)
+
+    assert module in import_times
+    assert [name for name in LAZY_MODULES if name in import_times] == []
+    assert sum(time for name, time in import_times.items() if name.startswith("uniflow")) < UNIFLOW_IMPORT_BUDGET_US
@@ -0,0 +1,7 @@
+import os
+
+# Table names, region and state machine are read from the environment when the handlers are imported.
+os.environ.setdefault("TASK_TABLE", "TaskTable")
+os.environ.setdefault("FLOW_TABLE", "FlowTable")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("TASK_EXECUTATION_STATE_MACHINE_ARN", "arn:aws:states:us-east-1:000000000000:stateMachine:Tasks")
@@ -0,0 +1,50 @@
+import threading
+
+from uniflow.lambda_handlers.dynamodb_table_event_handler import DynamodbTableEventHandler
+
+
+def create_record(sequence_number: int, task_name: str, run_id: str) -> dict:
+    return {
+        'eventID': str(sequence_number),
+        'eventName': 'MODIFY',
+        'dynamodb': {
+            'Keys': {'TaskName': {'S': task_name}, 'RunId': {'S': run_id}},
+            'SequenceNumber': str(sequence_number)
+        }
+    }
+
+
+class RecordingHandler(DynamodbTableEventHandler):
+
+    def __init__(self, event: dict, failing: {str}) -> None:
+        super().__init__(event, None)
+        self.__failing = failing
+        self.__lock = threading.Lock()
+        self.processed = []
+
+    def process_record(self, record: dict) -> None:
+        if record['eventID'] in self.__failing:
+            raise Exception("Failed to process record.")
+        with self.__lock:
+            self.processed.append(record['eventID'])
+
+
+def test_records_are_processed_in_order_per_item():
+    records = [create_record(index, f"task_{index % 3}", "run") for index in range(12)]
+    handler = RecordingHandler({'Records': records}, failing=set())
+
+    assert handler.execute() == {'batchItemFailures': []}
+    assert sorted(handler.processed, key=int) == [record['eventID'] for record in records]
+    for task_index in range(3):
+        item_events = [event_id for event_id in handler.processed if int(event_id) % 3 == task_index]
+        assert item_events == sorted(item_events, key=int)
+
+
+def test_failed_record_stops_its_item_only():
+    records = [create_record(index, f"task_{index % 2}", "run") for index in range(6)]
+    handler = RecordingHandler({'Records': records}, failing={'2'})
+
+    response = handler.execute()
+
+    assert response == {'batchItemFailures': [{'itemIdentifier': '2'}]}
+    assert sorted(handler.processed, key=int) == ['0', '1', '3', '5']
@@ -0,0 +1,122 @@
+import pytest
+
+from botocore.exceptions import ClientError
+
+from uniflow import Uniflow
+from uniflow.clients import set_client
+from uniflow.constants import TaskStatus
+from uniflow.decorators import task
+from uniflow.lambda_handlers.task_record_handler import TaskRecordHandler
+from uniflow.local.dynamodb import InMemoryTableConnection
+from uniflow.models.task_model import TaskModel
+
+
+class JoinFlow(Uniflow):
+
+    @task
+    def left():
+        return 1
+
+    @task
+    def right():
+        return 2
+
+    @task(depends_on=["left", "right"])
+    def join(left, right):
+        return left + right
+
+
+class FusedFlow(Uniflow):
+
+    fuse_tasks = True
+
+    @task
+    def first():
+        return 1
+
+    @task(depends_on=["first"])
+    def second(first):
+        return first
+
+
+class StepFunctionsClient(object):
+
+    def __init__(self, failures: int = 0) -> None:
+        self.__failures = failures
+        self.started = []
+
+    def start_execution(self, stateMachineArn: str, name: str, input: str) -> dict:
+        if self.__failures:
+            self.__failures -= 1
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, 'StartExecution')
+        self.started.append(name.split("_")[0])
+        return {}
+
+
+@pytest.fixture
+def table():
+    connection = InMemoryTableConnection(TaskModel)
+    TaskModel._connection = connection
+    yield connection
+    TaskModel._connection = None
+
+
+def create_tasks(flow_class: type) -> {str: TaskModel}:
+    return {
+        task.task_name: task for task in TaskModel.create_tasks_for_flow("flow-id", flow_class.generate_task_graph())
+    }
+
+
+def complete(table, task: TaskModel) -> None:
+    task.update_task_status(TaskStatus.COMPLETED)
+    item = next(item for item in table.items if item['RunId']['S'] == task.run_id)
+    record = {
+        'eventName': 'MODIFY',
+        'dynamodb': {'NewImage': item, 'OldImage': {**item, 'Status': {'S': TaskStatus.PROGRESS.name}}}
+    }
+    TaskRecordHandler(record).process()
+
+
+def test_child_is_started_once_its_last_parent_completes(table):
+    client = StepFunctionsClient()
+    set_client('stepfunctions', client)
+    try:
+        tasks = create_tasks(JoinFlow)
+        complete(table, tasks["left"])
+        assert client.started == []
+        # The status update and the count, join is not claimed while right is pending.
+        assert table.calls['UpdateItem'] == 2
+
+        complete(table, tasks["right"])
+        complete(table, tasks["right"])
+        assert client.started == ["join"]
+    finally:
+        set_client('stepfunctions', None)
+
+
+def test_redelivered_completion_starts_a_child_that_failed_to_start(table):
+    client = StepFunctionsClient(failures=1)
+    set_client('stepfunctions', client)
+    try:
+        tasks = create_tasks(JoinFlow)
+        complete(table, tasks["left"])
+        with pytest.raises(ClientError):
+            complete(table, tasks["right"])
+
+        complete(table, tasks["right"])
+        assert client.started == ["join"]
+    finally:
+        set_client('stepfunctions', None)
+
+
+def test_fused_child_is_never_started(table):
+    client = StepFunctionsClient()
+    set_client('stepfunctions', client)
+    try:
+        tasks = create_tasks(FusedFlow)
+        complete(table, tasks["first"])
+        complete(table, tasks["first"])
+        assert client.started == []
+        assert TaskModel.get("second", tasks["second"].run_id).status == TaskStatus.CREATED.name
+    finally:
+        set_client('stepfunctions', None)
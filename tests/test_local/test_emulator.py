@@ -0,0 +1,307 @@
+import json
+import logging
+import pickle
+import pytest
+
+from uniflow import Uniflow
+from uniflow.decorators import task
+from uniflow.local.emulator import LocalEmulator
+
+FLOW_COUNT = 5
+
+
+class ShardedFlow(Uniflow):
+
+    @task
+    def load():
+        return [1, 2, 3, 4]
+
+    @task(depends_on=["load"], map_over="load")
+    def square(item):
+        return item * item
+
+    @task(compute="lambda", depends_on=["load"])
+    def count(loaded):
+        return len(loaded)
+
+    @task(depends_on=["square", "count"])
+    def mean(squared, counted):
+        return sum(squared) / counted
+
+
+class ProfiledFlow(Uniflow):
+
+    @task(profile="cpu")
+    def load():
+        return sorted(range(1000), reverse=True)
+
+    @task(depends_on=["load"], profile="memory")
+    def total(loaded):
+        return sum(loaded)
+
+
+class CachedFlow(Uniflow):
+
+    @task(cache=True)
+    def load():
+        return list(range(30))
+
+    @task(depends_on=["load"], map_over="load")
+    def double(item):
+        return 2 * item
+
+    @task(depends_on=["double"], cache=True)
+    def total(doubled):
+        return sum(doubled)
+
+
+class UnsizedMapFlow(Uniflow):
+
+    @task
+    def load():
+        return 3
+
+    @task(depends_on=["load"], map_over="load")
+    def double(item):
+        return 2 * item
+
+
+class PayloadMapFlow(Uniflow):
+
+    @task
+    def load():
+        return [bytes(10000) for _ in range(4)]
+
+    @task(depends_on=["load"], map_over="load")
+    def size(item):
+        return len(item)
+
+    @task(depends_on=["load", "size"])
+    def total(loaded, sizes):
+        return len(loaded), sum(sizes)
+
+
+class FusedFlow(Uniflow):
+    fuse_tasks = True
+
+    @task
+    def load():
+        return [1, 2, 3]
+
+    @task(depends_on=["load"])
+    def double(loaded):
+        return [2 * value for value in loaded]
+
+    @task(depends_on=["double"])
+    def total(doubled):
+        return sum(doubled)
+
+
+class FailingFusedFlow(Uniflow):
+    fuse_tasks = True
+
+    @task
+    def load():
+        return [1, 2, 3]
+
+    @task(depends_on=["load"])
+    def double(loaded):
+        raise ValueError("Cannot double.")
+
+    @task(depends_on=["double"])
+    def total(doubled):
+        return sum(doubled)
+
+
+class DictMapFlow(Uniflow):
+
+    @task
+    def load():
+        return {"a": 1, "b": 2}
+
+    @task(depends_on=["load"], map_over="load")
+    def double(item):
+        return 2 * item
+
+
+class FailingFlow(Uniflow):
+
+    @task
+    def load():
+        raise ValueError("Cannot load.")
+
+    @task(depends_on=["load"])
+    def report(loaded):
+        return loaded
+
+
+def test_flows_run_through_stream_handlers_and_state_machine():
+    with LocalEmulator(ShardedFlow, max_workers=4, stream_batch_size=7) as emulator:
+        stats = emulator.run(FLOW_COUNT)
+        results = [
+            key for key in emulator.s3_client.list_objects_v2(Bucket=LocalEmulator.DATASTORE)['Contents']
+            if "/mean/" in key['Key'] and key['Key'].endswith("/result")
+        ]
+
+    assert stats.completed_flows == FLOW_COUNT
+    assert stats.failed_flows == 0
+    # Every task is inserted as CREATED, then claimed and completed.
+    assert stats.transitions == stats.tasks * 3
+    assert stats.executions == stats.tasks
+    assert len(results) == FLOW_COUNT
+
+
+def test_failed_task_fails_its_flow():
+    with LocalEmulator(FailingFlow) as emulator:
+        stats = emulator.run(2)
+
+    assert stats.completed_flows == 0
+    assert stats.failed_flows == 2
+    assert stats.executions == 2
+
+
+def test_metrics_of_failed_tasks_are_recorded():
+    with LocalEmulator(FailingFlow) as emulator:
+        emulator.run(1)
+        flow_id, = [item['FlowId']['S'] for item in emulator.flow_table.items]
+        from uniflow.cli.stats import get_flow_stats
+        stats = {task_stats["task"]: task_stats for task_stats in get_flow_stats(flow_id)}
+
+    assert stats["load"]["run_s"] is not None
+    assert stats["load"]["compute_s"] is not None
+    assert stats["report"]["run_s"] is None
+
+
+@pytest.mark.parametrize("flow_class, output_type", [(UnsizedMapFlow, "int"), (DictMapFlow, "dict")])
+def test_mapped_over_task_must_return_a_sized_sequence(caplog, flow_class, output_type):
+    with LocalEmulator(flow_class) as emulator:
+        stats = emulator.run(1)
+
+    assert stats.failed_flows == 1
+    assert stats.executions == 1
+    errors = [record.exc_info[1] for record in caplog.records if record.exc_info]
+    assert [type(error) for error in errors] == [TypeError]
+    assert f"load is mapped over and must return a sized sequence, got {output_type}" in str(errors[0])
+
+
+def test_task_metrics_are_recorded():
+    with LocalEmulator(ShardedFlow) as emulator:
+        emulator.run(1)
+        flow_id, = [item['FlowId']['S'] for item in emulator.flow_table.items]
+        from uniflow.cli.stats import get_flow_stats
+        stats = {task_stats["task"]: task_stats for task_stats in get_flow_stats(flow_id)}
+
+    assert set(stats) == {"load", "square", "count", "mean"}
+    assert stats["load"]["read_mb"] == 0
+    assert stats["load"]["written_mb"] > 0
+    assert stats["mean"]["read_mb"] > 0
+    assert stats["mean"]["queue_s"] >= 0
+    assert stats["mean"]["run_s"] >= stats["mean"]["download_s"] + stats["mean"]["compute_s"]
+    # Shards of a map task only log their metrics.
+    assert stats["square"]["run_s"] is None
+
+
+def test_shards_read_only_their_item(caplog):
+    caplog.set_level(logging.INFO)
+    with LocalEmulator(PayloadMapFlow) as emulator:
+        stats = emulator.run(1)
+        objects = emulator.s3_client.list_objects_v2(Bucket=LocalEmulator.DATASTORE)['Contents']
+        sizes = {
+            key['Key']: key['Size'] for key in objects if "/load/" in key['Key'] and key['Key'].endswith("/result")
+        }
+    metrics = [json.loads(record.message) for record in caplog.records if '"event": "task_metrics"' in record.message]
+    shard_bytes_read = {
+        task_metrics["shard_index"]: task_metrics["parent_bytes_read"] for task_metrics in metrics
+        if task_metrics["task"] == "size"
+    }
+    item_sizes = {int(key.split("/")[-2]): size for key, size in sizes.items() if "/shards/" in key}
+    output_size, = [size for key, size in sizes.items() if "/shards/" not in key]
+
+    assert stats.completed_flows == 1
+    assert shard_bytes_read == item_sizes
+    assert sorted(item_sizes) == [0, 1, 2, 3]
+    assert all(size < output_size / 3 for size in item_sizes.values())
+    # Other children still read the whole output.
+    total_metrics, = [task_metrics for task_metrics in metrics if task_metrics["task"] == "total"]
+    assert total_metrics["parent_bytes_read"] > output_size
+
+
+def test_fused_chain_stores_only_the_output_of_its_last_task():
+    with LocalEmulator(FusedFlow) as emulator:
+        stats = emulator.run(1)
+        s3_client = emulator.s3_client
+        keys = [key['Key'] for key in s3_client.list_objects_v2(Bucket=LocalEmulator.DATASTORE)['Contents']]
+        result = pickle.loads(s3_client.get_object(Bucket=LocalEmulator.DATASTORE, Key=keys[0])['Body'].read())
+        statuses = {item['TaskName']['S']: item['Status']['S'] for item in emulator.task_table.items}
+
+    assert stats.completed_flows == 1
+    # The chain runs in the job of its first task.
+    assert stats.executions == 1
+    assert [key.split("/")[2] for key in keys] == ["total", "total"]
+    assert keys[0].endswith("/result")
+    assert result == 12
+    assert statuses == {"load": "COMPLETED", "double": "COMPLETED", "total": "COMPLETED"}
+
+
+def test_failed_fused_task_fails_its_chain():
+    with LocalEmulator(FailingFusedFlow) as emulator:
+        stats = emulator.run(1)
+        keys = emulator.s3_client.list_objects_v2(Bucket=LocalEmulator.DATASTORE)['Contents']
+        statuses = {item['TaskName']['S']: item['Status']['S'] for item in emulator.task_table.items}
+
+    assert stats.failed_flows == 1
+    assert keys == []
+    assert statuses == {"load": "FAILED", "double": "FAILED", "total": "CREATED"}
+
+
+def test_profiles_are_stored_next_to_results():
+    with LocalEmulator(ProfiledFlow) as emulator:
+        emulator.run(1)
+        s3_client = emulator.s3_client
+        keys = [key['Key'] for key in s3_client.list_objects_v2(Bucket=LocalEmulator.DATASTORE)['Contents']]
+        summaries = {
+            key.split("/")[-3]: s3_client.get_object(Bucket=LocalEmulator.DATASTORE, Key=key)['Body'].read().decode()
+            for key in keys if key.endswith("/profile.txt")
+        }
+
+    assert sorted(key.rsplit("/", 1)[-1] for key in keys) == (
+        ["profile"] * 2 + ["profile.txt"] * 2 + ["result"] * 2 + ["result.sha256"] * 2
+    )
+    assert "function calls" in summaries["load"]
+    assert "Peak traced memory" in summaries["total"]
+
+
+def test_profiles_that_cannot_be_saved_do_not_fail_the_task(monkeypatch, caplog):
+    from uniflow.core.task_profiler import CpuProfiler
+
+    def dump(profiler, stream):
+        raise OSError("Cannot dump.")
+
+    monkeypatch.setattr(CpuProfiler, "dump", dump)
+    with LocalEmulator(ProfiledFlow) as emulator:
+        stats = emulator.run(1)
+
+    assert stats.completed_flows == 1
+    assert any("Failed to save the cpu profile of task=load." in record.message for record in caplog.records)
+
+
+def test_cached_results_are_reused_by_later_flows():
+    with LocalEmulator(CachedFlow) as emulator:
+        first = emulator.run(1)
+        second = emulator.run(1)
+        s3_client = emulator.s3_client
+        totals = [
+            pickle.loads(s3_client.get_object(Bucket=LocalEmulator.DATASTORE, Key=key['Key'])['Body'].read())
+            for key in s3_client.list_objects_v2(Bucket=LocalEmulator.DATASTORE)['Contents']
+            if "/total/" in key['Key'] and key['Key'].endswith("/result") and "/cache/" not in key['Key']
+        ]
+        items = {
+            (item['TaskName']['S'], item['FlowId']['S']): item for item in emulator.task_table.items
+            if item['TaskName']['S'] in ("load", "total")
+        }
+
+    assert first.completed_flows == second.completed_flows == 1
+    assert totals == [870, 870]
+    assert sorted(int(item.get('CacheHits', {}).get('N', 0)) for item in items.values()) == [0, 0, 1, 1]
+    # The map child of a cached task gets its shards from the length stored with the cache entry.
+    assert [int(item['OutputLength']['N']) for (name, _), item in items.items() if name == "load"] == [30, 30]
@@ -0,0 +1,130 @@
+import threading
+import pytest
+
+from uniflow import Uniflow
+from uniflow.decorators import task
+from uniflow.exceptions.errors import TaskDefinitionError
+from uniflow.local.executor import LocalExecutor
+
+# Both branches of DiamondFlow wait for each other, which only completes when they run at the same time.
+branches = threading.Barrier(2, timeout=10)
+
+
+class DiamondFlow(Uniflow):
+
+    @task
+    def load():
+        return [1, 2, 3]
+
+    @task(depends_on=["load"])
+    def total(loaded):
+        branches.wait()
+        return sum(loaded)
+
+    @task(depends_on=["load"])
+    def count(loaded):
+        branches.wait()
+        return len(loaded)
+
+    @task(depends_on=["total", "count"])
+    def mean(summed, counted):
+        return summed / counted
+
+
+class SequentialFlow(Uniflow):
+
+    @task
+    def load():
+        return [1, 2, 3]
+
+    @task(depends_on=["load"])
+    def double(loaded):
+        return [value * 2 for value in loaded]
+
+    @task(depends_on=["load", "double"])
+    def merge(loaded, doubled):
+        return loaded + doubled
+
+
+class MixedComputeFlow(Uniflow):
+
+    @task
+    def load():
+        return [1, 2, 3], threading.current_thread().name
+
+    @task(compute="lambda", depends_on=["load"])
+    def count(loaded):
+        return len(loaded[0]), threading.current_thread().name
+
+    @task(depends_on=["load", "count"])
+    def total(loaded, counted):
+        return sum(loaded[0]) * counted[0], threading.current_thread().name
+
+
+class MapFlow(Uniflow):
+
+    @task
+    def load():
+        return (1, 2, 3)
+
+    @task(depends_on=["load"], map_over="load")
+    def square(item):
+        return item * item
+
+
+class DictMapFlow(Uniflow):
+
+    @task
+    def load():
+        return {"a": 1, "b": 2}
+
+    @task(depends_on=["load"], map_over="load")
+    def square(item):
+        return item * item
+
+
+def test_independent_branches_run_concurrently():
+    results = LocalExecutor(DiamondFlow, max_workers=2).execute()
+
+    assert results == {"load": [1, 2, 3], "total": 6, "count": 3, "mean": 2.0}
+
+
+def test_process_executor_hands_results_to_children():
+    results = LocalExecutor(SequentialFlow, max_workers=2, executor=LocalExecutor.PROCESS).execute()
+
+    assert results["merge"] == [1, 2, 3, 2, 4, 6]
+
+
+def test_map_tasks_run_one_shard_per_item():
+    results = LocalExecutor(MapFlow).execute()
+
+    assert results["square"] == [1, 4, 9]
+
+
+def test_mapped_over_mapping_is_rejected():
+    with pytest.raises(TypeError, match="load is mapped over and must return a sized sequence, got dict"):
+        LocalExecutor(DictMapFlow).execute()
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        LocalExecutor(SequentialFlow, executor="fiber")
+
+
+def test_tasks_are_dispatched_by_compute():
+    results = LocalExecutor(MixedComputeFlow).execute()
+
+    assert results["load"][1].startswith("BatchTaskExecutor")
+    assert results["count"][0] == 3
+    assert results["count"][1].startswith("LambdaTaskExecutor")
+    assert results["total"][0] == 18
+    assert results["total"][1].startswith("BatchTaskExecutor")
+
+
+def test_unknown_compute_is_rejected():
+    with pytest.raises(TaskDefinitionError):
+        class InvalidFlow(Uniflow):
+
+            @task(compute="fargate")
+            def run():
+                return None
@@ -0,0 +1,6 @@
+import os
+
+# Table names and region are read from the environment when the models are imported.
+os.environ.setdefault("TASK_TABLE", "TaskTable")
+os.environ.setdefault("FLOW_TABLE", "FlowTable")
+os.environ.setdefault("AWS_REGION", "us-east-1")
@@ -0,0 +1,104 @@
+import math
+import sys
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from uniflow import Uniflow
+from uniflow.decorators.task import Task
+from uniflow.local.dynamodb import InMemoryTableConnection
+from uniflow.models.task_model import TaskModel
+
+TASK_COUNT = 30
+
+
+def create_flow_class(task_count: int) -> type:
+    tasks = {}
+    for index in range(task_count):
+        def function(*args):
+            return None
+        function.__name__ = f"task_{index}"
+        dependencies = [f"task_{index - 1}", f"task_{index // 2}"] if index > 1 else [f"task_{index - 1}"][:index]
+        tasks[function.__name__] = Task(depends_on=sorted(set(dependencies)))(function)
+    return type("GeneratedFlow", (Uniflow,), tasks)
+
+
+@pytest.fixture
+def table():
+    connection = InMemoryTableConnection(TaskModel)
+    TaskModel._connection = connection
+    yield connection
+    TaskModel._connection = None
+
+
+def test_flow_tasks_are_created_with_batch_writes(table):
+    task_graph = create_flow_class(TASK_COUNT).generate_task_graph()
+
+    TaskModel.create_tasks_for_flow("flow-id", task_graph)
+
+    assert table.calls == {'BatchWriteItem': math.ceil(TASK_COUNT / 25)}
+    assert [record['eventName'] for record in table.records] == ['INSERT'] * TASK_COUNT
+
+
+def test_flow_tasks_are_complete_on_first_write(table):
+    task_graph = create_flow_class(TASK_COUNT).generate_task_graph()
+
+    run_ids = {task.task_name: task.run_id for task in TaskModel.create_tasks_for_flow("flow-id", task_graph)}
+
+    for node in task_graph.nodes:
+        task = TaskModel.get(node.name, run_ids[node.name])
+        assert task.flow_id == "flow-id"
+        assert [(parent.task_name, parent.run_id) for parent in task.parent_tasks] == \
+            [(parent.name, run_ids[parent.name]) for parent in node.parents]
+        assert [(child.task_name, child.run_id) for child in task.child_tasks] == \
+            [(child.name, run_ids[child.name]) for child in node.children]
+
+
+def test_children_are_written_before_parents(table):
+    task_graph = create_flow_class(TASK_COUNT).generate_task_graph()
+
+    TaskModel.create_tasks_for_flow("flow-id", task_graph)
+
+    positions = {record['dynamodb']['Keys']['TaskName']['S']: index for index, record in enumerate(table.records)}
+    for node in task_graph.nodes:
+        for child in node.children:
+            assert positions[child.name] < positions[node.name]
+
+
+def test_flows_created_concurrently_keep_their_run_ids(table):
+    task_graph = create_flow_class(TASK_COUNT).generate_task_graph()
+    switch_interval = sys.getswitchinterval()
+    # Switch threads as often as possible, so flows are created interleaved.
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda index: TaskModel.create_tasks_for_flow(f"flow-{index}", task_graph), range(32)))
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    flow_ids = {(item['TaskName']['S'], item['RunId']['S']): item['FlowId']['S'] for item in table.items}
+    assert len(flow_ids) == 32 * TASK_COUNT
+    for item in table.items:
+        related = item.get('ParentTasks', {}).get('L', []) + item.get('ChildTasks', {}).get('L', [])
+        for task in related:
+            assert flow_ids[(task['M']['TaskName']['S'], task['M']['RunId']['S'])] == item['FlowId']['S']
+
+
+def test_task_is_claimed_once_after_its_parents(table):
+    task_graph = create_flow_class(3).generate_task_graph()
+    run_ids = {task.task_name: task.run_id for task in TaskModel.create_tasks_for_flow("flow-id", task_graph)}
+    first, second = [TaskModel.get(name, run_ids[name]) for name in ("task_0", "task_1")]
+
+    assert not second.claim_execution()
+    assert first.claim_execution()
+    assert not first.claim_execution()
+
+    second.complete_parent(first.run_id)
+    assert second.claim_execution()
+    assert TaskModel.get(second.task_name, second.run_id).status == "PROGRESS"
+
+
+def test_poll_wait_grows_up_to_its_cap_without_overflowing():
+    waits = [TaskModel.get_poll_wait_seconds(attempt) for attempt in (0, 1, 2, 4, 5, 6, 1100, 10 ** 6)]
+
+    assert waits == [2, 4, 8, 32, 60, 60, 60, 60]
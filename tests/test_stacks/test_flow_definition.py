@@ -0,0 +1,198 @@
+from uniflow import Uniflow
+from uniflow.constants import JobPriority
+from uniflow.decorators import task
+from uniflow.stacks.flow_definition import FlowDefinition
+
+JOB_QUEUES = {priority: f"queue-{priority.name}" for priority in JobPriority}
+FUNCTIONS = {
+    name: f"function-{name}" for name in (
+        FlowDefinition.CREATE_TASKS,
+        FlowDefinition.TASK_COMPLETED,
+        FlowDefinition.TASK_FAILED,
+        FlowDefinition.PREPARE_SHARDS,
+        FlowDefinition.LAMBDA_TASK_EXECUTOR
+    )
+}
+
+
+class DiamondFlow(Uniflow):
+
+    @task
+    def load():
+        return [1, 2, 3]
+
+    @task(depends_on=["load"], map_over="load")
+    def square(item):
+        return item * item
+
+    @task(compute="lambda", depends_on=["load"])
+    def count(loaded):
+        return len(loaded)
+
+    @task(depends_on=["square", "count"], priority="low")
+    def report(squared, counted):
+        return sum(squared) / counted
+
+    @task
+    def cleanup():
+        return None
+
+
+def get_definition(flow_class: type) -> dict:
+    return FlowDefinition(flow_class.generate_task_graph(), "job-definition", JOB_QUEUES, FUNCTIONS).to_json()
+
+
+def get_states(definition: dict) -> dict:
+    """
+    Flattens the states of the definition and of every Parallel branch and Map iterator.
+    """
+    states = {}
+    for name, state in definition["States"].items():
+        states[name] = state
+        for branch in state.get("Branches", []) + ([state["Iterator"]] if "Iterator" in state else []):
+            states.update(get_states(branch))
+    return states
+
+
+def get_run_order(definition: dict, start_at: str = None) -> [str]:
+    """
+    Names of the tasks in the order the definition runs them, tasks of a Parallel state in branch order.
+    """
+    order = []
+    state_name = start_at or definition["StartAt"]
+    while state_name:
+        state = definition["States"][state_name]
+        if state["Type"] == "Parallel":
+            for branch in state["Branches"]:
+                order.extend(get_run_order(branch))
+        elif state_name.endswith(f".{FlowDefinition.TASK_COMPLETED}"):
+            order.append(state_name.split(".")[0])
+        state_name = state.get("Next")
+    return order
+
+
+def test_flow_definition_follows_task_graph():
+    definition = get_definition(DiamondFlow)
+    states = get_states(definition)
+
+    assert definition["StartAt"] == FlowDefinition.CREATE_TASKS
+    assert definition["States"][FlowDefinition.CREATE_TASKS]["Next"] == "Flow"
+
+    # One branch per independent subgraph.
+    components = definition["States"]["Flow"]["Branches"]
+    assert [sorted(get_run_order(component)) for component in components] == [
+        ["count", "load", "report", "square"],
+        ["cleanup"]
+    ]
+
+    # Every task runs once and after all of its parents.
+    order = get_run_order(components[0])
+    assert len(order) == len(set(order))
+    assert order[0] == "load"
+    assert set(order[1:3]) == {"square", "count"}
+    assert order[3] == "report"
+    assert states["Component0.Parallel0"]["Type"] == "Parallel"
+
+
+def get_waits(definition: dict, waiting: [str] = None) -> {str: {str}}:
+    """
+    Tasks every task of the definition waits for before it starts.
+    """
+    waits = {}
+    waiting = set(waiting or [])
+    state_name = definition["StartAt"]
+    while state_name:
+        state = definition["States"][state_name]
+        if state["Type"] == "Parallel":
+            for branch in state["Branches"]:
+                branch_waits = get_waits(branch, waiting)
+                waits.update(branch_waits)
+            waiting |= set(waits)
+        elif state_name.endswith(f".{FlowDefinition.TASK_COMPLETED}"):
+            waits[state_name.split(".")[0]] = set(waiting)
+            waiting.add(state_name.split(".")[0])
+        state_name = state.get("Next")
+    return waits
+
+
+def test_tasks_only_wait_for_their_dependencies():
+    class BranchFlow(Uniflow):
+
+        @task
+        def a():
+            return 1
+
+        @task(depends_on=["a"])
+        def b(value):
+            return value
+
+        @task(depends_on=["a"])
+        def c(value):
+            return value
+
+        @task(depends_on=["b"])
+        def d(value):
+            return value
+
+        @task(depends_on=["c", "d"])
+        def e(c_value, d_value):
+            return c_value + d_value
+
+    waits = get_waits(get_definition(BranchFlow))
+
+    # d does not wait for c, which is on another path from a.
+    assert waits == {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"a", "b"}, "e": {"a", "b", "c", "d"}}
+
+
+def test_subgraphs_without_a_shared_task_run_level_by_level():
+    class CrossFlow(Uniflow):
+
+        @task
+        def a():
+            return 1
+
+        @task
+        def b():
+            return 2
+
+        @task(depends_on=["a"])
+        def c(value):
+            return value
+
+        @task(depends_on=["a", "b"])
+        def d(a_value, b_value):
+            return a_value + b_value
+
+    waits = get_waits(get_definition(CrossFlow))
+
+    assert waits == {"a": set(), "b": set(), "c": {"a", "b"}, "d": {"a", "b"}}
+
+
+def test_task_states_follow_task_settings():
+    states = get_states(get_definition(DiamondFlow))
+
+    assert states["load.Run"]["Resource"] == "arn:aws:states:::batch:submitJob.sync"
+    assert states["report.Run"]["Parameters"]["JobQueue"] == JOB_QUEUES[JobPriority.LOW]
+    assert states["count.Run"]["Resource"] == FUNCTIONS[FlowDefinition.LAMBDA_TASK_EXECUTOR]
+    assert states["square.PrepareShards"]["Next"] == "square.Run"
+    assert states["square.Run"]["Type"] == "Map"
+    assert states["square.RunShard"]["Parameters"]["ContainerOverrides"]["Command"][-1] == "Ref::shard_index"
+    assert states["load.Run"]["Catch"][0]["Next"] == "load.TaskFailed"
+
+
+def test_fused_tasks_run_with_their_chain():
+    class ChainFlow(Uniflow):
+        fuse_tasks = True
+
+        @task(fuse=True)
+        def first():
+            return 1
+
+        @task(depends_on=["first"], fuse=True)
+        def second(value):
+            return value + 1
+
+    definition = get_definition(ChainFlow)
+
+    assert get_run_order(definition) == ["first"]
+    assert definition["States"][FlowDefinition.CREATE_TASKS]["Next"] == "first.Run"
@@ -1,27 +1,37 @@
 import logging
-from logging.config import dictConfig
-from .core.uniflow import Uniflow
-
-logging_config = dict(
-    version=1,
-    formatters={
-        'f': {
-            'format': '%(asctime)s %(name)-12s %(levelname)-8s %(message)s'}
-        },
-    handlers={
-        'h': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'f',
-            'level': logging.DEBUG
-        }
-    },
-    root={
-        'handlers': ['h'],
-        'level': logging.DEBUG,
-    },
-)
-
-dictConfig(logging_config)
+
+# The flow base class is imported when first accessed, Lambda handlers import the package without it.
+_MODULES = {
+    'Uniflow': '.core.uniflow'
+}
+
+
+def configure_logging() -> None:
+    # Same setup as logging.config.dictConfig with a single root stream handler, without importing logging.config.
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s'))
+    handler.setLevel(logging.DEBUG)
+
+    root = logging.getLogger()
+    for existing_handler in list(root.handlers):
+        root.removeHandler(existing_handler)
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+    # dictConfig disables the loggers that exist when it runs, disable_existing_loggers defaults to True.
+    for existing_logger in root.manager.loggerDict.values():
+        if isinstance(existing_logger, logging.Logger):
+            existing_logger.disabled = True
+
+
+def __getattr__(name: str) -> object:
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__} has no attribute {name}")
+    import importlib
+    return getattr(importlib.import_module(_MODULES[name], __name__), name)
+
+
+configure_logging()
 
 __all__ = [
     "Uniflow"
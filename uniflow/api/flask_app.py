@@ -1,12 +1,23 @@
+import os
+import json
 import logging
+from flask import request
 from flask_serverless import Flask
 from ..models.flow_model import FlowModel
+from ..core.flow_timeline import FlowTimeline
+from ..core.unigraph import load_task_graph
 
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.url_map.strict_slashes = False
 
+TIMELINE_FORMATS = {
+    "json": ("application/json", lambda timeline: json.dumps(timeline.to_json())),
+    "text": ("text/plain", lambda timeline: timeline.to_text()),
+    "html": ("text/html", lambda timeline: timeline.to_html())
+}
+
 
 @app.route('/')
 def index():
@@ -17,3 +28,14 @@ def index():
 def start_flow():
     new_flow = FlowModel.create_new_flow()
     return f"Started flow {new_flow.flow_id}"
+
+
+@app.route('/flow/<flow_id>/timeline')
+def flow_timeline(flow_id):
+    output_format = request.args.get("format", "json")
+    if output_format not in TIMELINE_FORMATS:
+        return f"Unknown format {output_format}, expected one of {', '.join(TIMELINE_FORMATS)}.", 400
+
+    content_type, render = TIMELINE_FORMATS[output_format]
+    timeline = FlowTimeline.for_flow(flow_id, load_task_graph(os.environ['FLOW_TASK_GRAPH']))
+    return render(timeline), 200, {"Content-Type": content_type}
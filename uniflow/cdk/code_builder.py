@@ -3,7 +3,7 @@ import logging
 import shutil
 
 from pathlib import Path
-from ..constants import IGNORE_PATTERNS
+from ..constants import IGNORE_PATTERNS, TASK_GRAPH_FILE
 from uniflow.cdk import LAMBDA_RUNTIME
 
 logger = logging.getLogger(__name__)
@@ -13,9 +13,10 @@ class CodeBuilder(object):
 
     CODE = "code"
 
-    def __init__(self, code_directory: str, build_directory: str) -> None:
+    def __init__(self, code_directory: str, build_directory: str, task_graph: object = None) -> None:
         self.__code_directory = code_directory
         self.__build_directory = build_directory
+        self.__task_graph = task_graph
 
     @property
     def code_directory(self):
@@ -33,6 +34,10 @@ class CodeBuilder(object):
     def site_packages(self):
         return self.build_code_directory.joinpath(f"python/lib/{LAMBDA_RUNTIME.to_string()}/site-packages/{self.code_directory.name}")
 
+    @property
+    def task_graph_file(self):
+        return self.build_code_directory.joinpath(TASK_GRAPH_FILE)
+
     @property
     def code_archive(self):
         return self.build_directory.joinpath("code.zip")
@@ -43,6 +48,11 @@ class CodeBuilder(object):
             shutil.rmtree(self.site_packages)
         shutil.copytree(self.code_directory, self.site_packages, ignore=IGNORE_PATTERNS)
 
+    def __write_task_graph(self):
+        logger.info(f"Writing task graph to {self.task_graph_file.as_posix()}")
+        self.task_graph_file.parent.mkdir(parents=True, exist_ok=True)
+        self.__task_graph.dump(self.task_graph_file)
+
     def __archive_code(self):
         logger.info(f"Archiving code {self.build_code_directory.as_posix()} to {self.code_archive.as_posix()}")
         shutil.make_archive(self.code_archive.as_posix().replace('.zip', ''), 'zip', self.build_code_directory.as_posix())
@@ -51,4 +61,6 @@ class CodeBuilder(object):
 
     def package(self):
         self.__copy_code_to_site_packages()
+        if self.__task_graph:
+            self.__write_task_graph()
         self.__archive_code()
@@ -4,8 +4,8 @@ from .code_builder import CodeBuilder
 
 class FlowCode(AssetCode):
 
-    def __init__(self, code: str, build_directory: str = "cdk.out") -> None:
-        lambda_code = CodeBuilder(code, build_directory)
+    def __init__(self, code: str, build_directory: str = "cdk.out", task_graph: object = None) -> None:
+        lambda_code = CodeBuilder(code, build_directory, task_graph)
         lambda_code.package()
         super().__init__(lambda_code.code_archive.as_posix())
 
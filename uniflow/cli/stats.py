@@ -0,0 +1,69 @@
+from ..constants import TaskPhase
+from ..models.task_model import TaskModel
+
+MEGABYTE = 1024 ** 2
+# Columns of names, left aligned, the rest are numbers.
+TEXT_COLUMNS = 2
+
+COLUMNS = [
+    ("task", "{}"),
+    ("status", "{}"),
+    ("queue_s", "{:.2f}"),
+    ("download_s", "{:.2f}"),
+    ("compute_s", "{:.2f}"),
+    ("upload_s", "{:.2f}"),
+    ("run_s", "{:.2f}"),
+    ("read_mb", "{:.1f}"),
+    ("written_mb", "{:.1f}"),
+    ("serialization_s", "{:.2f}"),
+    ("cpu_s", "{:.2f}"),
+    ("peak_rss_mb", "{:.0f}")
+]
+
+
+def _to_megabytes(size) -> float:
+    return None if size is None else float(size) / MEGABYTE
+
+
+def get_task_stats(task: TaskModel) -> dict:
+    return {
+        "task": task.task_name,
+        "run_id": task.run_id,
+        "status": task.status,
+        "started": task.started.isoformat() if task.started else None,
+        "queue_s": task.queue_seconds,
+        "fingerprint_s": task.get_phase_seconds(TaskPhase.FINGERPRINT.value),
+        "download_s": task.get_phase_seconds(TaskPhase.DOWNLOAD.value),
+        "compute_s": task.get_phase_seconds(TaskPhase.COMPUTE.value),
+        "upload_s": task.get_phase_seconds(TaskPhase.UPLOAD.value),
+        "run_s": task.run_seconds,
+        "read_mb": _to_megabytes(task.parent_bytes_read),
+        "written_mb": _to_megabytes(task.output_bytes_written),
+        "serialization_s": task.serialization_seconds,
+        "cpu_s": task.cpu_seconds,
+        "peak_rss_mb": _to_megabytes(task.peak_rss_bytes),
+        "cache_hits": int(task.cache_hits or 0)
+    }
+
+
+def get_flow_stats(flow_id: str) -> [dict]:
+    """
+    Metrics of every task of the flow, read from the flow id index of the task table, in the order tasks started.
+    Tasks that did not run yet come last.
+    """
+    stats = [get_task_stats(task) for task in TaskModel.get_tasks_for_flow(flow_id)]
+    return sorted(stats, key=lambda task_stats: (task_stats["started"] is None, task_stats["started"] or "",
+                                                 task_stats["task"]))
+
+
+def format_flow_stats(stats: [dict]) -> str:
+    rows = [[name for name, _ in COLUMNS]] + [
+        ["-" if task_stats[name] is None else form.format(task_stats[name]) for name, form in COLUMNS]
+        for task_stats in stats
+    ]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(COLUMNS))]
+    return "\n".join(
+        "  ".join(value.ljust(width) if index < TEXT_COLUMNS else value.rjust(width)
+                  for index, (value, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
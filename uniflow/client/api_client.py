@@ -1,17 +1,17 @@
-import boto3
 import requests
 import logging
 
+from ..clients import get_resource
+
 
 logger = logging.getLogger(__name__)
 
 
 class ApiClient(object):
-    CFN = boto3.resource("cloudformation")
 
     def __init__(self, stack_name):
         self.__stack_name = stack_name
-        self.__stack = self.CFN.Stack(stack_name)
+        self.__stack = get_resource("cloudformation").Stack(stack_name)
 
         self.__init_endpoint()
 
@@ -25,6 +25,22 @@ class ApiClient(object):
         if self.__endpoint is None:
             raise Exception("Cannot find rest api endpoint in the cfn stack!")
 
+    def __get_physical_resource_id(self, resource_type: str, construct_id: str) -> str:
+        # Logical ids of the resources of a cdk construct start with its id without underscores.
+        logical_id_prefix = f"{self.__stack_name}{construct_id}"
+        for resource in self.__stack.resource_summaries.all():
+            if resource.resource_type == resource_type and resource.logical_resource_id.startswith(logical_id_prefix):
+                return resource.physical_resource_id
+        raise Exception(f"Cannot find {construct_id} in the cfn stack!")
+
+    @property
+    def task_table(self) -> str:
+        return self.__get_physical_resource_id("AWS::DynamoDB::Table", "TaskTable")
+
+    @property
+    def datastore(self) -> str:
+        return self.__get_physical_resource_id("AWS::S3::Bucket", "FlowDatastore")
+
     def ping(self) -> None:
         response = requests.get(self.__endpoint)
         logger.info(response.text)
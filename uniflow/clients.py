@@ -0,0 +1,41 @@
+import threading
+
+# boto3 is imported on first use, handlers that never reach AWS through boto3 directly do not pay for it at import.
+_lock = threading.Lock()
+_clients = {}
+_resources = {}
+
+
+def get_client(service_name: str) -> object:
+    """
+    Returns the boto3 client of the service, created on first use and shared afterwards. boto3 clients are thread
+    safe once created.
+    """
+    with _lock:
+        if service_name not in _clients:
+            import boto3
+            _clients[service_name] = boto3.client(service_name)
+        return _clients[service_name]
+
+
+def get_resource(service_name: str) -> object:
+    """
+    Returns the boto3 resource of the service, created on first use and shared afterwards. Resources are not thread
+    safe, use them from a single thread.
+    """
+    with _lock:
+        if service_name not in _resources:
+            import boto3
+            _resources[service_name] = boto3.resource(service_name)
+        return _resources[service_name]
+
+
+def set_client(service_name: str, client: object) -> None:
+    """
+    Overrides the client of the service, e.g. with one of the in memory clients of uniflow.local. None resets it.
+    """
+    with _lock:
+        if client is None:
+            _clients.pop(service_name, None)
+        else:
+            _clients[service_name] = client
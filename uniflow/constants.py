@@ -5,6 +5,34 @@ from enum import Enum, auto
 
 IGNORE_PATTERNS = shutil.ignore_patterns('*.pyc', 'tmp*', 'cdk.out', '__pycache__', '*.egg-info', '.git')
 
+DATASTORE_MAX_CONCURRENCY = 8
+DATASTORE_READ_BUFFER_SIZE = 1024 * 1024
+DATASTORE_PART_SIZE = 64 * 1024 * 1024
+DATASTORE_UPLOAD_CONCURRENCY = 4
+
+# Validated task graph written to the code layer at build time, layers are extracted under /opt in Lambda.
+TASK_GRAPH_FILE = "uniflow_graph/task_graph.json"
+LAMBDA_LAYER_DIRECTORY = "/opt"
+
+LOCAL_CACHE_DIRECTORY = "/tmp/uniflow-cache"
+LOCAL_CACHE_MAX_BYTES = 10 * 1024 ** 3
+
+# Backoff of the state machine while it waits for the parents of a task to complete.
+STATUS_POLL_INITIAL_SECONDS = 2
+STATUS_POLL_MAX_SECONDS = 60
+STATUS_POLL_BACKOFF = 2
+
+# Records per invocation and concurrent invocations per shard of the table stream handlers, and the threads each
+# invocation uses to process the records of different items.
+STREAM_BATCH_SIZE = 100
+STREAM_PARALLELIZATION_FACTOR = 1
+STREAM_MAX_CONCURRENCY = 10
+
+RESULT_CACHE_MAX_BYTES = 10 * 1024 ** 3
+RESULT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+# Listing the whole cache after every store is costly, stores run the eviction with this probability.
+RESULT_CACHE_EVICTION_PROBABILITY = 0.05
+
 
 class JobPriority(Enum):
     HIGH = 10
@@ -12,6 +40,15 @@ class JobPriority(Enum):
     LOW = 3
 
 
+# Priority of tasks whose job queue is picked from their position relative to the critical path of the flow.
+AUTO_PRIORITY = "auto"
+
+
+class ComputeType(Enum):
+    BATCH = "batch"
+    LAMBDA = "lambda"
+
+
 class DecoratorMode(Enum):
     COMPILATION = auto()
     EXECUTION = auto()
@@ -25,4 +62,20 @@ class TaskStatus(Enum):
     COMPLETED = auto()
     ERROR = auto()
     FAILED = auto()
-    NOT_AVAILABLE = auto()
\ No newline at end of file
+    NOT_AVAILABLE = auto()
+
+
+class TaskPhase(Enum):
+    FINGERPRINT = "fingerprint"
+    DOWNLOAD = "download"
+    COMPUTE = "compute"
+    UPLOAD = "upload"
+
+
+class ProfileType(Enum):
+    CPU = "cpu"
+    MEMORY = "memory"
+
+
+# Entries of the summary stored next to a task profile.
+PROFILE_TOP_N = 30
@@ -0,0 +1,404 @@
+import html
+
+from datetime import datetime
+from ..constants import TaskStatus
+from ..models.task_model import TaskModel
+from .unigraph import Unigraph
+
+
+class TaskTimeline(object):
+    """
+    Moments of one task of a flow run. A task is ready when its last parent completed, claimed when a stream
+    handler started its state machine, started and finished around its execution, and completed when the state
+    machine wrote its final status. Map tasks run from the submission of their shards to their completion.
+    """
+
+    def __init__(self, task: TaskModel, node, level: int) -> None:
+        self.__task = task
+        self.__node = node
+        self.__level = level
+        self.__ready = None
+
+    @property
+    def name(self) -> str:
+        return self.__task.task_name
+
+    @property
+    def run_id(self) -> str:
+        return self.__task.run_id
+
+    @property
+    def status(self) -> str:
+        return self.__task.status
+
+    @property
+    def level(self) -> int:
+        return self.__level
+
+    @property
+    def compute(self) -> str:
+        return self.__node.task.compute
+
+    @property
+    def is_map(self) -> bool:
+        return self.__task.map_over is not None
+
+    @property
+    def fused_into(self) -> str:
+        return self.__task.fused_into
+
+    @property
+    def parents(self) -> [str]:
+        return [parent.name for parent in self.__node.parents]
+
+    @property
+    def created(self) -> datetime:
+        return self.__task.created
+
+    @property
+    def ready(self) -> datetime:
+        return self.__ready
+
+    @ready.setter
+    def ready(self, ready: datetime) -> None:
+        self.__ready = ready
+
+    @property
+    def claimed(self) -> datetime:
+        return self.__task.claimed
+
+    @property
+    def started(self) -> datetime:
+        return self.__task.started
+
+    @property
+    def finished(self) -> datetime:
+        return self.__task.finished or self.completed
+
+    @property
+    def completed(self) -> datetime:
+        if self.status in (TaskStatus.COMPLETED.name, TaskStatus.FAILED.name):
+            return self.__task.status_updated
+        return None
+
+    @property
+    def has_run(self) -> bool:
+        return self.fused_into is None and self.started is not None and self.finished is not None
+
+    @staticmethod
+    def __seconds(start: datetime, end: datetime) -> float:
+        if start is None or end is None:
+            return None
+        return max((end - start).total_seconds(), 0.0)
+
+    @property
+    def dispatch_seconds(self) -> float:
+        """
+        From ready to claimed, the time the completion of the last parent took to reach the stream handler.
+        """
+        return self.__seconds(self.ready, self.claimed)
+
+    @property
+    def queue_seconds(self) -> float:
+        """
+        From claimed, or ready for tasks of a compiled state machine, to started. It includes the wait loop of the
+        state machine and the time spent in the job queue.
+        """
+        return self.__seconds(self.claimed or self.ready, self.started)
+
+    @property
+    def run_seconds(self) -> float:
+        return self.__seconds(self.started, self.finished)
+
+    @property
+    def completion_seconds(self) -> float:
+        return self.__seconds(self.finished, self.completed)
+
+    @property
+    def overhead_seconds(self) -> float:
+        return sum(seconds or 0.0 for seconds in (self.dispatch_seconds, self.queue_seconds, self.completion_seconds))
+
+
+class FlowTimeline(object):
+    """
+    Where the wall clock time of a flow run went, from its task items and its task graph: the intervals of every
+    task, the chain of tasks that gated the end of the flow, the parallelism of each level of the graph and the
+    gaps during which no task was running. Fused tasks run inside the job of their chain, their time is reported
+    on the first task of the chain.
+    """
+
+    def __init__(self, flow_id: str, tasks: [TaskModel], task_graph: Unigraph) -> None:
+        self.__flow_id = flow_id
+        items = {task.task_name: task for task in tasks}
+        self.__tasks = {
+            node.name: TaskTimeline(items[node.name], node, task_graph.get_depth(node.name))
+            for node in task_graph.topological_order if node.name in items
+        }
+        self.__level_count = len(task_graph.levels)
+        for task in self.__tasks.values():
+            parents = [self.__tasks.get(parent) for parent in task.parents]
+            if not parents:
+                task.ready = task.created
+            elif all(parent is not None and parent.completed is not None for parent in parents):
+                task.ready = max(parent.completed for parent in parents)
+
+    @classmethod
+    def for_flow(cls, flow_id: str, task_graph: Unigraph) -> object:
+        return cls(flow_id, TaskModel.get_tasks_for_flow(flow_id), task_graph)
+
+    @property
+    def flow_id(self) -> str:
+        return self.__flow_id
+
+    @property
+    def tasks(self) -> [TaskTimeline]:
+        return list(self.__tasks.values())
+
+    @property
+    def executed_tasks(self) -> [TaskTimeline]:
+        return sorted((task for task in self.__tasks.values() if task.has_run), key=lambda task: task.started)
+
+    @property
+    def started(self) -> datetime:
+        return min((task.created for task in self.__tasks.values()), default=None)
+
+    @property
+    def ended(self) -> datetime:
+        ends = [task.completed or task.finished for task in self.__tasks.values() if task.completed or task.finished]
+        return max(ends, default=None)
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started is None or self.ended is None:
+            return 0.0
+        return (self.ended - self.started).total_seconds()
+
+    def offset(self, moment: datetime) -> float:
+        return None if moment is None else (moment - self.started).total_seconds()
+
+    def __get_executor(self, task: TaskTimeline) -> TaskTimeline:
+        return self.__tasks.get(task.fused_into, task) if task.fused_into else task
+
+    @property
+    def critical_path(self) -> [TaskTimeline]:
+        """
+        Walks back from the last task to end through the parent that completed last, the one each task waited for.
+        """
+        ended = [task for task in self.__tasks.values() if task.completed or task.finished]
+        if not ended:
+            return []
+
+        task = self.__get_executor(max(ended, key=lambda task: task.completed or task.finished))
+        path = []
+        while task is not None and task not in path:
+            path.append(task)
+            parents = [self.__tasks[parent] for parent in task.parents if parent in self.__tasks]
+            parents = [parent for parent in parents if parent.completed is not None]
+            task = self.__get_executor(max(parents, key=lambda parent: parent.completed)) if parents else None
+        return list(reversed(path))
+
+    @staticmethod
+    def __get_max_concurrency(tasks: [TaskTimeline]) -> int:
+        # Ends sort before starts at the same moment, a task starting as another one ends does not overlap it.
+        events = sorted([(task.started, 1) for task in tasks] + [(task.finished, -1) for task in tasks])
+        running = max_running = 0
+        for _, change in events:
+            running += change
+            max_running = max(max_running, running)
+        return max_running
+
+    @property
+    def levels(self) -> [dict]:
+        levels = []
+        for level in range(self.__level_count):
+            tasks = [task for task in self.executed_tasks if task.level == level]
+            if not tasks:
+                levels.append({"level": level, "tasks": 0, "span_seconds": 0.0, "busy_seconds": 0.0,
+                               "parallelism": 0.0, "max_concurrency": 0})
+                continue
+            span_seconds = (max(task.finished for task in tasks) - min(task.started for task in tasks)).total_seconds()
+            busy_seconds = sum(task.run_seconds for task in tasks)
+            levels.append({
+                "level": level,
+                "tasks": len(tasks),
+                "span_seconds": span_seconds,
+                "busy_seconds": busy_seconds,
+                "parallelism": busy_seconds / span_seconds if span_seconds else float(len(tasks)),
+                "max_concurrency": self.__get_max_concurrency(tasks)
+            })
+        return levels
+
+    @staticmethod
+    def __is_waiting(task: TaskTimeline, start: datetime, end: datetime) -> bool:
+        if task.fused_into is not None or task.ready is None or task.ready >= end:
+            return False
+        return task.started is None or task.started >= end
+
+    @property
+    def idle_gaps(self) -> [dict]:
+        """
+        Intervals of the flow during which no task was running, with the tasks that became ready before the end of
+        the interval and had not started by then.
+        """
+        gaps = []
+        idle_since = self.started
+        for task in self.executed_tasks:
+            if task.started > idle_since:
+                gaps.append((idle_since, task.started))
+            idle_since = max(idle_since, task.finished)
+        if self.ended is not None and self.ended > idle_since:
+            gaps.append((idle_since, self.ended))
+
+        return [
+            {
+                "start": self.offset(start),
+                "end": self.offset(end),
+                "seconds": (end - start).total_seconds(),
+                "waiting": [task.name for task in self.__tasks.values() if self.__is_waiting(task, start, end)]
+            }
+            for start, end in gaps
+        ]
+
+    def task_to_json(self, task: TaskTimeline) -> dict:
+        return {
+            "task": task.name,
+            "run_id": task.run_id,
+            "status": task.status,
+            "level": task.level,
+            "compute": task.compute,
+            "is_map": task.is_map,
+            "fused_into": task.fused_into,
+            "ready": self.offset(task.ready),
+            "claimed": self.offset(task.claimed),
+            "started": self.offset(task.started),
+            "finished": self.offset(task.finished),
+            "completed": self.offset(task.completed),
+            "dispatch_seconds": task.dispatch_seconds,
+            "queue_seconds": task.queue_seconds,
+            "run_seconds": task.run_seconds,
+            "completion_seconds": task.completion_seconds
+        }
+
+    def to_json(self) -> dict:
+        critical_path = self.critical_path
+        return {
+            "flow_id": self.flow_id,
+            "started": self.started.isoformat() if self.started else None,
+            "wall_seconds": self.wall_seconds,
+            "critical_path": [task.name for task in critical_path],
+            "critical_path_run_seconds": sum(task.run_seconds or 0.0 for task in critical_path),
+            "critical_path_overhead_seconds": sum(task.overhead_seconds for task in critical_path),
+            "tasks": [self.task_to_json(task) for task in self.tasks],
+            "levels": self.levels,
+            "idle_gaps": self.idle_gaps
+        }
+
+    @staticmethod
+    def __format(seconds: float) -> str:
+        return "-" if seconds is None else f"{seconds:.2f}"
+
+    def to_text(self) -> str:
+        report = self.to_json()
+        critical_path = set(report["critical_path"])
+        lines = [
+            f"Flow {self.flow_id}: {report['wall_seconds']:.2f}s wall clock, {len(report['tasks'])} tasks, "
+            f"{len(report['levels'])} levels.",
+            f"Critical path, {report['critical_path_run_seconds']:.2f}s running and "
+            f"{report['critical_path_overhead_seconds']:.2f}s waiting: {' -> '.join(report['critical_path'])}",
+            "",
+            f"{'task':<24} {'level':>5} {'ready':>8} {'dispatch':>8} {'queue':>8} {'run':>8} {'complete':>8}  status"
+        ]
+        for task in sorted(report["tasks"], key=lambda task: (task["started"] is None, task["started"] or 0.0)):
+            name = f"{'*' if task['task'] in critical_path else ' '}{task['task']}"
+            if task["fused_into"]:
+                name = f"{name} ({task['fused_into']})"
+            lines.append(
+                f"{name:<24} {task['level']:>5} {self.__format(task['ready']):>8} "
+                f"{self.__format(task['dispatch_seconds']):>8} {self.__format(task['queue_seconds']):>8} "
+                f"{self.__format(task['run_seconds']):>8} {self.__format(task['completion_seconds']):>8}  "
+                f"{task['status']}"
+            )
+
+        lines += ["", f"{'level':>5} {'tasks':>5} {'span':>8} {'busy':>8} {'parallel':>8} {'max':>5}"]
+        for level in report["levels"]:
+            lines.append(
+                f"{level['level']:>5} {level['tasks']:>5} {level['span_seconds']:>8.2f} {level['busy_seconds']:>8.2f} "
+                f"{level['parallelism']:>8.2f} {level['max_concurrency']:>5}"
+            )
+
+        lines += ["", "Idle gaps, no task running:"]
+        for gap in report["idle_gaps"]:
+            lines.append(
+                f"  {gap['start']:.2f}s - {gap['end']:.2f}s ({gap['seconds']:.2f}s), "
+                f"waiting: {', '.join(gap['waiting']) or '-'}"
+            )
+        return "\n".join(lines)
+
+    def __get_bar(self, start: datetime, end: datetime, css_class: str) -> str:
+        if start is None or end is None or end <= start or not self.wall_seconds:
+            return ""
+        left = self.offset(start) / self.wall_seconds * 100
+        width = (end - start).total_seconds() / self.wall_seconds * 100
+        return f'<div class="{css_class}" style="left:{left:.3f}%;width:{width:.3f}%"></div>'
+
+    def to_html(self) -> str:
+        """
+        Static Gantt chart of the run, one row per executed task on a shared time axis.
+        """
+        critical_path = set(task.name for task in self.critical_path)
+        rows = []
+        for task in self.executed_tasks:
+            run_class = "failed" if task.status == TaskStatus.FAILED.name else "run"
+            bars = "".join([
+                self.__get_bar(task.ready, task.claimed, "dispatch"),
+                self.__get_bar(task.claimed or task.ready, task.started, "queue"),
+                self.__get_bar(task.started, task.finished, run_class),
+                self.__get_bar(task.finished, task.completed, "completion")
+            ])
+            title = html.escape(
+                f"{task.name}: queue {self.__format(task.queue_seconds)}s, run {self.__format(task.run_seconds)}s"
+            )
+            rows.append(
+                f'<tr class="{"critical" if task.name in critical_path else ""}" title="{title}">'
+                f'<td>{html.escape(task.name)}</td><td>{task.level}</td><td>{html.escape(task.compute)}</td>'
+                f'<td class="chart">{bars}</td></tr>'
+            )
+        return _HTML_TEMPLATE.format(
+            flow_id=html.escape(self.flow_id),
+            wall_seconds=self.wall_seconds,
+            critical_path=html.escape(" -> ".join(task.name for task in self.critical_path)),
+            rows="\n".join(rows)
+        )
+
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Flow {flow_id}</title>
+<style>
+body {{ font-family: sans-serif; font-size: 13px; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td {{ padding: 2px 6px; white-space: nowrap; }}
+td.chart {{ position: relative; width: 75%; }}
+td.chart div {{ position: absolute; top: 4px; height: 12px; }}
+tr.critical td {{ font-weight: bold; }}
+.dispatch {{ background: #f4a261; }}
+.queue {{ background: #e9c46a; }}
+.run {{ background: #2a9d8f; }}
+.failed {{ background: #e63946; }}
+.completion {{ background: #adb5bd; }}
+</style>
+</head>
+<body>
+<h3>Flow {flow_id}, {wall_seconds:.2f}s</h3>
+<p>Critical path, in bold: {critical_path}</p>
+<p><span class="dispatch">&nbsp;dispatch&nbsp;</span> <span class="queue">&nbsp;queue&nbsp;</span>
+<span class="run">&nbsp;run&nbsp;</span> <span class="completion">&nbsp;completion&nbsp;</span></p>
+<table>
+<tr><th>task</th><th>level</th><th>compute</th><th></th></tr>
+{rows}
+</table>
+</body>
+</html>
+"""
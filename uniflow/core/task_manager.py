@@ -1,23 +1,42 @@
 import os
-import boto3
+import json
 import logging
-import pickle
+import time
 
-from ..models.task_model import TaskModel
+from concurrent.futures import ThreadPoolExecutor
+from ..clients import get_client
+from ..models.task_model import TaskModel, TaskAttribute
 from ..decorators.task import Task
+from ..constants import TaskStatus, TaskPhase
+from ..exceptions.errors import TaskExecutionError
+from ..datastore.streams import open_streaming_body
+from ..datastore.serializers import serializers, FORMAT_METADATA_KEY
+from ..datastore.result_cache import ResultCache
+from ..datastore.multipart import MultipartUploadWriter
+from ..datastore.local_cache import LocalObjectCache
+from ..datastore.keys import get_task_prefix, get_digest_key
+from .task_metrics import TaskMetrics
+from ..utils import get_mapped_over_length
+from ..constants import DATASTORE_MAX_CONCURRENCY, DATASTORE_READ_BUFFER_SIZE, DATASTORE_PART_SIZE, \
+    DATASTORE_UPLOAD_CONCURRENCY, LOCAL_CACHE_DIRECTORY, LOCAL_CACHE_MAX_BYTES, PROFILE_TOP_N
 
 
 logger = logging.getLogger(__name__)
 
 
 class TaskManager(object):
-    s3_resource = boto3.resource('s3')
 
-    def __init__(self, task: Task, flow_id: str, run_id: str, local: bool = False) -> None:
+    def __init__(self, task: Task, flow_id: str, run_id: str, local: bool = False, flow_class: type = None,
+                 shard_index: int = None, profile: str = None) -> None:
         self.__task = task
+        self.__flow_class = flow_class
         self.__flow_id = flow_id
         self.__run_id = run_id
+        self.__shard_index = shard_index
+        self.__profile = profile
         self.__task_item = TaskModel.get(self.task.name, self.run_id)
+        self.__local_cache = self.__create_local_cache()
+        self.__metrics = None
         self.local = local
 
     @property
@@ -32,46 +51,389 @@ class TaskManager(object):
     def run_id(self):
         return self.__run_id
 
+    @property
+    def shard_index(self) -> int:
+        return self.__shard_index
+
+    @property
+    def profile(self) -> str:
+        """
+        Profile requested for this execution, or else by the task.
+        """
+        return self.__profile or self.task.profile
+
+    @property
+    def s3_client(self):
+        return get_client('s3')
+
     @property
     def datastore(self) -> str:
         return os.environ['FLOW_DATASTORE']
 
+    @property
+    def datastore_max_concurrency(self) -> int:
+        return int(os.getenv('FLOW_DATASTORE_MAX_CONCURRENCY', DATASTORE_MAX_CONCURRENCY))
+
+    @property
+    def datastore_part_size(self) -> int:
+        return int(os.getenv('FLOW_DATASTORE_PART_SIZE', DATASTORE_PART_SIZE))
+
+    @property
+    def datastore_upload_concurrency(self) -> int:
+        return int(os.getenv('FLOW_DATASTORE_UPLOAD_CONCURRENCY', DATASTORE_UPLOAD_CONCURRENCY))
+
+    @property
+    def local_cache(self) -> LocalObjectCache:
+        return self.__local_cache
+
     @property
     def task_item(self) -> TaskModel:
         return self.__task_item
 
+    @property
+    def metrics(self) -> TaskMetrics:
+        return self.__metrics
+
     @property
     def task_object(self) -> str:
-        return f"{os.environ['FLOW']}/{self.flow_id}/{self.task.name}/{self.__run_id}/result.pkl"
+        return self.__get_s3_key_for_task_result(self.task.name, self.__run_id, self.shard_index)
+
+    def __get_s3_key_for_task_result(self, task_name: str, run_id: str, shard_index: int = None) -> str:
+        return f"{get_task_prefix(os.environ['FLOW'], self.flow_id, task_name, run_id, shard_index)}/result"
+
+    def __get_s3_keys_for_parent_task_shards(self, parent_task: TaskAttribute) -> [str]:
+        shard_count = int(TaskModel.get(parent_task.task_name, parent_task.run_id).shard_count or 0)
+        return [
+            self.__get_s3_key_for_task_result(parent_task.task_name, parent_task.run_id, shard_index)
+            for shard_index in range(shard_count)
+        ]
+
+    def __get_s3_key_for_parent_task_result(self, parent_task: TaskAttribute) -> str:
+        return self.__get_s3_key_for_task_result(parent_task.task_name, parent_task.run_id)
+
+    @staticmethod
+    def __create_local_cache() -> LocalObjectCache:
+        max_bytes = int(os.getenv('FLOW_LOCAL_CACHE_MAX_BYTES', LOCAL_CACHE_MAX_BYTES))
+        if max_bytes <= 0:
+            return None
+        return LocalObjectCache(os.getenv('FLOW_LOCAL_CACHE_DIRECTORY', LOCAL_CACHE_DIRECTORY), max_bytes)
+
+    @property
+    def result_cache(self) -> ResultCache:
+        return ResultCache(
+            self.s3_client,
+            self.datastore,
+            f"{os.environ['FLOW']}/cache/{self.task.name}",
+            self.task.cache_max_bytes,
+            self.task.cache_max_age
+        )
+
+    def __get_parent_task_result_digest(self, parent_task: TaskAttribute) -> str:
+        if parent_task.is_map:
+            keys = self.__get_s3_keys_for_parent_task_shards(parent_task)
+        else:
+            keys = [self.__get_s3_key_for_parent_task_result(parent_task)]
+        return ",".join(
+            self.s3_client.get_object(Bucket=self.datastore, Key=get_digest_key(key))['Body'].read().decode()
+            for key in keys
+        )
+
+    def __stream_object(self, key: str) -> (object, dict):
+        response = self.s3_client.get_object(Bucket=self.datastore, Key=key)
+        serializer = serializers.for_format(response['Metadata'].get(FORMAT_METADATA_KEY))
+        with open_streaming_body(response['Body'], DATASTORE_READ_BUFFER_SIZE) as stream:
+            with self.metrics.serialization():
+                return serializer.load(stream), response
+
+    def __load_object_through_local_cache(self, key: str) -> (object, dict):
+        response = self.s3_client.head_object(Bucket=self.datastore, Key=key)
+        if response['ContentLength'] > self.local_cache.max_bytes:
+            return self.__stream_object(key)
+
+        serializer = serializers.for_format(response['Metadata'].get(FORMAT_METADATA_KEY))
+        with self.local_cache.fetch(
+            key,
+            response['ETag'],
+            response['ContentLength'],
+            lambda file: self.s3_client.download_fileobj(self.datastore, key, file)
+        ) as path, self.metrics.serialization():
+            return serializer.load_file(path.as_posix(), mmap_mode='c'), response
+
+    def __load_object(self, key: str) -> (object, dict):
+        # s3 clients are thread safe unlike resources, objects are downloaded concurrently.
+        if self.local_cache is None:
+            return self.__stream_object(key)
+        return self.__load_object_through_local_cache(key)
 
-    def __get_s3_key_for_parent_task_result(self, parent_task: TaskModel) -> str:
-        return f"{os.environ['FLOW']}/{self.flow_id}/{parent_task.task_name}/{parent_task.run_id}/result.pkl"
+    def __gather_parent_task_shards(self, parent_task: TaskAttribute) -> ([object], int):
+        keys = self.__get_s3_keys_for_parent_task_shards(parent_task)
+        if not keys:
+            return [], 0
 
-    def __get_parent_task_result_from_s3(self, task: str) -> object:
-        logger.info(f"Loading parent_task={task} output from datastore for run_id={self.__run_id}.")
-        obj = self.s3_resource.Object(self.datastore, self.__get_s3_key_for_parent_task_result(task))
-        return pickle.loads(obj.get()['Body'].read())
+        with ThreadPoolExecutor(max_workers=min(len(keys), self.datastore_max_concurrency)) as pool:
+            shards = list(pool.map(self.__load_object, keys))
+        return [result for result, _ in shards], sum(response['ContentLength'] for _, response in shards)
+
+    def __get_parent_task_result_from_s3(self, parent_task: TaskAttribute) -> object:
+        logger.info(f"Loading parent_task={parent_task.task_name} output from datastore for run_id={self.__run_id}.")
+        start = time.perf_counter()
+        if parent_task.task_name == self.task.map_over:
+            # Items of outputs that are mapped over are stored where the results of shards are, a shard reads its own.
+            result, response = self.__load_object(
+                self.__get_s3_key_for_task_result(parent_task.task_name, parent_task.run_id, self.shard_index)
+            )
+            size = response['ContentLength']
+        elif parent_task.is_map:
+            result, size = self.__gather_parent_task_shards(parent_task)
+        else:
+            result, response = self.__load_object(self.__get_s3_key_for_parent_task_result(parent_task))
+            size = response['ContentLength']
+        self.metrics.add_parent_bytes_read(size)
+        logger.info(
+            f"Loaded parent_task={parent_task.task_name} output of {size} bytes "
+            f"in {time.perf_counter() - start:.3f}s."
+        )
+        return result
+
+    def __map_parent_tasks(self, fn) -> [object]:
+        parent_tasks = self.task_item.parent_tasks or []
+        if not parent_tasks:
+            return []
+
+        max_workers = min(len(parent_tasks), self.datastore_max_concurrency)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(fn, parent_tasks))
 
     def __get_parent_tasks_outputs(self) -> [object]:
         logger.info(f"Loading parent task outputs from datastore.")
-        parent_results = []
-        for parent_task in self.task_item.parent_tasks:
-            parent_results.append(self.__get_parent_task_result_from_s3(parent_task))
-        return parent_results
+        with self.metrics.phase(TaskPhase.DOWNLOAD):
+            outputs = self.__map_parent_tasks(self.__get_parent_task_result_from_s3)
+        if self.local_cache is not None:
+            self.local_cache.log_stats()
+        return outputs
+
+    def __get_task_fingerprint(self) -> str:
+        parent_digests = self.__map_parent_tasks(self.__get_parent_task_result_digest)
+        return ResultCache.fingerprint(self.task.code_hash, parent_digests)
+
+    def __save_task_digest(self, key: str, digest: str) -> None:
+        self.s3_client.put_object(Bucket=self.datastore, Key=get_digest_key(key), Body=digest.encode())
+
+    def __upload_object(self, obj: object, key: str) -> (str, str):
+        serializer = serializers.for_object(obj)
+        with MultipartUploadWriter(
+            self.s3_client,
+            self.datastore,
+            key,
+            part_size=self.datastore_part_size,
+            concurrency=self.datastore_upload_concurrency,
+            metadata={FORMAT_METADATA_KEY: serializer.name}
+        ) as writer:
+            with self.metrics.serialization():
+                serializer.dump(obj, writer)
+        self.metrics.add_output_bytes_written(writer.bytes_written)
+        return serializer.name, writer.sha256
+
+    def __save_task_output(self, ret, key: str) -> (str, str):
+        """
+        Uploads the result and the sha256 digest of its content, returns the format and the digest.
+        """
+        logger.info(f"Saving task output to datastore as {key}.")
+        with self.metrics.phase(TaskPhase.UPLOAD):
+            output_format, digest = self.__upload_object(ret, key)
+            self.__save_task_digest(key, digest)
+        return output_format, digest
+
+    def __save_output_items(self, task_item: TaskModel, ret, output_length: int) -> None:
+        """
+        Uploads every item of an output that is mapped over as the result of the shard reading it, so shards
+        don't download the whole output to keep one item. The output is stored whole as well for other children.
+        """
+        if not output_length:
+            return
+
+        logger.info(f"Saving {output_length} items of task={task_item.task_name} output for its map children.")
+        keys = [
+            self.__get_s3_key_for_task_result(task_item.task_name, task_item.run_id, shard_index)
+            for shard_index in range(output_length)
+        ]
+        with self.metrics.phase(TaskPhase.UPLOAD), ThreadPoolExecutor(
+            max_workers=min(output_length, self.datastore_max_concurrency)
+        ) as pool:
+            list(pool.map(self.__upload_object, (ret[shard_index] for shard_index in range(output_length)), keys))
+
+    def __save_profile(self, profiler) -> None:
+        from .task_profiler import PROFILE_METADATA_KEY
+
+        summary = profiler.summary(PROFILE_TOP_N)
+        logger.info(f"{profiler.profile_type.value} profile of task={self.task.name}:\n{summary}")
+        if self.local:
+            return
+
+        prefix = get_task_prefix(os.environ['FLOW'], self.flow_id, self.task.name, self.run_id, self.shard_index)
+        with MultipartUploadWriter(
+            self.s3_client,
+            self.datastore,
+            f"{prefix}/profile",
+            part_size=self.datastore_part_size,
+            concurrency=self.datastore_upload_concurrency,
+            metadata={PROFILE_METADATA_KEY: profiler.profile_type.value}
+        ) as writer:
+            profiler.dump(writer)
+        self.s3_client.put_object(
+            Bucket=self.datastore,
+            Key=f"{prefix}/profile.txt",
+            Body=summary.encode(),
+            ContentType="text/plain",
+            Metadata={PROFILE_METADATA_KEY: profiler.profile_type.value}
+        )
+        logger.info(f"Saved {profiler.profile_type.value} profile of task={self.task.name} under {prefix}.")
 
-    def __save_task_output(self, ret) -> None:
-        logger.info(f"Saving task={self.task.name} output to datastore for run_id={self.__run_id}.")
-        pickle_buffer = pickle.dumps(ret)
-        self.s3_resource.Object(self.datastore, self.task_object).put(Body=pickle_buffer)
+    def __execute_task_function(self, args: [object]) -> object:
+        if self.profile is None:
+            return self.task.function(*args)
+
+        # Profilers are only imported when asked for, unprofiled tasks call their function directly.
+        from .task_profiler import create_profiler
+        profiler = create_profiler(self.profile)
+        try:
+            return profiler.runcall(self.task.function, *args)
+        finally:
+            # A profile that cannot be saved must not fail the task or hide the error it raised.
+            try:
+                self.__save_profile(profiler)
+            except Exception:
+                logger.exception(f"Failed to save the {self.profile} profile of task={self.task.name}.")
+
+    def __execute_fused_tasks(self, ret: object) -> (object, [TaskModel]):
+        """
+        Runs the linear chain fused into this task, handing results over in memory.
+        """
+        fused_items = []
+        for fused_task in self.task_item.fused_tasks or []:
+            logger.info(f"Executing fused task={fused_task.task_name}")
+            fused_item = TaskModel.get(fused_task.task_name, fused_task.run_id)
+            if not self.local:
+                fused_item.update_task_status(TaskStatus.PROGRESS)
+            try:
+                ret = getattr(self.__flow_class, fused_task.task_name)(compile=True).function(ret)
+            except Exception:
+                if not self.local:
+                    fused_item.update_task_status(TaskStatus.FAILED)
+                raise
+            fused_items.append(fused_item)
+        return ret, fused_items
+
+    @staticmethod
+    def __get_output_length(task_item: TaskModel, ret: object) -> int:
+        """
+        Number of shards of the map children of the task, None when no child maps over its output.
+        """
+        if not task_item.has_map_child:
+            return None
+        return get_mapped_over_length(task_item.task_name, ret)
+
+    @staticmethod
+    def __record_output_length(task_item: TaskModel, output_length: int) -> None:
+        if output_length is not None:
+            task_item.update_output_length(output_length)
+
+    def __link_cached_result(self, fingerprint: str) -> bool:
+        metadata = self.result_cache.link(fingerprint, self.task_object)
+        if metadata is None:
+            return False
+
+        # Children read the digest of the result and map children its length, as if the task had run.
+        self.__save_task_digest(self.task_object, metadata[ResultCache.DIGEST_METADATA_KEY])
+        if ResultCache.OUTPUT_LENGTH_METADATA_KEY in metadata:
+            output_length = int(metadata[ResultCache.OUTPUT_LENGTH_METADATA_KEY])
+            # Only the whole output is cached, its items are split again for the map children.
+            if self.task_item.has_map_child:
+                ret, _ = self.__load_object(self.task_object)
+                self.__save_output_items(self.task_item, ret, output_length)
+            self.__record_output_length(self.task_item, output_length)
+        return True
+
+    def __cache_result(self, fingerprint: str, output_format: str, digest: str, output_length: int) -> None:
+        metadata = {FORMAT_METADATA_KEY: output_format, ResultCache.DIGEST_METADATA_KEY: digest}
+        if output_length is not None:
+            metadata[ResultCache.OUTPUT_LENGTH_METADATA_KEY] = str(output_length)
+        self.result_cache.put(fingerprint, self.task_object, metadata)
+
+    def __record_metrics(self, error: Exception = None) -> None:
+        """
+        Logs the metrics of the execution as one json line and writes them to the task item in a single update.
+        Shards of a map task share its item, only their log lines are kept. Failed executions are recorded as well,
+        with the error they raised.
+        """
+        if self.local:
+            return
+
+        self.metrics.finish()
+        logger.info(json.dumps({
+            "event": "task_metrics",
+            "flow_id": self.flow_id,
+            "task": self.task.name,
+            "run_id": self.run_id,
+            "shard_index": self.shard_index,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            **self.metrics.to_json()
+        }))
+        if self.shard_index is None:
+            self.task_item.record_metrics(self.metrics)
 
     def execute_task(self) -> None:
         logger.info(f"Executing task={self.task.name}")
+        self.__metrics = TaskMetrics()
+        try:
+            self.__execute_task()
+        except Exception as error:
+            try:
+                self.__record_metrics(error)
+            except Exception:
+                logger.exception(f"Failed to record the metrics of failed task={self.task.name}.")
+            raise
+        self.__record_metrics()
+
+    def __execute_task(self) -> None:
+        use_cache = self.task.cache and not self.local and not self.task_item.fused_tasks and not self.task.map_over
+        if use_cache:
+            with self.metrics.phase(TaskPhase.FINGERPRINT):
+                fingerprint = self.__get_task_fingerprint()
+                cache_hit = self.__link_cached_result(fingerprint)
+            if cache_hit:
+                self.task_item.record_cache_hit()
+                return
+            self.task_item.record_cache_miss()
+
+        if self.task.map_over:
+            if self.shard_index is None:
+                raise TaskExecutionError(self.task, "Map tasks must be executed with a shard index.")
+            logger.info(f"Executing shard={self.shard_index} of task={self.task.name} over {self.task.map_over}.")
         args = self.__get_parent_tasks_outputs()
-        ret = self.task.function(*args)
+        with self.metrics.phase(TaskPhase.COMPUTE):
+            ret = self.__execute_task_function(args)
+            ret, fused_items = self.__execute_fused_tasks(ret)
         if self.local:
             logger.info(ret)
+            return
+
+        if fused_items:
+            # Only the end of a fused chain has children reading its output.
+            tail = fused_items[-1]
+            output_length = self.__get_output_length(tail, ret)
+            self.__save_task_output(ret, self.__get_s3_key_for_task_result(tail.task_name, tail.run_id))
+            self.__save_output_items(tail, ret, output_length)
+            self.__record_output_length(tail, output_length)
+            for fused_item in fused_items:
+                fused_item.update_task_status(TaskStatus.COMPLETED)
         else:
-            self.__save_task_output(ret)
+            output_length = self.__get_output_length(self.task_item, ret) if self.shard_index is None else None
+            output_format, digest = self.__save_task_output(ret, self.task_object)
+            self.__save_output_items(self.task_item, ret, output_length)
+            self.__record_output_length(self.task_item, output_length)
+            if use_cache:
+                self.__cache_result(fingerprint, output_format, digest, output_length)
 
     def get_task_status(self):
         pass
@@ -0,0 +1,122 @@
+import resource
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from ..constants import TaskPhase
+
+
+def get_peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class TaskMetrics(object):
+    """
+    Timestamps of the phases of one execution of a task and the resources it used. Counters are updated by the
+    threads loading parent outputs concurrently. CPU time and peak RSS are those of the process, which runs a single
+    task in Batch and Lambda.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__started = datetime.utcnow()
+        self.__finished = None
+        self.__cpu_start = time.process_time()
+        self.__cpu_seconds = None
+        self.__peak_rss_bytes = None
+        self.__phases = []
+        self.__parent_bytes_read = 0
+        self.__output_bytes_written = 0
+        self.__serialization_seconds = 0.0
+
+    @property
+    def started(self) -> datetime:
+        return self.__started
+
+    @property
+    def finished(self) -> datetime:
+        return self.__finished
+
+    @property
+    def phases(self) -> [(TaskPhase, datetime, datetime)]:
+        return list(self.__phases)
+
+    @property
+    def parent_bytes_read(self) -> int:
+        return self.__parent_bytes_read
+
+    @property
+    def output_bytes_written(self) -> int:
+        return self.__output_bytes_written
+
+    @property
+    def serialization_seconds(self) -> float:
+        return self.__serialization_seconds
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.__cpu_seconds
+
+    @property
+    def peak_rss_bytes(self) -> int:
+        return self.__peak_rss_bytes
+
+    @contextmanager
+    def phase(self, phase: TaskPhase):
+        started = datetime.utcnow()
+        try:
+            yield
+        finally:
+            self.__phases.append((phase, started, datetime.utcnow()))
+
+    @contextmanager
+    def serialization(self):
+        """
+        Times a serializer call. Streamed objects are read or written while they are (de)serialized, so this
+        includes the transfer time they could not overlap.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.__lock:
+                self.__serialization_seconds += elapsed
+
+    def add_parent_bytes_read(self, size: int) -> None:
+        with self.__lock:
+            self.__parent_bytes_read += size
+
+    def add_output_bytes_written(self, size: int) -> None:
+        with self.__lock:
+            self.__output_bytes_written += size
+
+    def finish(self) -> None:
+        self.__finished = datetime.utcnow()
+        self.__cpu_seconds = time.process_time() - self.__cpu_start
+        self.__peak_rss_bytes = get_peak_rss_bytes()
+
+    def get_phase_seconds(self) -> {str: float}:
+        """
+        Seconds spent in each phase, summed over the times it was entered.
+        """
+        phase_seconds = {}
+        for phase, started, finished in self.phases:
+            phase_seconds[phase.value] = phase_seconds.get(phase.value, 0.0) + (finished - started).total_seconds()
+        return phase_seconds
+
+    def to_json(self) -> dict:
+        return {
+            "started": self.started.isoformat(),
+            "finished": self.finished.isoformat() if self.finished else None,
+            "phases": self.get_phase_seconds(),
+            "parent_bytes_read": self.parent_bytes_read,
+            "output_bytes_written": self.output_bytes_written,
+            "serialization_seconds": self.serialization_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_bytes": self.peak_rss_bytes
+        }
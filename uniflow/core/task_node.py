@@ -1,4 +1,5 @@
 from .abstract_node import AbstractNode
+from ..constants import JobPriority
 
 
 class TaskNode(AbstractNode):
@@ -7,6 +8,9 @@ class TaskNode(AbstractNode):
         super().__init__()
         self.__task = task
         self.__run_id = None
+        self.__priority = None
+        self.__fused_into = None
+        self.__fused_tasks = []
 
     @property
     def name(self) -> str:
@@ -20,8 +24,37 @@ class TaskNode(AbstractNode):
     def run_id(self) -> str:
         return self.__run_id
 
-    def update_task_run_id(self, run_id: str) -> dict:
-        self.__run_id = run_id
+    @property
+    def priority(self) -> JobPriority:
+        return self.__priority or self.__task.priority
 
+    def assign_priority(self, priority: JobPriority) -> None:
+        self.__priority = priority
+
+    @property
+    def fused_into(self) -> object:
+        return self.__fused_into
 
+    @property
+    def fused_tasks(self) -> [object]:
+        return self.__fused_tasks
+
+    def update_task_run_id(self, run_id: str) -> dict:
+        self.__run_id = run_id
 
+    def fuse(self, nodes: [object]) -> None:
+        for node in nodes:
+            node.__fused_into = self
+        self.__fused_tasks = nodes
+
+    def to_json(self) -> dict:
+        return {
+            **super().to_json(),
+            "dependencies": self.task.dependencies,
+            "compute": self.task.compute,
+            "map_over": self.task.map_over,
+            "priority": self.priority.name if self.priority else None,
+            "fuse": self.task.fuse,
+            "fused_into": self.fused_into.name if self.fused_into else None,
+            "fused_tasks": [node.name for node in self.fused_tasks]
+        }
@@ -0,0 +1,97 @@
+import cProfile
+import io
+import marshal
+import pickle
+import pstats
+import tracemalloc
+
+from ..constants import ProfileType
+
+PROFILE_METADATA_KEY = "uniflow-profile"
+MEGABYTE = 1024 ** 2
+
+
+class TaskProfiler(object):
+    """
+    Profiles one call of a task function. The raw profile is written in the format of the standard library, so a
+    downloaded profile opens with pstats or tracemalloc.Snapshot.load.
+    """
+
+    profile_type = None
+
+    def runcall(self, function, *args) -> object:
+        raise NotImplementedError
+
+    def dump(self, stream) -> None:
+        raise NotImplementedError
+
+    def summary(self, top: int) -> str:
+        raise NotImplementedError
+
+
+class CpuProfiler(TaskProfiler):
+
+    profile_type = ProfileType.CPU
+
+    def __init__(self) -> None:
+        self.__stats = None
+
+    def runcall(self, function, *args) -> object:
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function, *args)
+        finally:
+            self.__stats = pstats.Stats(profiler)
+
+    def dump(self, stream) -> None:
+        marshal.dump(self.__stats.stats, stream)
+
+    def summary(self, top: int) -> str:
+        output = io.StringIO()
+        self.__stats.stream = output
+        self.__stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        return output.getvalue()
+
+
+class MemoryProfiler(TaskProfiler):
+    """
+    Traces allocations of the call. The snapshot holds the memory still allocated when the call returned, the peak
+    is reported next to it.
+    """
+
+    profile_type = ProfileType.MEMORY
+    TRACEBACK_FRAMES = 10
+
+    def __init__(self) -> None:
+        self.__snapshot = None
+        self.__peak_bytes = None
+
+    def runcall(self, function, *args) -> object:
+        tracemalloc.start(self.TRACEBACK_FRAMES)
+        try:
+            return function(*args)
+        finally:
+            self.__peak_bytes = tracemalloc.get_traced_memory()[1]
+            self.__snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def dump(self, stream) -> None:
+        pickle.dump(self.__snapshot, stream, pickle.HIGHEST_PROTOCOL)
+
+    def summary(self, top: int) -> str:
+        statistics = self.__snapshot.statistics('lineno')
+        lines = [
+            f"Peak traced memory: {self.__peak_bytes / MEGABYTE:.1f} MiB",
+            f"Allocated when the task returned: {sum(stat.size for stat in statistics) / MEGABYTE:.1f} MiB",
+            ""
+        ]
+        return "\n".join(lines + [str(stat) for stat in statistics[:top]]) + "\n"
+
+
+_PROFILERS = {profiler.profile_type.value: profiler for profiler in (CpuProfiler, MemoryProfiler)}
+
+
+def create_profiler(profile: str) -> TaskProfiler:
+    if profile not in _PROFILERS:
+        raise ValueError(f"Unknown profile {profile}, expected one of {sorted(_PROFILERS)}.")
+    return _PROFILERS[profile]()
@@ -0,0 +1,52 @@
+from ..constants import JobPriority
+
+
+class TaskSpec(object):
+    """
+    Task read back from a task graph artifact. It carries everything needed to schedule the task but not its
+    function, so loading it never imports the flow code.
+    """
+
+    def __init__(self, name: str, dependencies: [str], compute: str, priority: str, map_over: str = None,
+                 fuse: bool = False) -> None:
+        self.__name = name
+        self.__dependencies = dependencies
+        self.__compute = compute
+        self.__priority = JobPriority[priority]
+        self.__map_over = map_over
+        self.__fuse = fuse
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def dependencies(self) -> [str]:
+        return self.__dependencies
+
+    @property
+    def compute(self) -> str:
+        return self.__compute
+
+    @property
+    def priority(self) -> JobPriority:
+        return self.__priority
+
+    @property
+    def map_over(self) -> str:
+        return self.__map_over
+
+    @property
+    def fuse(self) -> bool:
+        return self.__fuse
+
+    @classmethod
+    def from_json(cls, task_json: dict) -> object:
+        return cls(
+            name=task_json["name"],
+            dependencies=task_json["dependencies"],
+            compute=task_json["compute"],
+            priority=task_json["priority"],
+            map_over=task_json["map_over"],
+            fuse=task_json["fuse"]
+        )
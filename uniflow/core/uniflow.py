@@ -3,7 +3,9 @@ import logging
 
 from pathlib import Path
 from typing import Generator, Callable
-from ..utils import get_methods_with_decorator, get_python_path
+from ..utils import get_python_path
+from ..constants import STATUS_POLL_INITIAL_SECONDS, STATUS_POLL_MAX_SECONDS, STATUS_POLL_BACKOFF, STREAM_BATCH_SIZE, \
+    STREAM_PARALLELIZATION_FACTOR, STREAM_MAX_CONCURRENCY
 
 
 logger = logging.getLogger(__name__)
@@ -11,6 +13,40 @@ logger = logging.getLogger(__name__)
 
 class Uniflow(object):
 
+    # Run single parent/single child chains of tasks with the same compute settings as one job.
+    fuse_tasks = False
+
+    # Backoff of the state machine while parents of a task are pending, tasks are normally started only once their
+    # parents completed so this only applies to tasks started early.
+    status_poll_initial_seconds = STATUS_POLL_INITIAL_SECONDS
+    status_poll_max_seconds = STATUS_POLL_MAX_SECONDS
+    status_poll_backoff = STATUS_POLL_BACKOFF
+
+    # Compile the task graph into one state machine per flow instead of starting each task from the task table.
+    compile_state_machine = False
+
+    # Batching and concurrency of the handlers of the task and flow table streams.
+    stream_batch_size = STREAM_BATCH_SIZE
+    stream_parallelization_factor = STREAM_PARALLELIZATION_FACTOR
+    stream_max_concurrency = STREAM_MAX_CONCURRENCY
+
+    # Tasks by name, registered when the flow class is created.
+    __tasks = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        from ..decorators.task import Task  # avoid circular import task -> uniflow -> task
+
+        super().__init_subclass__(**kwargs)
+        # Resolve names like attribute lookup does, so tasks of every base are kept and overrides win.
+        tasks = {}
+        for klass in reversed(cls.__mro__):
+            for name, attribute in vars(klass).items():
+                if isinstance(attribute, Task):
+                    tasks[name] = attribute
+                elif name in tasks:
+                    del tasks[name]
+        cls.__tasks = tasks
+
     def __init__(self) -> None:
         from aws_cdk import core
         from ..stacks.uniflow_stack import UniflowStack
@@ -21,8 +57,22 @@ class Uniflow(object):
         """
 
         super().__init__()
+        self.task_graph = self.generate_task_graph()
         self.app = core.App(outdir=Path.cwd().joinpath("cdk.out").as_posix())
-        self.stack = UniflowStack(self.app, self.__class__.__name__, self.code_dir, get_python_path(self))
+        self.stack = UniflowStack(
+            self.app,
+            self.__class__.__name__,
+            self.code_dir,
+            get_python_path(self),
+            task_graph=self.task_graph,
+            status_poll_initial_seconds=self.status_poll_initial_seconds,
+            status_poll_max_seconds=self.status_poll_max_seconds,
+            status_poll_backoff=self.status_poll_backoff,
+            compile_state_machine=self.compile_state_machine,
+            stream_batch_size=self.stream_batch_size,
+            stream_parallelization_factor=self.stream_parallelization_factor,
+            stream_max_concurrency=self.stream_max_concurrency
+        )
 
     @property
     def code_dir(self) -> Path:
@@ -30,7 +80,7 @@ class Uniflow(object):
 
     @classmethod
     def list_task_name(cls):
-        return list(get_methods_with_decorator(cls, "task"))
+        return list(cls.__tasks.keys())
 
     @classmethod
     def compile_and_list_tasks(cls) -> Generator[Callable, None, None]:
@@ -45,8 +95,7 @@ class Uniflow(object):
     def generate_task_graph(cls) -> None:
         from .unigraph import Unigraph  # avoid circular import task -> uniflow -> unigraph -> task
         tasks = cls.compile_and_list_tasks()
-        return Unigraph(tasks)
+        return Unigraph(tasks, fuse=cls.fuse_tasks)
 
     def build(self) -> None:
-        self.generate_task_graph()
         self.app.synth()
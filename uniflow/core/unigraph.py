@@ -1,12 +1,22 @@
+import json
+
+from functools import lru_cache
+from pathlib import Path
 from ..decorators.task import Task
 from .task_node import TaskNode
+from .task_spec import TaskSpec
 from .abstract_node import AbstractNode
+from ..constants import JobPriority
 
 
 class Unigraph(object):
 
-    def __init__(self, tasks: [Task]) -> None:
+    # Slack, in tasks, off the critical path up to which a task with automatic priority gets each job priority.
+    PRIORITY_SLACK = [(0, JobPriority.HIGH), (1, JobPriority.MEDIUM)]
+
+    def __init__(self, tasks: [Task], fuse: bool = False) -> None:
         self.__tasks = tasks
+        self.__fuse = fuse
         self.__init_nodes()
         self.__build__graph()
 
@@ -27,10 +37,67 @@ class Unigraph(object):
     def to_json(self):
         return [node.to_json() for node in self.nodes]
 
+    def dump(self, path: Path) -> None:
+        """
+        Writes the validated graph in topological order, so it can be loaded without importing the flow.
+        """
+        graph_json = {
+            "fuse": self.__fuse,
+            "tasks": [{**node.to_json(), "depth": self.__depths[node]} for node in self.__topological_order]
+        }
+        with open(path, "w") as file:
+            json.dump(graph_json, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> object:
+        with open(path) as file:
+            graph_json = json.load(file)
+        graph = cls.__new__(cls)
+        graph.__restore(graph_json)
+        return graph
+
+    def __restore(self, graph_json: dict) -> None:
+        """
+        Rebuilds a graph written by dump, trusting its validation, order and fusion instead of computing them again.
+        """
+        self.__fuse = graph_json["fuse"]
+        self.__tasks = [TaskSpec.from_json(task_json) for task_json in graph_json["tasks"]]
+        self.__init_nodes()
+        self.__topological_order = list(self.__nodes.values())
+        self.__depths = {}
+        for task_json in graph_json["tasks"]:
+            node = self.__nodes[task_json["name"]]
+            self.__depths[node] = task_json["depth"]
+            for parent_name in task_json["parents"]:
+                node.add_parent(self.__nodes[parent_name])
+            for child_name in task_json["children"]:
+                node.add_child(self.__nodes[child_name])
+            if task_json["fused_tasks"]:
+                node.fuse([self.__nodes[name] for name in task_json["fused_tasks"]])
+
+    @property
+    def topological_order(self) -> [AbstractNode]:
+        return list(self.__topological_order)
+
+    @property
+    def levels(self) -> [[AbstractNode]]:
+        """
+        Nodes grouped by depth, the length of the longest path from a source. Nodes of a level only depend on
+        nodes of earlier levels.
+        """
+        levels = [[] for _ in range(max(self.__depths.values(), default=-1) + 1)]
+        for node in self.__topological_order:
+            levels[self.__depths[node]].append(node)
+        return levels
+
+    def get_depth(self, node_name: str) -> int:
+        return self.__depths[self.__nodes[node_name]]
 
     def __update_node_relationships(self):
         for key, node in self.__nodes.items():
             for parent_name in node.task.dependencies:
+                if parent_name not in self.__nodes:
+                    raise Exception(f"Task {key} depends on unknown task {parent_name}")
                 parent = self.__nodes[parent_name]
                 node.add_parent(parent)
                 parent.add_child(node)
@@ -42,40 +109,109 @@ class Unigraph(object):
                 edge_nodes.append(node)
         return edge_nodes
 
-    def __check_for_cycle(self, node: AbstractNode, visitation_map: {str: bool}, visited_from: AbstractNode) -> None:
-        if visitation_map[node.name] and visitation_map[visited_from.name] == node.name:
-            raise Exception(f"Found cycle at node {node.name}")
-
-        visitation_map[node.name] = visited_from.name
-
-        for child in node.children:
-            self.__check_for_cycle(child, visitation_map, node)
+    def __find_cycle(self, remaining_parents: {AbstractNode: int}) -> [str]:
+        """
+        Every node left with unprocessed parents has one of them left as well, walking up those parents from
+        any of them must come back to a node already on the path.
+        """
+        node = next(node for node, count in remaining_parents.items() if count > 0)
+        path = []
+        positions = {}
+        while node not in positions:
+            positions[node] = len(path)
+            path.append(node.name)
+            node = next(parent for parent in node.parents if remaining_parents[parent] > 0)
+        cycle = path[positions[node]:]
+        return list(reversed(cycle)) + [cycle[-1]]
+
+    def __plan(self):
+        """
+        Validates the graph and orders it in one pass of Kahn's algorithm. A node is ordered once all of its parents
+        are, so nodes left unordered sit on a cycle or downstream of one. Islands, nodes no source reaches, can
+        only be formed by cycles and are reported the same way.
+        """
+        remaining_parents = {node: len(node.parents) for node in self.__nodes.values()}
+        order = self.get_edge_nodes()
+        depths = dict.fromkeys(order, 0)
+        for node in order:
+            child_depth = depths[node] + 1
+            for child in node.children:
+                remaining_parents[child] -= 1
+                if depths.get(child, 0) < child_depth:
+                    depths[child] = child_depth
+                if remaining_parents[child] == 0:
+                    order.append(child)
+
+        if len(order) != len(self.__nodes):
+            blocked = [node.name for node, count in remaining_parents.items() if count > 0]
+            raise Exception(
+                f"Found cycle {' -> '.join(self.__find_cycle(remaining_parents))}, "
+                f"tasks blocked by it: {', '.join(blocked)}"
+            )
+
+        self.__topological_order = order
+        self.__depths = depths
+
+    def __assign_priorities(self):
+        """
+        Tasks with automatic priority get a job priority from their slack, the number of tasks by which the longest
+        path through them is shorter than the longest path of the flow. Critical path tasks have no slack.
+        """
+        auto_priority_nodes = [node for node in self.__topological_order if node.task.priority is None]
+        if not auto_priority_nodes:
+            return
+
+        height = {}
+        for node in reversed(self.__topological_order):
+            height[node] = max([height[child] + 1 for child in node.children], default=0)
+
+        critical_path_length = max(self.__depths[node] + height[node] for node in height)
+        for node in auto_priority_nodes:
+            slack = critical_path_length - self.__depths[node] - height[node]
+            priority = next(
+                (priority for max_slack, priority in self.PRIORITY_SLACK if slack <= max_slack),
+                JobPriority.LOW
+            )
+            node.assign_priority(priority)
+
+    def __can_fuse(self, node: TaskNode, child: TaskNode) -> bool:
+        if not (self.__fuse or (node.task.fuse and child.task.fuse)):
+            return False
+        if len(node.children) != 1 or len(child.parents) != 1:
+            return False
+        if node.task.compute != child.task.compute or node.priority != child.priority:
+            return False
+        # Results are cached per task, a fused chain only stores the output of its last task.
+        if node.task.cache or child.task.cache:
+            return False
+        return not (node.task.map_over or child.task.map_over)
+
+    def __fuse_linear_chains(self):
+        for node in self.__topological_order:
+            if node.has_parent and self.__can_fuse(node.parents[0], node):
+                continue
+
+            chain = []
+            current = node
+            while current.has_children and self.__can_fuse(current, current.children[0]):
+                current = current.children[0]
+                chain.append(current)
+
+            if chain:
+                node.fuse(chain)
 
-    def __check_for_cycles(self):
-        for edge_node in self.get_edge_nodes():
-            visitation_map = {}
-            for key, node in self.__nodes.items():
-                visitation_map[key] = None
-            self.__check_for_cycle(edge_node, visitation_map, edge_node)
-
-    def __dfs(self, node: AbstractNode, visitation_map: {str: bool}) -> None:
-        visitation_map[node.name] = True
-        for child in node.children:
-            self.__dfs(child, visitation_map)
-
-    def __check_for_islands(self):
-        visitation_map = {}
-        for key, node in self.__nodes.items():
-            visitation_map[key] = False
-
-        for edge_node in self.get_edge_nodes():
-            self.__dfs(edge_node, visitation_map)
-
-        for node_name, visited in visitation_map.items():
-            if not visited:
-                raise Exception(f"Found island at {node_name}")
+    @property
+    def fused_chains(self) -> [[TaskNode]]:
+        return [[node] + node.fused_tasks for node in self.nodes if node.fused_tasks]
 
     def __build__graph(self):
         self.__update_node_relationships()
-        self.__check_for_cycles()
-        self.__check_for_islands()
+        self.__plan()
+        self.__assign_priorities()
+        self.__fuse_linear_chains()
+
+
+@lru_cache(maxsize=None)
+def load_task_graph(path: str) -> Unigraph:
+    # Written by uniflow build, loading it keeps the flow code and its dependencies out of the handlers and the api.
+    return Unigraph.load(path)
@@ -0,0 +1,14 @@
+def get_task_prefix(flow: str, flow_id: str, task_name: str, run_id: str, shard_index: int = None) -> str:
+    """
+    Prefix of the objects written by one run of a task, or by one shard of a map task.
+    """
+    if shard_index is not None:
+        return f"{flow}/{flow_id}/{task_name}/{run_id}/shards/{shard_index}"
+    return f"{flow}/{flow_id}/{task_name}/{run_id}"
+
+
+def get_digest_key(key: str) -> str:
+    """
+    Key of the sha256 digest stored next to a task result.
+    """
+    return f"{key}.sha256"
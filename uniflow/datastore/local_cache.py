@@ -0,0 +1,129 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalObjectCache(object):
+    """
+    On-disk LRU cache of datastore objects keyed by S3 key and ETag, shared by every process on a host.
+
+    Entries are downloaded to a temporary file without holding any lock and published with an atomic rename,
+    readers hold a shared striped file lock while they read an entry. Eviction runs under a global lock and drops
+    the least recently used entries until the cache fits in its byte budget, taking the striped lock of an entry
+    exclusively before deleting it.
+    """
+
+    LOCK_DIRECTORY = "locks"
+    LOCK_STRIPES = 64
+    TEMP_SUFFIX = ".tmp"
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.__directory = Path(directory)
+        self.__max_bytes = max_bytes
+        self.__stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.__directory.joinpath(self.LOCK_DIRECTORY).mkdir(parents=True, exist_ok=True)
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    def __get_entry_path(self, key: str, etag: str) -> Path:
+        return self.__directory.joinpath(hashlib.sha256(f"{key}:{etag}".encode()).hexdigest())
+
+    def __get_lock_path(self, name: str) -> Path:
+        return self.__directory.joinpath(self.LOCK_DIRECTORY, f"{int(name, 16) % self.LOCK_STRIPES}.lock")
+
+    @contextmanager
+    def __locked(self, lock_path: Path, operation: int = fcntl.LOCK_EX):
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __record(self, hit: bool, size: int) -> None:
+        with self.__stats_lock:
+            if hit:
+                self.hits += 1
+                self.bytes_saved += size
+            else:
+                self.misses += 1
+
+    def __download(self, entry: Path, download) -> None:
+        temp_path = entry.with_name(f"{entry.name}.{uuid4().hex}{self.TEMP_SUFFIX}")
+        try:
+            with open(temp_path, 'wb') as file:
+                download(file)
+            with self.__locked(self.__get_lock_path(entry.name)):
+                os.replace(temp_path, entry)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    @contextmanager
+    def fetch(self, key: str, etag: str, size: int, download):
+        """
+        Yields the local path of the object, calling download(file) to fill the cache on a miss. The entry is not
+        evicted before the block exits, the object has to be read inside it.
+        """
+        entry = self.__get_entry_path(key, etag)
+        hit = True
+        while True:
+            with self.__locked(self.__get_lock_path(entry.name), fcntl.LOCK_SH):
+                if entry.exists():
+                    os.utime(entry)
+                    self.__record(hit, size)
+                    yield entry
+                    return
+
+            # Another process may publish the same entry meanwhile, the last rename wins with identical content.
+            hit = False
+            self.__download(entry, download)
+            self.evict(keep=entry)
+
+    def __list_entries(self) -> [(Path, os.stat_result)]:
+        entries = []
+        for path in self.__directory.iterdir():
+            if path.name == self.LOCK_DIRECTORY or path.name.endswith(self.TEMP_SUFFIX):
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self, keep: Path = None) -> None:
+        with self.__locked(self.__directory.joinpath(self.LOCK_DIRECTORY, "evict.lock")):
+            entries = sorted(self.__list_entries(), key=lambda entry: entry[1].st_mtime)
+            total_bytes = sum(stat.st_size for _, stat in entries)
+            for path, stat in entries:
+                if total_bytes <= self.__max_bytes:
+                    break
+                if path == keep:
+                    continue
+                logger.info(f"Evicting {path.name} of {stat.st_size} bytes from local cache.")
+                with self.__locked(self.__get_lock_path(path.name)):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                total_bytes -= stat.st_size
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"Local cache {self.__directory.as_posix()} hits={self.hits} misses={self.misses} "
+            f"bytes_saved={self.bytes_saved}."
+        )
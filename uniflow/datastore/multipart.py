@@ -0,0 +1,154 @@
+import hashlib
+import io
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+class MultipartUploadWriter(io.RawIOBase):
+    """
+    Writable stream that uploads to S3 in fixed size parts while data is being written. At most `concurrency`
+    parts are in flight, so peak memory is bounded by part_size * (concurrency + 1) whatever the object size.
+    Objects smaller than a single part are sent with one put_object call. A sha256 digest of the content is computed
+    on the way, unlike the ETag it does not depend on the part size.
+
+    Used as a context manager the upload is completed on a clean exit and aborted when an exception is raised.
+    """
+
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, s3_client, bucket: str, key: str, part_size: int, concurrency: int,
+                 metadata: {str: str} = None) -> None:
+        super().__init__()
+        if part_size < self.MIN_PART_SIZE:
+            raise ValueError(f"Part size must be at least {self.MIN_PART_SIZE} bytes, got {part_size}.")
+
+        self.__s3_client = s3_client
+        self.__bucket = bucket
+        self.__key = key
+        self.__part_size = part_size
+        self.__metadata = metadata or {}
+        self.__buffer = bytearray()
+        self.__bytes_written = 0
+        self.__sha256 = hashlib.sha256()
+        self.__upload_id = None
+        self.__parts = []
+        self.__slots = threading.BoundedSemaphore(concurrency)
+        self.__pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    @property
+    def bytes_written(self) -> int:
+        return self.__bytes_written
+
+    @property
+    def sha256(self) -> str:
+        return self.__sha256.hexdigest()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed upload")
+
+        view = memoryview(data).cast('B')
+        self.__sha256.update(view)
+        offset = 0
+        while offset < len(view):
+            size = min(self.__part_size - len(self.__buffer), len(view) - offset)
+            self.__buffer += view[offset:offset + size]
+            offset += size
+            if len(self.__buffer) == self.__part_size:
+                self.__submit_part()
+
+        self.__bytes_written += len(view)
+        return len(view)
+
+    def __upload_part(self, part_number: int, body: bytearray) -> dict:
+        try:
+            response = self.__s3_client.upload_part(
+                Bucket=self.__bucket,
+                Key=self.__key,
+                UploadId=self.__upload_id,
+                PartNumber=part_number,
+                Body=body
+            )
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        finally:
+            self.__slots.release()
+
+    def __raise_for_failed_parts(self) -> None:
+        for part in self.__parts:
+            if part.done() and part.exception() is not None:
+                raise part.exception()
+
+    def __submit_part(self) -> None:
+        if self.__upload_id is None:
+            response = self.__s3_client.create_multipart_upload(
+                Bucket=self.__bucket,
+                Key=self.__key,
+                Metadata=self.__metadata
+            )
+            self.__upload_id = response['UploadId']
+            logger.info(f"Started multipart upload of {self.__key} with part_size={self.__part_size}.")
+
+        self.__raise_for_failed_parts()
+        self.__slots.acquire()
+        body, self.__buffer = self.__buffer, bytearray()
+        self.__parts.append(self.__pool.submit(self.__upload_part, len(self.__parts) + 1, body))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        try:
+            if self.__upload_id is None:
+                self.__s3_client.put_object(
+                    Bucket=self.__bucket,
+                    Key=self.__key,
+                    Body=self.__buffer,
+                    Metadata=self.__metadata
+                )
+            else:
+                if self.__buffer:
+                    self.__submit_part()
+                parts = [part.result() for part in self.__parts]
+                self.__s3_client.complete_multipart_upload(
+                    Bucket=self.__bucket,
+                    Key=self.__key,
+                    UploadId=self.__upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+                logger.info(f"Completed multipart upload of {self.__key} in {len(parts)} parts.")
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.__pool.shutdown()
+            self.__buffer = bytearray()
+            super().close()
+
+    def abort(self) -> None:
+        if self.closed:
+            return
+
+        self.__pool.shutdown()
+        self.__buffer = bytearray()
+        if self.__upload_id is not None:
+            logger.warning(f"Aborting multipart upload of {self.__key}.")
+            self.__s3_client.abort_multipart_upload(
+                Bucket=self.__bucket,
+                Key=self.__key,
+                UploadId=self.__upload_id
+            )
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
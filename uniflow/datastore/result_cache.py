@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import random
+
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from ..constants import RESULT_CACHE_EVICTION_PROBABILITY
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache(object):
+    """
+    Memoizes task results in the datastore under a fingerprint of the task code and the content of its inputs.
+    The sha256 digests stored next to the parent results are used as their content hashes, so a lookup never
+    downloads the inputs. Entries keep the digest of the result and its length in their metadata.
+    """
+
+    DELETE_BATCH_SIZE = 1000
+    DIGEST_METADATA_KEY = "uniflow-sha256"
+    OUTPUT_LENGTH_METADATA_KEY = "uniflow-output-length"
+
+    def __init__(self, s3_client, bucket: str, prefix: str, max_bytes: int, max_age: int,
+                 eviction_probability: float = RESULT_CACHE_EVICTION_PROBABILITY) -> None:
+        self.__s3_client = s3_client
+        self.__bucket = bucket
+        self.__prefix = prefix.rstrip("/")
+        self.__max_bytes = max_bytes
+        self.__max_age = max_age
+        self.__eviction_probability = eviction_probability
+
+    @staticmethod
+    def fingerprint(code_hash: str, parent_digests: [str]) -> str:
+        digest = hashlib.sha256(code_hash.encode())
+        for parent_digest in parent_digests:
+            digest.update(parent_digest.encode())
+        return digest.hexdigest()
+
+    def __get_key(self, fingerprint: str) -> str:
+        return f"{self.__prefix}/{fingerprint}/result"
+
+    def __head(self, key: str) -> dict:
+        try:
+            return self.__s3_client.head_object(Bucket=self.__bucket, Key=key)
+        except ClientError as error:
+            if error.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
+
+    def __is_valid(self, response: dict) -> bool:
+        if response is None or self.DIGEST_METADATA_KEY not in response['Metadata']:
+            return False
+        # Expired entries are misses even before they are evicted.
+        return response['LastModified'] >= datetime.now(timezone.utc) - timedelta(seconds=self.__max_age)
+
+    def __copy(self, source_key: str, destination_key: str, metadata: {str: str} = None) -> None:
+        self.__s3_client.copy(
+            CopySource={'Bucket': self.__bucket, 'Key': source_key},
+            Bucket=self.__bucket,
+            Key=destination_key,
+            ExtraArgs=None if metadata is None else {'MetadataDirective': 'REPLACE', 'Metadata': metadata}
+        )
+
+    def link(self, fingerprint: str, destination_key: str) -> {str: str}:
+        """
+        Copies the cached result to destination_key and returns the metadata of the entry, None on a miss.
+        """
+        cache_key = self.__get_key(fingerprint)
+        response = self.__head(cache_key)
+        if not self.__is_valid(response):
+            logger.info(f"Result cache miss for fingerprint={fingerprint}.")
+            return None
+
+        logger.info(f"Result cache hit for fingerprint={fingerprint}, linking {cache_key} to {destination_key}.")
+        self.__copy(cache_key, destination_key)
+        return response['Metadata']
+
+    def put(self, fingerprint: str, source_key: str, metadata: {str: str}) -> None:
+        cache_key = self.__get_key(fingerprint)
+        logger.info(f"Caching {source_key} as {cache_key}.")
+        self.__copy(source_key, cache_key, metadata)
+        if random.random() < self.__eviction_probability:
+            self.evict()
+
+    def __list_entries(self) -> [dict]:
+        entries = []
+        paginator = self.__s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.__bucket, Prefix=f"{self.__prefix}/"):
+            entries.extend(page.get('Contents', []))
+        return entries
+
+    def __delete(self, entries: [dict]) -> None:
+        for start in range(0, len(entries), self.DELETE_BATCH_SIZE):
+            batch = entries[start:start + self.DELETE_BATCH_SIZE]
+            self.__s3_client.delete_objects(
+                Bucket=self.__bucket,
+                Delete={'Objects': [{'Key': entry['Key']} for entry in batch], 'Quiet': True}
+            )
+
+    def evict(self) -> None:
+        entries = sorted(self.__list_entries(), key=lambda entry: entry['LastModified'])
+        expires_before = datetime.now(timezone.utc) - timedelta(seconds=self.__max_age)
+
+        evicted = [entry for entry in entries if entry['LastModified'] < expires_before]
+        retained = [entry for entry in entries if entry['LastModified'] >= expires_before]
+
+        total_bytes = sum(entry['Size'] for entry in retained)
+        while retained and total_bytes > self.__max_bytes:
+            entry = retained.pop(0)
+            total_bytes -= entry['Size']
+            evicted.append(entry)
+
+        if evicted:
+            logger.info(f"Evicting {len(evicted)} entries from result cache {self.__prefix}.")
+            self.__delete(evicted)
@@ -0,0 +1,115 @@
+import collections
+import pickle
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FORMAT_METADATA_KEY = "uniflow-format"
+
+
+class Serializer(object):
+
+    name = None
+    supports_mmap = False
+
+    def can_serialize(self, obj: object) -> bool:
+        return True
+
+    def dump(self, obj: object, stream) -> None:
+        raise NotImplementedError
+
+    def load(self, stream) -> object:
+        raise NotImplementedError
+
+    def load_file(self, path: str, mmap_mode: str = None) -> object:
+        with open(path, 'rb') as stream:
+            return self.load(stream)
+
+
+class PickleSerializer(Serializer):
+
+    name = "pickle"
+
+    def dump(self, obj: object, stream) -> None:
+        pickle.dump(obj, stream, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, stream) -> object:
+        return pickle.load(stream)
+
+
+class NumpySerializer(Serializer):
+    """
+    Stores arrays in the native .npy format. Arrays are read straight into their final buffer and local files can
+    be memory mapped instead of being read at all.
+    """
+
+    name = "npy"
+    supports_mmap = True
+
+    def can_serialize(self, obj: object) -> bool:
+        return not obj.dtype.hasobject
+
+    def dump(self, obj: object, stream) -> None:
+        np.save(stream, obj, allow_pickle=False)
+
+    def load(self, stream) -> object:
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+        else:
+            raise Exception(f"Unsupported npy format version {version}!")
+
+        array = np.empty(int(np.prod(shape)), dtype=dtype)
+        # A byte view of the array, buffers of datetime64 and timedelta64 arrays cannot be cast to bytes.
+        buffer = memoryview(array.view(np.uint8))
+        offset = 0
+        while offset < len(buffer):
+            read = stream.readinto(buffer[offset:])
+            if not read:
+                raise EOFError(f"Expected {len(buffer)} bytes of array data, found {offset}.")
+            offset += read
+        return array.reshape(shape, order='F' if fortran_order else 'C')
+
+    def load_file(self, path: str, mmap_mode: str = None) -> object:
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+
+class SerializerRegistry(object):
+
+    def __init__(self, default: Serializer) -> None:
+        self.__default = default
+        self.__serializers_by_type = collections.OrderedDict()
+        self.__serializers_by_name = {default.name: default}
+
+    @property
+    def default(self) -> Serializer:
+        return self.__default
+
+    def register(self, output_type: type, serializer: Serializer) -> None:
+        self.__serializers_by_type[output_type] = serializer
+        self.__serializers_by_name[serializer.name] = serializer
+
+    def for_object(self, obj: object) -> Serializer:
+        # Subclasses carry state the registered format may not keep, a masked array would lose its mask.
+        serializer = self.__serializers_by_type.get(type(obj))
+        if serializer is not None and serializer.can_serialize(obj):
+            return serializer
+        return self.__default
+
+    def for_format(self, name: str = None) -> Serializer:
+        if name is None:
+            return self.__default
+        if name not in self.__serializers_by_name:
+            raise Exception(f"No serializer registered for format {name}!")
+        return self.__serializers_by_name[name]
+
+
+serializers = SerializerRegistry(PickleSerializer())
+
+if np is not None:
+    serializers.register(np.ndarray, NumpySerializer())
@@ -0,0 +1,30 @@
+import io
+
+
+class StreamingBodyReader(io.RawIOBase):
+    """
+    Exposes a botocore StreamingBody as a raw binary stream so it can be wrapped in an io.BufferedReader and
+    consumed incrementally by deserializers, without reading the whole object into memory first.
+    """
+
+    def __init__(self, body) -> None:
+        super().__init__()
+        self.__body = body
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self.__body.read(len(buffer))
+        size = len(chunk)
+        buffer[:size] = chunk
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.__body.close()
+        super().close()
+
+
+def open_streaming_body(body, buffer_size: int = io.DEFAULT_BUFFER_SIZE) -> io.BufferedReader:
+    return io.BufferedReader(StreamingBodyReader(body), buffer_size=buffer_size)
@@ -1,8 +1,11 @@
+import hashlib
+import json
 import logging
 
-from ..core.uniflow import Uniflow
+from types import CodeType
 from ..exceptions.errors import TaskDefinitionError, TaskExecutionError, TaskCompilationError
-from ..constants import DecoratorMode, JobPriority
+from ..constants import AUTO_PRIORITY, ComputeType, DecoratorMode, JobPriority, ProfileType, RESULT_CACHE_MAX_BYTES, \
+    RESULT_CACHE_MAX_AGE
 
 
 logger = logging.getLogger(__name__)
@@ -10,11 +13,19 @@ logger = logging.getLogger(__name__)
 
 class Task(object):
 
-    def __init__(self, f=None, compute="batch", depends_on=[]):
+    def __init__(self, f=None, compute="batch", depends_on=[], cache=False,
+                 cache_max_bytes=RESULT_CACHE_MAX_BYTES, cache_max_age=RESULT_CACHE_MAX_AGE, fuse=False, map_over=None,
+                 priority="high", profile=None):
         self.__f = f
-        self.compute = compute
-        self.__priority = JobPriority.HIGH
+        self.__compute = compute
+        self.__priority = priority.name if isinstance(priority, JobPriority) else priority
         self.__depends_on = depends_on
+        self.__fuse = fuse
+        self.__map_over = map_over
+        self.__cache = cache
+        self.__cache_max_bytes = cache_max_bytes
+        self.__cache_max_age = cache_max_age
+        self.__profile = profile
         self.__parents = []
         self.__children = []
 
@@ -30,7 +41,72 @@ class Task(object):
     def function(self):
         return self.__f
 
+    @property
+    def compute(self) -> str:
+        return self.__compute
+
+    @property
+    def priority(self) -> JobPriority:
+        """
+        Job priority requested by the task, None when the graph assigns it from the critical path.
+        """
+        if self.__priority.lower() == AUTO_PRIORITY:
+            return None
+        return JobPriority[self.__priority.upper()]
+
+    @property
+    def fuse(self) -> bool:
+        return self.__fuse
+
+    @property
+    def map_over(self) -> str:
+        """
+        Name of the parent task whose output is split into shards, the task runs once per shard.
+        """
+        return self.__map_over
+
+    @property
+    def cache(self) -> bool:
+        return self.__cache
+
+    @property
+    def cache_max_bytes(self) -> int:
+        return self.__cache_max_bytes
+
+    @property
+    def cache_max_age(self) -> int:
+        return self.__cache_max_age
+
+    @property
+    def profile(self) -> str:
+        """
+        Profiler wrapped around every execution of the task, cpu or memory, None when it is not profiled.
+        """
+        return self.__profile
+
+    @property
+    def code_hash(self) -> str:
+        """
+        Hash of the task bytecode and declared dependencies. Bytecode is used instead of source so the hash
+        is available even when only compiled modules are shipped.
+        """
+        digest = hashlib.sha256()
+        self.__update_digest_with_code(digest, self.__f.__code__)
+        digest.update(json.dumps(self.dependencies).encode())
+        return digest.hexdigest()
+
+    def __update_digest_with_code(self, digest, code: CodeType) -> None:
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode())
+        for const in code.co_consts:
+            if isinstance(const, CodeType):
+                self.__update_digest_with_code(digest, const)
+            else:
+                digest.update(repr(const).encode())
+
     def __infer_decorator_operation_mode_from_args(self, obj: object, *args: [object], **kwargs: {str: object}):
+        from ..core.uniflow import Uniflow  # only needed to run tasks, handlers loading the task graph skip it
+
         is_instance_of_uniflow = (len(args) > 0 and isinstance(args[0], Uniflow)) or \
                                  (obj and isinstance(obj, Uniflow))
         should_compile = kwargs.pop('compile', False)
@@ -46,7 +122,7 @@ class Task(object):
         else:
             raise TaskDefinitionError(self)
 
-    def __get_decorator(self, obj: object = None):
+    def __get_decorator(self, obj: object = None, objtype: type = None):
 
         self.__validate_dependency()
 
@@ -58,20 +134,30 @@ class Task(object):
                 return self.__compile()
             elif op_mode == DecoratorMode.EXECUTION:
                 from ..core.task_manager import TaskManager
-                return TaskManager(self, **kwargs)
+                return TaskManager(self, flow_class=objtype, **kwargs)
 
         return wrapped_f
 
-    def __get__(self, obj: Uniflow, objtype: object = None):
-        return self.__get_decorator(obj)
+    def __get__(self, obj: object, objtype: object = None):
+        return self.__get_decorator(obj, objtype)
 
     def __call__(self, f):
         self.__f = f
-        return self.__get_decorator()
+        self.__validate_dependency()
+        # Stay on the flow class as a descriptor, so tasks are always accessed through __get__ with the flow class.
+        return self
 
     def __validate_dependency(self):
         if self.__depends_on and self.name in self.__depends_on:
             raise TaskDefinitionError(self, "Task cannot depend on itself.")
+        if self.__map_over and self.__map_over not in self.__depends_on:
+            raise TaskDefinitionError(self, "Task can only map over the output of a task it depends on.")
+        if self.__compute not in [compute_type.value for compute_type in ComputeType]:
+            raise TaskDefinitionError(self, f"Unknown compute {self.__compute}.")
+        if self.__priority.upper() not in JobPriority.__members__ and self.__priority.lower() != AUTO_PRIORITY:
+            raise TaskDefinitionError(self, f"Unknown priority {self.__priority}.")
+        if self.__profile is not None and self.__profile not in [profile_type.value for profile_type in ProfileType]:
+            raise TaskDefinitionError(self, f"Unknown profile {self.__profile}.")
 
     def __compile(self):
         print(f"Compiling task {self.name}")
@@ -1,9 +1,24 @@
-from .task_table_event_handler import TaskTableEventHandler
-from .flow_table_event_handler import FlowTableEventHandler
-from .task_record_handler import TaskRecordHandler
+import importlib
+
+
+# Handlers read their configuration from the environment at import time and every Lambda only sets the
+# environment of its own handler, so handlers are imported when first accessed.
+_HANDLER_MODULES = {
+    'TaskTableEventHandler': '.task_table_event_handler',
+    'FlowTableEventHandler': '.flow_table_event_handler',
+    'TaskRecordHandler': '.task_record_handler',
+    'TaskExecutorHandler': '.task_executor_handler'
+}
+
+
+def __getattr__(name: str) -> type:
+    if name not in _HANDLER_MODULES:
+        raise AttributeError(f"module {__name__} has no attribute {name}")
+    return getattr(importlib.import_module(_HANDLER_MODULES[name], __name__), name)
 
 
 __all__ = [
     'TaskTableEventHandler',
-    'FlowTableEventHandler'
+    'FlowTableEventHandler',
+    'TaskExecutorHandler'
 ]
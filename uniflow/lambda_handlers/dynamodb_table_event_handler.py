@@ -1,9 +1,17 @@
+import os
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
+from ..constants import STREAM_MAX_CONCURRENCY
+
 logger = logging.getLogger(__name__)
 
 
 class DynamodbTableEventHandler(object):
+    """
+    Processes a batch of stream records. Records of the same item are processed in order, records of different items
+    concurrently. Failed records are reported with their sequence number so Lambda only retries from the first one.
+    """
 
     def __init__(self, event: dict, context: dict) -> None:
         logger.info(f"Event: {event}")
@@ -15,5 +23,41 @@ class DynamodbTableEventHandler(object):
     def records(self):
         return self.__event['Records']
 
-    def execute(self) -> None:
+    @property
+    def max_concurrency(self) -> int:
+        return int(os.getenv('FLOW_STREAM_MAX_CONCURRENCY', STREAM_MAX_CONCURRENCY))
+
+    def get_record_key(self, record: dict) -> tuple:
+        return tuple(sorted((name, *value.values()) for name, value in record['dynamodb']['Keys'].items()))
+
+    def process_record(self, record: dict) -> None:
         raise NotImplementedError
+
+    def __process_records(self, records: [dict]) -> dict:
+        """
+        Returns the first record that failed, later records of the item are retried with it to keep their order.
+        """
+        for record in records:
+            try:
+                self.process_record(record)
+            except Exception:
+                logger.exception(f"Failed to process record {record['eventID']}.")
+                return record
+        return None
+
+    def execute(self) -> dict:
+        records_by_key = {}
+        for record in self.records:
+            records_by_key.setdefault(self.get_record_key(record), []).append(record)
+
+        max_workers = max(1, min(len(records_by_key), self.max_concurrency))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="StreamRecordProcessor") as executor:
+            failed_records = [
+                record for record in executor.map(self.__process_records, records_by_key.values()) if record
+            ]
+
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": record['dynamodb']['SequenceNumber']} for record in failed_records
+            ]
+        }
@@ -1,11 +1,15 @@
 import os
+import json
 import logging
-from ..utils import get_flow_class_from_flow
+
+from ..core.unigraph import load_task_graph
+from ..clients import get_client
 from ..models.task_model import TaskModel
 
 logger = logging.getLogger(__name__)
 
-FlowClass = get_flow_class_from_flow(os.environ['FLOW_NAME'])
+# Set when the flow is compiled into a single state machine, which then creates the tasks itself.
+FLOW_STATE_MACHINE_ARN = os.environ.get('FLOW_STATE_MACHINE_ARN')
 
 
 class FlowRecordHander(object):
@@ -22,13 +26,16 @@ class FlowRecordHander(object):
         return self.__record['dynamodb']['Keys']['FlowId']['S']
 
     def process(self) -> None:
-        if self.event_type == 'INSERT':
-            task_graph = FlowClass.generate_task_graph()
-            node_and_task_tuple = []
-            for node in task_graph.nodes:
-                task = TaskModel.create_new_task_for_flow(self.flow_id, node)
-                node.update_task_run_id(task.run_id)
-                node_and_task_tuple.append((node, task))
-
-            for (node, task) in node_and_task_tuple:
-                task.update_run_ids(node)
+        if self.event_type != 'INSERT':
+            return
+
+        if FLOW_STATE_MACHINE_ARN:
+            get_client('stepfunctions').start_execution(
+                stateMachineArn=FLOW_STATE_MACHINE_ARN,
+                name=self.flow_id,
+                input=json.dumps({"flow_id": self.flow_id})
+            )
+            logger.info(f"Started flow {self.flow_id}.")
+        else:
+            tasks = TaskModel.create_tasks_for_flow(self.flow_id, load_task_graph(os.environ['FLOW_TASK_GRAPH']))
+            logger.info(f"Created {len(tasks)} tasks for flow {self.flow_id}.")
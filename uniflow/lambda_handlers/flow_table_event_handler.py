@@ -3,6 +3,8 @@ from .flow_record_handler import FlowRecordHander
 
 
 class FlowTableEventHandler(DynamodbTableEventHandler):
-    def execute(self) -> None:
-        for record in self.records:
-            FlowRecordHander(record).process()
+    def get_record_key(self, record: dict) -> tuple:
+        return (record['dynamodb']['Keys']['FlowId']['S'],)
+
+    def process_record(self, record: dict) -> None:
+        FlowRecordHander(record).process()
@@ -0,0 +1,38 @@
+import os
+import logging
+from ..utils import get_flow_class_from_flow
+
+logger = logging.getLogger(__name__)
+
+
+class TaskExecutorHandler(object):
+    """
+    Executes a task declared with compute="lambda" inside the invoking Lambda instead of a Batch container.
+    """
+
+    def __init__(self, event: dict, context: dict) -> None:
+        logger.info(f"Event: {event}")
+        logger.info(f"Context: {context}")
+        self.__event = event
+        self.__context = context
+
+    @property
+    def task_name(self) -> str:
+        return self.__event['task_name']
+
+    @property
+    def flow_id(self) -> str:
+        return self.__event['flow_id']
+
+    @property
+    def run_id(self) -> str:
+        return self.__event['run_id']
+
+    def execute(self) -> dict:
+        flow_class = get_flow_class_from_flow(os.environ['FLOW'])
+        task_manager = getattr(flow_class, self.task_name)(flow_id=self.flow_id, run_id=self.run_id)
+        task_manager.execute_task()
+        return {
+            'task_name': self.task_name,
+            'run_id': self.run_id
+        }
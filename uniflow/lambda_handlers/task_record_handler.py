@@ -1,17 +1,15 @@
-import boto3
 import os
 import logging
 import json
-from ..utils import get_flow_class_from_flow
+from botocore.exceptions import ClientError
+from ..clients import get_client
 from ..models.task_model import TaskModel
 from ..constants import TaskStatus
 
 logger = logging.getLogger(__name__)
 
-FLOW_CLASS = get_flow_class_from_flow(os.environ['FLOW_NAME'])
 STATE_MACHINE_ARN = os.environ['TASK_EXECUTATION_STATE_MACHINE_ARN']
 REGION = os.environ['AWS_REGION']
-sfn_client = boto3.client('stepfunctions')
 
 
 class TaskRecordHandler(object):
@@ -33,43 +31,70 @@ class TaskRecordHandler(object):
     @property
     def task_name(self) -> str:
         return self.__record['dynamodb']['NewImage']['TaskName']['S']
-        
 
     @property
     def execution_name(self) -> str:
-        return f"{self.task_name}_{self.flow_id.split('-')[0]}_{self.run_id.split('-')[0]}"
+        return self.__get_execution_name(self.task_name, self.run_id)
 
     @property
     def sfn_input(self) -> dict:
+        return self.__get_sfn_input(self.task_name, self.run_id)
+
+    def __get_sfn_input(self, task_name: str, run_id: str) -> dict:
         return {
             "flow_id": self.flow_id,
-            "run_id": self.run_id,
-            "task_name": self.task_name
+            "run_id": run_id,
+            "task_name": task_name
         }
 
-    def process(self) -> None:
-        invoke_task_execution = False
-        task = TaskModel.get_from_sfn_input(self.sfn_input)
-        if self.event_type == 'INSERT' and task.parent_status == TaskStatus.COMPLETED.name:
-            invoke_task_execution = True
-        elif self.event_type == 'MODIFY':
-            for child in task.child_tasks:
-                if child.run_id:
-                    child_task = TaskModel.get(child.task_name, child.run_id)
-                    child_task.update_parent_task_status(task)
-
-            for parent in task.parent_tasks:
-                if  parent.run_id:
-                    parent_task = TaskModel.get( parent.task_name,  parent.run_id)
-                    parent_task.update_child_task_status(task)
-
-            if task.status == TaskStatus.CREATED.name and task.parent_status == TaskStatus.COMPLETED.name:
-                invoke_task_execution = True
-    
-        if invoke_task_execution:
-            task.update_task_status(TaskStatus.PROGRESS)
-            sfn_client.start_execution(
+    def __get_execution_name(self, task_name: str, run_id: str) -> str:
+        return f"{task_name}_{self.flow_id.split('-')[0]}_{run_id.split('-')[0]}"
+
+    def __start_task_execution(self, task: TaskModel) -> None:
+        if task.fused_into:
+            logger.info(f"Task {task.task_name} is executed by the job of fused task {task.fused_into}.")
+            return
+
+        if not task.claim_execution():
+            logger.info(f"Task {task.task_name} was already started or is not ready.")
+            return
+
+        try:
+            get_client('stepfunctions').start_execution(
                 stateMachineArn=STATE_MACHINE_ARN,
-                name=self.execution_name,
-                input=json.dumps(self.sfn_input)
+                name=self.__get_execution_name(task.task_name, task.run_id),
+                input=json.dumps(self.__get_sfn_input(task.task_name, task.run_id))
             )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ExecutionAlreadyExists':
+                logger.info(f"Execution of task {task.task_name} already exists.")
+                return
+            task.release_execution()
+            raise
+
+    def __complete_child_tasks(self, task: TaskModel) -> None:
+        """
+        Counts this task as completed on each child with a single conditional update, which also loads the child.
+        Children are only started once all of their parents are counted, a redelivered completion starts a child
+        that a previous attempt counted but failed to start.
+        """
+        for child in task.child_tasks or []:
+            child_task = TaskModel(task_name=child.task_name, run_id=child.run_id)
+            if child_task.complete_parent(task.run_id):
+                self.__start_task_execution(child_task)
+
+    def process(self) -> None:
+        old_image = self.__record['dynamodb'].get('OldImage')
+        new_image = self.__record['dynamodb'].get('NewImage')
+        if new_image is None:
+            return
+        # Only status changes start tasks, counting completed parents or saving outputs does not change it.
+        if old_image and old_image.get('Status') == new_image.get('Status'):
+            return
+
+        # The stream image holds the whole item, no need to read it again.
+        task = TaskModel.from_raw_data(self.__record['dynamodb']['NewImage'])
+        if self.event_type == 'INSERT' and task.parent_status == TaskStatus.COMPLETED.name:
+            self.__start_task_execution(task)
+        elif self.event_type == 'MODIFY' and task.status == TaskStatus.COMPLETED.name:
+            self.__complete_child_tasks(task)
@@ -3,6 +3,5 @@ from .task_record_handler import TaskRecordHandler
 
 
 class TaskTableEventHandler(DynamodbTableEventHandler):
-    def execute(self):
-        for record in self.records:
-            TaskRecordHandler(record).process()
+    def process_record(self, record: dict) -> None:
+        TaskRecordHandler(record).process()
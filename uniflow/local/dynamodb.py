@@ -0,0 +1,298 @@
+import copy
+import threading
+
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from pynamodb.exceptions import PutError, UpdateError, DeleteError
+from pynamodb.expressions.condition import Condition
+from pynamodb.expressions.operand import Path, Value, _Increment, _Decrement, _IfNotExists, _ListAppend
+from pynamodb.expressions.update import SetAction, RemoveAction, AddAction
+
+
+class InMemoryTableConnection(object):
+    """
+    Thread safe stand-in for the pynamodb TableConnection of a model, to exercise model code without DynamoDB.
+    Install it with `Model._connection = InMemoryTableConnection(Model)`.
+
+    Items are kept in their serialized form. Every write appends a record shaped like a DynamoDB stream record
+    with NEW_AND_OLD_IMAGES to `records`, and each call is counted in `calls` by DynamoDB operation name.
+    """
+
+    def __init__(self, model: type) -> None:
+        attributes = model.get_attributes()
+        self.__hash_key_name = attributes[model._hash_keyname].attr_name
+        self.__range_key_name = attributes[model._range_keyname].attr_name if model._range_keyname else None
+        self.__index_key_names = self.__get_index_key_names(model)
+        self.__lock = threading.RLock()
+        self.__items = {}
+        self.__listeners = []
+        self.calls = {}
+        self.records = []
+
+    @property
+    def items(self) -> [dict]:
+        with self.__lock:
+            return copy.deepcopy(list(self.__items.values()))
+
+    @staticmethod
+    def __get_index_key_names(model: type) -> {str: (str, str)}:
+        model._get_indexes()
+        index_key_names = {}
+        for index_name, index in model._index_classes.items():
+            attributes = index._get_attributes().values()
+            index_key_names[index_name] = (
+                next(attribute.attr_name for attribute in attributes if attribute.is_hash_key),
+                next((attribute.attr_name for attribute in attributes if attribute.is_range_key), None)
+            )
+        return index_key_names
+
+    def add_listener(self, listener) -> None:
+        """
+        Calls listener(record) after every write, outside of the table lock.
+        """
+        self.__listeners.append(listener)
+
+    def __record_call(self, operation: str) -> None:
+        with self.__lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def __get_key(self, item: dict) -> tuple:
+        range_key = item.get(self.__range_key_name) if self.__range_key_name else None
+        return self.__to_python(item[self.__hash_key_name]), self.__to_python(range_key) if range_key else None
+
+    def __get_key_attributes(self, hash_key, range_key) -> dict:
+        key = {self.__hash_key_name: {'S': hash_key}}
+        if self.__range_key_name:
+            key[self.__range_key_name] = {'S': range_key}
+        return key
+
+    def __emit(self, records: [dict]) -> None:
+        for record in records:
+            for listener in self.__listeners:
+                listener(record)
+
+    def __write(self, key: tuple, old_item: dict, new_item: dict) -> dict:
+        if new_item is None:
+            self.__items.pop(key, None)
+            event_name = 'REMOVE'
+        else:
+            self.__items[key] = new_item
+            event_name = 'MODIFY' if old_item else 'INSERT'
+
+        image = new_item or old_item
+        dynamodb = {
+            'Keys': {
+                name: image[name] for name in (self.__hash_key_name, self.__range_key_name) if name in image
+            },
+            'SequenceNumber': str(len(self.records))
+        }
+        if new_item is not None:
+            dynamodb['NewImage'] = copy.deepcopy(new_item)
+        if old_item is not None:
+            dynamodb['OldImage'] = copy.deepcopy(old_item)
+
+        record = {
+            'eventID': str(len(self.records)),
+            'eventName': event_name,
+            'eventSource': 'aws:dynamodb',
+            'dynamodb': dynamodb
+        }
+        self.records.append(record)
+        return record
+
+    @staticmethod
+    def __conditional_check_failed(operation: str) -> ClientError:
+        return ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+            operation
+        )
+
+    @staticmethod
+    def __to_python(value: dict) -> object:
+        if value is None:
+            return None
+        (attr_type, attr_value), = value.items()
+        if attr_type == 'N':
+            return Decimal(attr_value)
+        if attr_type == 'NULL':
+            return None
+        if attr_type in ('SS', 'NS', 'BS'):
+            return set(attr_value)
+        return attr_value
+
+    @staticmethod
+    def __to_number(value: Decimal) -> dict:
+        return {'N': str(value)}
+
+    def __get_path(self, item: dict, path: Path) -> dict:
+        value = {'M': item}
+        for segment in path.path:
+            if value is None or 'M' not in value:
+                return None
+            value = value['M'].get(segment)
+        return value
+
+    def __set_path(self, item: dict, path: Path, value: dict) -> None:
+        for segment in path.path[:-1]:
+            item = item[segment]['M']
+        if value is None:
+            item.pop(path.path[-1], None)
+        else:
+            item[path.path[-1]] = value
+
+    def __evaluate_operand(self, item: dict, operand) -> dict:
+        if isinstance(operand, Value):
+            return operand.value
+        if isinstance(operand, Path):
+            return self.__get_path(item, operand)
+        if isinstance(operand, (_Increment, _Decrement)):
+            lhs, rhs = [self.__to_python(self.__evaluate_operand(item, value)) for value in operand.values]
+            return self.__to_number(lhs + rhs if isinstance(operand, _Increment) else lhs - rhs)
+        if isinstance(operand, _IfNotExists):
+            path, default = operand.values
+            return self.__get_path(item, path) or self.__evaluate_operand(item, default)
+        if isinstance(operand, _ListAppend):
+            lhs, rhs = [self.__evaluate_operand(item, value) for value in operand.values]
+            return {'L': lhs['L'] + rhs['L']}
+        raise NotImplementedError(f"Operand {operand} is not supported by the in memory table.")
+
+    def __apply_action(self, item: dict, action) -> None:
+        path = action.values[0]
+        if isinstance(action, SetAction):
+            self.__set_path(item, path, copy.deepcopy(self.__evaluate_operand(item, action.values[1])))
+        elif isinstance(action, RemoveAction):
+            self.__set_path(item, path, None)
+        elif isinstance(action, AddAction):
+            added = self.__evaluate_operand(item, action.values[1])
+            current = self.__get_path(item, path)
+            if 'N' in added:
+                total = (self.__to_python(current) or 0) + self.__to_python(added)
+                self.__set_path(item, path, self.__to_number(total))
+            else:
+                (attr_type, values), = added.items()
+                self.__set_path(item, path, {attr_type: sorted(set(values) | (self.__to_python(current) or set()))})
+        else:
+            raise NotImplementedError(f"Action {action} is not supported by the in memory table.")
+
+    def __matches(self, item: dict, condition: Condition) -> bool:
+        if condition is None:
+            return True
+
+        operator = condition.operator
+        if operator == 'AND':
+            return all(self.__matches(item, value) for value in condition.values)
+        if operator == 'OR':
+            return any(self.__matches(item, value) for value in condition.values)
+        if operator == 'NOT':
+            return not self.__matches(item, condition.values[0])
+        if operator == 'attribute_exists':
+            return self.__get_path(item, condition.values[0]) is not None
+        if operator == 'attribute_not_exists':
+            return self.__get_path(item, condition.values[0]) is None
+
+        values = [self.__to_python(self.__evaluate_operand(item, value)) for value in condition.values]
+        if operator == 'IN':
+            return values[0] in values[1:]
+        if operator == 'BETWEEN':
+            return values[0] is not None and values[1] <= values[0] <= values[2]
+        if operator == 'begins_with':
+            return values[0] is not None and values[0].startswith(values[1])
+        if operator == 'contains':
+            return values[0] is not None and values[1] in values[0]
+        if operator not in ('=', '<>', '<', '<=', '>', '>='):
+            raise NotImplementedError(f"Condition {operator} is not supported by the in memory table.")
+        lhs, rhs = values
+        if operator == '=':
+            return lhs == rhs
+        if operator == '<>':
+            return lhs != rhs
+        if lhs is None or rhs is None:
+            return False
+        return {
+            '<': lhs < rhs,
+            '<=': lhs <= rhs,
+            '>': lhs > rhs,
+            '>=': lhs >= rhs
+        }[operator]
+
+    def get_item(self, hash_key, range_key=None, consistent_read=False, attributes_to_get=None) -> dict:
+        self.__record_call('GetItem')
+        with self.__lock:
+            item = self.__items.get((hash_key, range_key))
+            return {'Item': copy.deepcopy(item)} if item else {}
+
+    def query(self, hash_key, range_key_condition=None, filter_condition=None, index_name=None,
+              scan_index_forward=None, limit=None, **kwargs) -> dict:
+        """
+        Returns the matching items of the table or of one of its indexes in a single page, ordered by range key.
+        """
+        self.__record_call('Query')
+        if index_name:
+            hash_key_name, range_key_name = self.__index_key_names[index_name]
+        else:
+            hash_key_name, range_key_name = self.__hash_key_name, self.__range_key_name
+        with self.__lock:
+            items = [
+                copy.deepcopy(item) for item in self.__items.values()
+                if self.__to_python(item.get(hash_key_name)) == hash_key and
+                self.__matches(item, range_key_condition) and self.__matches(item, filter_condition)
+            ]
+        if range_key_name:
+            items.sort(key=lambda item: self.__to_python(item.get(range_key_name)), reverse=scan_index_forward is False)
+        items = items[:limit]
+        return {'Count': len(items), 'ScannedCount': len(items), 'Items': items}
+
+    def put_item(self, hash_key, range_key=None, attributes=None, condition=None, **kwargs) -> dict:
+        self.__record_call('PutItem')
+        key = (hash_key, range_key)
+        item = {**copy.deepcopy(attributes or {}), **self.__get_key_attributes(hash_key, range_key)}
+        with self.__lock:
+            old_item = self.__items.get(key)
+            if not self.__matches(old_item or {}, condition):
+                raise PutError(cause=self.__conditional_check_failed('PutItem'))
+            record = self.__write(key, old_item, item)
+        self.__emit([record])
+        return {}
+
+    def update_item(self, hash_key, range_key=None, actions=None, condition=None, return_values=None,
+                    **kwargs) -> dict:
+        self.__record_call('UpdateItem')
+        key = (hash_key, range_key)
+        with self.__lock:
+            old_item = self.__items.get(key)
+            if not self.__matches(old_item or {}, condition):
+                raise UpdateError(cause=self.__conditional_check_failed('UpdateItem'))
+            item = copy.deepcopy(old_item) if old_item else self.__get_key_attributes(hash_key, range_key)
+            for action in actions or []:
+                self.__apply_action(item, action)
+            record = self.__write(key, old_item, item)
+        self.__emit([record])
+        return {'Attributes': copy.deepcopy(item)}
+
+    def delete_item(self, hash_key, range_key=None, condition=None, **kwargs) -> dict:
+        self.__record_call('DeleteItem')
+        key = (hash_key, range_key)
+        with self.__lock:
+            old_item = self.__items.get(key)
+            if not self.__matches(old_item or {}, condition):
+                raise DeleteError(cause=self.__conditional_check_failed('DeleteItem'))
+            records = [self.__write(key, old_item, None)] if old_item else []
+        self.__emit(records)
+        return {}
+
+    def batch_write_item(self, put_items=None, delete_items=None, **kwargs) -> dict:
+        self.__record_call('BatchWriteItem')
+        if len(put_items or []) + len(delete_items or []) > 25:
+            raise ValueError("BatchWriteItem accepts at most 25 requests.")
+
+        records = []
+        with self.__lock:
+            for item in put_items or []:
+                key = self.__get_key(item)
+                records.append(self.__write(key, self.__items.get(key), copy.deepcopy(item)))
+            for item in delete_items or []:
+                key = self.__get_key(item)
+                if key in self.__items:
+                    records.append(self.__write(key, self.__items[key], None))
+        self.__emit(records)
+        return {'UnprocessedItems': {}}
@@ -0,0 +1,327 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from ..clients import set_client
+from ..constants import STREAM_BATCH_SIZE, TaskStatus
+from .dynamodb import InMemoryTableConnection
+from .s3 import InMemoryS3Client
+from .stepfunctions import LocalStepFunctionsClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class EmulatorStats(object):
+
+    def __init__(self, flows: int, completed_flows: int, failed_flows: int, tasks: int, transitions: int,
+                 executions: int, stream_records: int, elapsed_seconds: float) -> None:
+        self.__flows = flows
+        self.__completed_flows = completed_flows
+        self.__failed_flows = failed_flows
+        self.__tasks = tasks
+        self.__transitions = transitions
+        self.__executions = executions
+        self.__stream_records = stream_records
+        self.__elapsed_seconds = elapsed_seconds
+
+    @property
+    def flows(self) -> int:
+        return self.__flows
+
+    @property
+    def completed_flows(self) -> int:
+        return self.__completed_flows
+
+    @property
+    def failed_flows(self) -> int:
+        return self.__failed_flows
+
+    @property
+    def tasks(self) -> int:
+        return self.__tasks
+
+    @property
+    def transitions(self) -> int:
+        return self.__transitions
+
+    @property
+    def executions(self) -> int:
+        return self.__executions
+
+    @property
+    def stream_records(self) -> int:
+        return self.__stream_records
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return self.__elapsed_seconds
+
+    @property
+    def flows_per_second(self) -> float:
+        return self.__completed_flows / self.__elapsed_seconds if self.__elapsed_seconds else 0.0
+
+    @property
+    def transitions_per_second(self) -> float:
+        return self.__transitions / self.__elapsed_seconds if self.__elapsed_seconds else 0.0
+
+    def to_json(self) -> dict:
+        return {
+            "flows": self.flows,
+            "completed_flows": self.completed_flows,
+            "failed_flows": self.failed_flows,
+            "tasks": self.tasks,
+            "transitions": self.transitions,
+            "executions": self.executions,
+            "stream_records": self.stream_records,
+            "elapsed_seconds": self.elapsed_seconds,
+            "flows_per_second": self.flows_per_second,
+            "transitions_per_second": self.transitions_per_second
+        }
+
+
+class LocalEmulator(object):
+    """
+    Runs flows through the control plane of the deployed stack in this process. Flows are created in an in memory
+    flow table, the stream records of both tables are delivered in batches to FlowTableEventHandler and
+    TaskTableEventHandler, and the executions they start run the task state machine of UniflowStack with
+    TaskManager against an in memory datastore.
+
+    Models and handlers read their configuration from the environment when imported, the emulator sets it while it
+    is open and imports them afterwards.
+    """
+
+    STATE_MACHINE_ARN = "arn:aws:states:local:000000000000:stateMachine:LocalTaskExecution"
+    DATASTORE = "uniflow-local-datastore"
+
+    def __init__(self, flow_class: type, max_workers: int = None, stream_batch_size: int = STREAM_BATCH_SIZE,
+                 max_stream_retries: int = 3, poll_time_scale: float = 0.0) -> None:
+        self.__flow_class = flow_class
+        self.__max_workers = max_workers
+        self.__stream_batch_size = stream_batch_size
+        self.__max_stream_retries = max_stream_retries
+        # Waits of the state machine for pending parents are multiplied by this, 0 skips them.
+        self.__poll_time_scale = poll_time_scale
+        self.__task_graph = flow_class.generate_task_graph()
+        self.__condition = threading.Condition()
+        self.__streams = {}
+        self.__flows = {}
+        self.__transitions = 0
+        self.__stream_records = 0
+        self.__environment = None
+        self.__connections = None
+        self.__previous_connections = None
+        self.__graph_directory = None
+        self.__sfn_client = None
+        self.__s3_client = None
+        self.__shard_pool = None
+
+    @property
+    def flow(self) -> str:
+        return f"{self.__flow_class.__module__}.{self.__flow_class.__name__}"
+
+    @property
+    def task_table(self) -> InMemoryTableConnection:
+        return self.__connections["task"]
+
+    @property
+    def flow_table(self) -> InMemoryTableConnection:
+        return self.__connections["flow"]
+
+    @property
+    def sfn_client(self) -> LocalStepFunctionsClient:
+        return self.__sfn_client
+
+    @property
+    def s3_client(self) -> InMemoryS3Client:
+        return self.__s3_client
+
+    def __enter__(self) -> object:
+        self.open()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def open(self) -> None:
+        self.__graph_directory = tempfile.TemporaryDirectory()
+        task_graph_path = Path(self.__graph_directory.name).joinpath("task_graph.json")
+        self.__task_graph.dump(task_graph_path)
+
+        environment = {
+            "AWS_REGION": os.environ.get("AWS_REGION", "us-east-1"),
+            "TASK_TABLE": os.environ.get("TASK_TABLE", "LocalTaskTable"),
+            "FLOW_TABLE": os.environ.get("FLOW_TABLE", "LocalFlowTable"),
+            "TASK_EXECUTATION_STATE_MACHINE_ARN": self.STATE_MACHINE_ARN,
+            "FLOW_TASK_GRAPH": task_graph_path.as_posix(),
+            "FLOW": self.flow,
+            "FLOW_DATASTORE": self.DATASTORE,
+            # Every task runs in this process, there is no host cache to share.
+            "FLOW_LOCAL_CACHE_MAX_BYTES": "0"
+        }
+        self.__environment = {name: os.environ.get(name) for name in environment}
+        os.environ.update(environment)
+
+        from ..models.task_model import TaskModel
+        from ..models.flow_model import FlowModel
+
+        self.__connections = {"task": InMemoryTableConnection(TaskModel), "flow": InMemoryTableConnection(FlowModel)}
+        self.__previous_connections = {"task": TaskModel._connection, "flow": FlowModel._connection}
+        TaskModel._connection = self.task_table
+        FlowModel._connection = self.flow_table
+        for name, connection in self.__connections.items():
+            self.__streams[name] = deque()
+            connection.add_listener(lambda record, name=name: self.__on_record(name, record))
+
+        self.__s3_client = InMemoryS3Client()
+        self.__sfn_client = LocalStepFunctionsClient(self.__run_task_state_machine, max_workers=self.__max_workers)
+        self.__sfn_client.add_listener(self.__notify)
+        self.__shard_pool = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="LocalShard")
+        set_client('s3', self.__s3_client)
+        set_client('stepfunctions', self.__sfn_client)
+
+    def close(self) -> None:
+        from ..models.task_model import TaskModel
+        from ..models.flow_model import FlowModel
+
+        self.__sfn_client.shutdown()
+        self.__shard_pool.shutdown(wait=True)
+        set_client('s3', None)
+        set_client('stepfunctions', None)
+        TaskModel._connection = self.__previous_connections["task"]
+        FlowModel._connection = self.__previous_connections["flow"]
+        for name, value in self.__environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self.__graph_directory.cleanup()
+
+    def __notify(self) -> None:
+        with self.__condition:
+            self.__condition.notify_all()
+
+    def __on_record(self, stream: str, record: dict) -> None:
+        with self.__condition:
+            self.__streams[stream].append((record, 0))
+            if stream == "task":
+                self.__count_transition(record)
+            self.__condition.notify_all()
+
+    def __count_transition(self, record: dict) -> None:
+        new_image = record['dynamodb'].get('NewImage')
+        old_image = record['dynamodb'].get('OldImage') or {}
+        if new_image is None or new_image.get('Status') == old_image.get('Status'):
+            return
+
+        self.__transitions += 1
+        flow = self.__flows.setdefault(new_image['FlowId']['S'], {"completed": 0, "failed": 0})
+        status = new_image['Status']['S']
+        if status == TaskStatus.COMPLETED.name:
+            flow["completed"] += 1
+        elif status == TaskStatus.FAILED.name:
+            flow["failed"] += 1
+
+    def __execute_task(self, task_name: str, flow_id: str, run_id: str, shard_index: int = None) -> None:
+        # Same entry point as the batch job and the lambda executor.
+        task_manager = getattr(self.__flow_class, task_name)(flow_id=flow_id, run_id=run_id, shard_index=shard_index)
+        task_manager.execute_task()
+
+    def __run_task_state_machine(self, execution_input: dict) -> None:
+        """
+        Follows the task state machine of UniflowStack: wait for the parents, run the task or its shards, then mark
+        it completed, or failed when anything raised.
+        """
+        from ..models.task_model import TaskModel
+
+        task = TaskModel.get_from_sfn_input(execution_input)
+        try:
+            status = task.get_status()
+            while status['parent_status'] == TaskStatus.PENDING.name:
+                time.sleep(status['wait_seconds'] * self.__poll_time_scale)
+                task.refresh()
+                status = task.get_status(status['attempt'])
+            if status['parent_status'] != TaskStatus.COMPLETED.name:
+                raise Exception(f"Parents of task {task.task_name} are {status['parent_status']}.")
+
+            if status['is_map']:
+                shards = task.prepare_shards()['shards']
+                list(self.__shard_pool.map(
+                    lambda shard_index: self.__execute_task(task.task_name, task.flow_id, task.run_id, int(shard_index)),
+                    shards
+                ))
+            else:
+                self.__execute_task(task.task_name, task.flow_id, task.run_id)
+            task.update_task_status(TaskStatus.COMPLETED)
+        except Exception:
+            logger.exception(f"Task {task.task_name} of flow {task.flow_id} failed.")
+            task.update_task_status(TaskStatus.FAILED)
+
+    def __deliver(self, stream: str, handler_class: type) -> bool:
+        """
+        Delivers the next batch of the stream, the records from the first failure on are delivered again like a
+        Lambda event source retries them.
+        """
+        with self.__condition:
+            batch_size = min(len(self.__streams[stream]), self.__stream_batch_size)
+            batch = [self.__streams[stream].popleft() for _ in range(batch_size)]
+        if not batch:
+            return False
+
+        self.__stream_records += len(batch)
+        response = handler_class({'Records': [record for record, _ in batch]}, None).execute()
+        failures = {failure['itemIdentifier'] for failure in response['batchItemFailures']}
+        if not failures:
+            return True
+
+        first_failure = next(
+            index for index, (record, _) in enumerate(batch) if record['dynamodb']['SequenceNumber'] in failures
+        )
+        retries = [(record, attempts + 1) for record, attempts in batch[first_failure:]]
+        if retries[0][1] > self.__max_stream_retries:
+            raise Exception(f"Stream record {retries[0][0]['eventID']} failed {self.__max_stream_retries} retries.")
+        with self.__condition:
+            self.__streams[stream].extendleft(reversed(retries))
+        return True
+
+    def __is_idle(self) -> bool:
+        return not any(self.__streams.values()) and self.__sfn_client.running == 0
+
+    def run(self, flow_count: int = 1) -> EmulatorStats:
+        """
+        Starts flow_count flows like the rest api does and returns once nothing is left to deliver or execute.
+        """
+        from ..models.flow_model import FlowModel
+        from ..lambda_handlers import FlowTableEventHandler, TaskTableEventHandler
+
+        start = time.perf_counter()
+        transitions, stream_records, executions = self.__transitions, self.__stream_records, self.__sfn_client.executions
+        flow_ids = [FlowModel.create_new_flow().flow_id for _ in range(flow_count)]
+        while True:
+            delivered = self.__deliver("flow", FlowTableEventHandler)
+            delivered = self.__deliver("task", TaskTableEventHandler) or delivered
+            if delivered:
+                continue
+            with self.__condition:
+                if self.__is_idle():
+                    break
+                self.__condition.wait_for(lambda: any(self.__streams.values()) or self.__is_idle())
+        elapsed_seconds = time.perf_counter() - start
+
+        task_count = len(self.__task_graph.nodes)
+        flows = [self.__flows.get(flow_id, {"completed": 0, "failed": 0}) for flow_id in flow_ids]
+        return EmulatorStats(
+            flows=flow_count,
+            completed_flows=sum(1 for flow in flows if flow["completed"] == task_count),
+            failed_flows=sum(1 for flow in flows if flow["failed"]),
+            tasks=task_count * flow_count,
+            transitions=self.__transitions - transitions,
+            executions=self.__sfn_client.executions - executions,
+            stream_records=self.__stream_records - stream_records,
+            elapsed_seconds=elapsed_seconds
+        )
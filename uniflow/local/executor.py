@@ -0,0 +1,136 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from ..constants import ComputeType
+from ..utils import get_flow_class_from_flow, get_mapped_over_length
+
+
+logger = logging.getLogger(__name__)
+
+
+def _execute_task_in_process(flow: str, task_name: str, args: [object]) -> object:
+    """
+    Task functions are bound to the flow class and can't be pickled, workers resolve them by name instead.
+    """
+    flow_class = get_flow_class_from_flow(flow)
+    task = getattr(flow_class, task_name)(compile=True)
+    return task.function(*args)
+
+
+class LocalExecutor(object):
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+    def __init__(self, flow_class: type, max_workers: int = None, executor: str = THREAD) -> None:
+        if executor not in (self.THREAD, self.PROCESS):
+            raise ValueError(f"Unknown executor {executor}, expected one of {self.THREAD} or {self.PROCESS}.")
+
+        self.__flow_class = flow_class
+        self.__max_workers = max_workers
+        self.__executor = executor
+
+    @property
+    def flow(self) -> str:
+        return f"{self.__flow_class.__module__}.{self.__flow_class.__name__}"
+
+    def __create_pool(self):
+        if self.__executor == self.PROCESS:
+            return ProcessPoolExecutor(max_workers=self.__max_workers)
+        return ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="BatchTaskExecutor")
+
+    def __create_lambda_pool(self) -> ThreadPoolExecutor:
+        """
+        Stands in for the Lambda executor, lambda tasks run in this process like they run in the invoked function.
+        """
+        return ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="LambdaTaskExecutor")
+
+    @staticmethod
+    def __runs_on_lambda(node) -> bool:
+        # Shards of map tasks are always submitted as batch jobs.
+        return node.task.compute == ComputeType.LAMBDA.value and not node.task.map_over
+
+    def __submit_call(self, pools: dict, node, args: [object]):
+        if self.__runs_on_lambda(node):
+            return pools[ComputeType.LAMBDA].submit(node.task.function, *args)
+        if self.__executor == self.PROCESS:
+            return pools[ComputeType.BATCH].submit(_execute_task_in_process, self.flow, node.name, args)
+        return pools[ComputeType.BATCH].submit(node.task.function, *args)
+
+    def __submit(self, pools: dict, node, results: {str: object}, futures: dict, shards: {str: list}) -> None:
+        if self.__runs_on_lambda(node):
+            logger.info(f"Submitting task={node.name} to local lambda pool.")
+        else:
+            logger.info(f"Submitting task={node.name} to local {self.__executor} pool.")
+        args = [results[parent_name] for parent_name in node.task.dependencies]
+        if not node.task.map_over:
+            futures[self.__submit_call(pools, node, args)] = (node, None, time.perf_counter())
+            return
+
+        map_over_index = node.task.dependencies.index(node.task.map_over)
+        # Shards index the output they map over by position, like the shards of a deployed flow.
+        items = args[map_over_index]
+        shard_count = get_mapped_over_length(node.task.map_over, items)
+        shards[node.name] = [None] * shard_count
+        for shard_index in range(shard_count):
+            shard_args = list(args)
+            shard_args[map_over_index] = items[shard_index]
+            futures[self.__submit_call(pools, node, shard_args)] = (node, shard_index, time.perf_counter())
+
+    def execute(self) -> {str: object}:
+        task_graph = self.__flow_class.generate_task_graph()
+        remaining_parents = {node.name: len(node.parents) for node in task_graph.nodes}
+        remaining_shards = {}
+        results = {}
+        shards = {}
+        futures = {}
+        completed = []
+
+        with self.__create_pool() as pool, self.__create_lambda_pool() as lambda_pool:
+            pools = {ComputeType.BATCH: pool, ComputeType.LAMBDA: lambda_pool}
+
+            def submit(node):
+                self.__submit(pools, node, results, futures, shards)
+                if node.name in shards:
+                    remaining_shards[node.name] = len(shards[node.name])
+                    if not shards[node.name]:
+                        completed.append(node)
+
+            def complete(node):
+                for child in node.children:
+                    remaining_parents[child.name] -= 1
+                    if remaining_parents[child.name] == 0:
+                        submit(child)
+
+            for node in task_graph.get_edge_nodes():
+                submit(node)
+
+            while futures or completed:
+                while completed:
+                    node = completed.pop()
+                    results[node.name] = shards.pop(node.name)
+                    complete(node)
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node, shard_index, submitted_at = futures.pop(future)
+                    ret = future.result()
+                    if shard_index is None:
+                        logger.info(f"Finished task={node.name} in {time.perf_counter() - submitted_at:.3f}s.")
+                        results[node.name] = ret
+                        complete(node)
+                        continue
+
+                    logger.info(
+                        f"Finished shard={shard_index} of task={node.name} in {time.perf_counter() - submitted_at:.3f}s."
+                    )
+                    shards[node.name][shard_index] = ret
+                    remaining_shards[node.name] -= 1
+                    if remaining_shards[node.name] == 0:
+                        completed.append(node)
+
+        return results
@@ -0,0 +1,172 @@
+import hashlib
+import io
+import threading
+
+from datetime import datetime, timezone
+from uuid import uuid4
+from botocore.exceptions import ClientError
+
+
+class InMemoryStreamingBody(object):
+
+    def __init__(self, data: bytes) -> None:
+        self.__stream = io.BytesIO(data)
+
+    def read(self, amt: int = None) -> bytes:
+        return self.__stream.read(amt)
+
+    def close(self) -> None:
+        self.__stream.close()
+
+
+class InMemoryPaginator(object):
+
+    def __init__(self, method) -> None:
+        self.__method = method
+
+    def paginate(self, **kwargs):
+        yield self.__method(**kwargs)
+
+
+class InMemoryS3Client(object):
+    """
+    Thread safe stand-in for the subset of the boto3 S3 client used by uniflow, to exercise datastore code
+    without AWS.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__objects = {}
+        self.__uploads = {}
+        self.calls = {}
+
+    @property
+    def open_uploads(self) -> int:
+        return len(self.__uploads)
+
+    def __record_call(self, operation: str) -> None:
+        with self.__lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    @staticmethod
+    def __not_found(operation: str, key: str) -> ClientError:
+        return ClientError({'Error': {'Code': 'NoSuchKey', 'Message': f"Key {key} not found"}}, operation)
+
+    @staticmethod
+    def __to_bytes(body) -> bytes:
+        if hasattr(body, 'read'):
+            return body.read()
+        return bytes(body)
+
+    def __store(self, bucket: str, key: str, data: bytes, metadata: dict, etag: str) -> dict:
+        with self.__lock:
+            self.__objects[(bucket, key)] = {
+                'Body': data,
+                'Metadata': dict(metadata or {}),
+                'ETag': etag,
+                'LastModified': datetime.now(timezone.utc)
+            }
+        return {'ETag': etag}
+
+    def __get(self, operation: str, bucket: str, key: str) -> dict:
+        with self.__lock:
+            if (bucket, key) not in self.__objects:
+                raise self.__not_found(operation, key)
+            return self.__objects[(bucket, key)]
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", Metadata: dict = None, **kwargs) -> dict:
+        self.__record_call('PutObject')
+        data = self.__to_bytes(Body)
+        return self.__store(Bucket, Key, data, Metadata, f'"{hashlib.md5(data).hexdigest()}"')
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self.__record_call('GetObject')
+        item = self.__get('GetObject', Bucket, Key)
+        return {
+            'Body': InMemoryStreamingBody(item['Body']),
+            'ContentLength': len(item['Body']),
+            'ETag': item['ETag'],
+            'Metadata': dict(item['Metadata']),
+            'LastModified': item['LastModified']
+        }
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self.__record_call('HeadObject')
+        try:
+            item = self.__get('HeadObject', Bucket, Key)
+        except ClientError:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+        return {
+            'ContentLength': len(item['Body']),
+            'ETag': item['ETag'],
+            'Metadata': dict(item['Metadata']),
+            'LastModified': item['LastModified']
+        }
+
+    def download_fileobj(self, Bucket: str, Key: str, Fileobj, **kwargs) -> None:
+        response = self.get_object(Bucket=Bucket, Key=Key)
+        Fileobj.write(response['Body'].read())
+
+    def copy(self, CopySource: dict, Bucket: str, Key: str, ExtraArgs: dict = None, **kwargs) -> None:
+        self.__record_call('CopyObject')
+        item = self.__get('CopyObject', CopySource['Bucket'], CopySource['Key'])
+        metadata = item['Metadata']
+        if (ExtraArgs or {}).get('MetadataDirective') == 'REPLACE':
+            metadata = ExtraArgs.get('Metadata')
+        self.__store(Bucket, Key, item['Body'], metadata, item['ETag'])
+
+    def delete_objects(self, Bucket: str, Delete: dict, **kwargs) -> dict:
+        self.__record_call('DeleteObjects')
+        with self.__lock:
+            for obj in Delete['Objects']:
+                self.__objects.pop((Bucket, obj['Key']), None)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", **kwargs) -> dict:
+        self.__record_call('ListObjectsV2')
+        with self.__lock:
+            contents = [
+                {'Key': key, 'Size': len(item['Body']), 'ETag': item['ETag'], 'LastModified': item['LastModified']}
+                for (bucket, key), item in sorted(self.__objects.items())
+                if bucket == Bucket and key.startswith(Prefix)
+            ]
+        return {'Contents': contents, 'KeyCount': len(contents), 'IsTruncated': False}
+
+    def get_paginator(self, operation_name: str) -> InMemoryPaginator:
+        return InMemoryPaginator(getattr(self, operation_name))
+
+    def create_multipart_upload(self, Bucket: str, Key: str, Metadata: dict = None, **kwargs) -> dict:
+        self.__record_call('CreateMultipartUpload')
+        upload_id = str(uuid4())
+        with self.__lock:
+            self.__uploads[upload_id] = {'Bucket': Bucket, 'Key': Key, 'Metadata': Metadata, 'Parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body, **kwargs) -> dict:
+        self.__record_call('UploadPart')
+        data = self.__to_bytes(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self.__lock:
+            self.__uploads[UploadId]['Parts'][PartNumber] = (data, etag)
+        return {'ETag': etag}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict,
+                                  **kwargs) -> dict:
+        self.__record_call('CompleteMultipartUpload')
+        with self.__lock:
+            upload = self.__uploads.pop(UploadId)
+        parts = [upload['Parts'][part['PartNumber']] for part in MultipartUpload['Parts']]
+        digest = hashlib.md5(b"".join(bytes.fromhex(etag.strip('"')) for _, etag in parts))
+        return self.__store(
+            Bucket,
+            Key,
+            b"".join(data for data, _ in parts),
+            upload['Metadata'],
+            f'"{digest.hexdigest()}-{len(parts)}"'
+        )
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> dict:
+        self.__record_call('AbortMultipartUpload')
+        with self.__lock:
+            self.__uploads.pop(UploadId, None)
+        return {}
@@ -0,0 +1,64 @@
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+
+class LocalStepFunctionsClient(object):
+    """
+    Thread safe stand-in for the subset of the boto3 Step Functions client used by uniflow. Executions call
+    run_execution(input) on a thread pool instead of running a state machine in AWS.
+    """
+
+    def __init__(self, run_execution, max_workers: int = None) -> None:
+        self.__run_execution = run_execution
+        self.__lock = threading.Lock()
+        self.__listeners = []
+        self.__pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="LocalStateMachine")
+        self.__executions = set()
+        self.__running = 0
+        self.calls = {}
+
+    @property
+    def running(self) -> int:
+        return self.__running
+
+    @property
+    def executions(self) -> int:
+        return len(self.__executions)
+
+    def add_listener(self, listener) -> None:
+        """
+        Calls listener() after every execution finished.
+        """
+        self.__listeners.append(listener)
+
+    def __record_call(self, operation: str) -> None:
+        with self.__lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def __run(self, execution_input: dict) -> None:
+        try:
+            self.__run_execution(execution_input)
+        finally:
+            with self.__lock:
+                self.__running -= 1
+            for listener in self.__listeners:
+                listener()
+
+    def start_execution(self, stateMachineArn: str, name: str, input: str = "{}", **kwargs) -> dict:
+        self.__record_call('StartExecution')
+        with self.__lock:
+            if (stateMachineArn, name) in self.__executions:
+                raise ClientError(
+                    {'Error': {'Code': 'ExecutionAlreadyExists', 'Message': f"Execution {name} already exists"}},
+                    'StartExecution'
+                )
+            self.__executions.add((stateMachineArn, name))
+            self.__running += 1
+        self.__pool.submit(self.__run, json.loads(input))
+        return {'executionArn': f"{stateMachineArn}:{name}"}
+
+    def shutdown(self) -> None:
+        self.__pool.shutdown(wait=True)
@@ -1,16 +1,53 @@
+import math
 import os
 from uuid import uuid4
 from datetime import datetime
 from pynamodb.models import Model
-from pynamodb.attributes import UnicodeAttribute, UTCDateTimeAttribute, ListAttribute, MapAttribute
-from ..constants import TaskStatus
+from pynamodb.attributes import UnicodeAttribute, UTCDateTimeAttribute, ListAttribute, MapAttribute, NumberAttribute, \
+    BooleanAttribute, UnicodeSetAttribute
+from pynamodb.exceptions import UpdateError
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
+from ..constants import ComputeType, JobPriority, TaskStatus, STATUS_POLL_INITIAL_SECONDS, STATUS_POLL_MAX_SECONDS, \
+    STATUS_POLL_BACKOFF
+from ..core.task_metrics import TaskMetrics
 from ..core.task_node import TaskNode
+from ..core.unigraph import Unigraph
 
 
 class TaskAttribute(MapAttribute):
     task_name = UnicodeAttribute(attr_name="TaskName")
     run_id = UnicodeAttribute(attr_name="RunId")
     status = UnicodeAttribute(attr_name="status")
+    is_map = BooleanAttribute(attr_name="IsMap", null=True)
+
+
+def _task_attribute(node: TaskNode, run_ids: {str: str}) -> TaskAttribute:
+    return TaskAttribute(
+        task_name=node.name,
+        run_id=run_ids[node.name],
+        status=TaskStatus.NOT_AVAILABLE.name,
+        is_map=bool(node.task.map_over)
+    )
+
+
+class PhaseAttribute(MapAttribute):
+    name = UnicodeAttribute(attr_name="Name")
+    started = UTCDateTimeAttribute(attr_name="Started")
+    finished = UTCDateTimeAttribute(attr_name="Finished")
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished - self.started).total_seconds()
+
+
+class FlowIdRunIdIndex(GlobalSecondaryIndex):
+
+    class Meta:
+        index_name = "TaskTableGlobalIndexFlowIdRunId"
+        projection = AllProjection()
+
+    flow_id = UnicodeAttribute(hash_key=True, attr_name="FlowId")
+    run_id = UnicodeAttribute(range_key=True, attr_name="RunId")
 
 
 class TaskModel(Model):
@@ -18,6 +55,9 @@ class TaskModel(Model):
     class Meta:
         table_name = os.environ["TASK_TABLE"]
         region = os.environ["AWS_REGION"]
+        # Same as the table of UniflowStack. Queries on flow_id_index describe the indexes through it, which
+        # otherwise requires capacity units.
+        billing_mode = "PAY_PER_REQUEST"
 
     task_name = UnicodeAttribute(hash_key=True, attr_name="TaskName")
     run_id = UnicodeAttribute(range_key=True, attr_name="RunId")
@@ -26,77 +66,255 @@ class TaskModel(Model):
     status = UnicodeAttribute(attr_name="Status")
     parent_tasks = ListAttribute(attr_name="ParentTasks", of=TaskAttribute, null=True)
     child_tasks = ListAttribute(attr_name="ChildTasks", of=TaskAttribute, null=True)
+    remaining_parents = NumberAttribute(attr_name="RemainingParents", null=True)
+    completed_parents = UnicodeSetAttribute(attr_name="CompletedParents", null=True)
+    fused_into = UnicodeAttribute(attr_name="FusedInto", null=True)
+    fused_tasks = ListAttribute(attr_name="FusedTasks", of=TaskAttribute, null=True)
+    compute = UnicodeAttribute(attr_name="Compute", null=True)
+    priority = UnicodeAttribute(attr_name="Priority", null=True)
+    map_over = UnicodeAttribute(attr_name="MapOver", null=True)
+    shard_count = NumberAttribute(attr_name="ShardCount", null=True)
+    output_length = NumberAttribute(attr_name="OutputLength", null=True)
+    cache_hits = NumberAttribute(attr_name="CacheHits", null=True)
+    cache_misses = NumberAttribute(attr_name="CacheMisses", null=True)
+    status_updated = UTCDateTimeAttribute(attr_name="StatusUpdated", null=True)
+    claimed = UTCDateTimeAttribute(attr_name="Claimed", null=True)
+    started = UTCDateTimeAttribute(attr_name="Started", null=True)
+    finished = UTCDateTimeAttribute(attr_name="Finished", null=True)
+    phases = ListAttribute(attr_name="Phases", of=PhaseAttribute, null=True)
+    parent_bytes_read = NumberAttribute(attr_name="ParentBytesRead", null=True)
+    output_bytes_written = NumberAttribute(attr_name="OutputBytesWritten", null=True)
+    serialization_seconds = NumberAttribute(attr_name="SerializationSeconds", null=True)
+    cpu_seconds = NumberAttribute(attr_name="CpuSeconds", null=True)
+    peak_rss_bytes = NumberAttribute(attr_name="PeakRssBytes", null=True)
+    flow_id_index = FlowIdRunIdIndex()
 
     @property
     def parent_status(self) -> str:
-        for parent_task in self.parent_tasks:
-            if parent_task.status != TaskStatus.COMPLETED.name:
-                return TaskStatus.PENDING.name
+        if self.remaining_parents:
+            return TaskStatus.PENDING.name
         return TaskStatus.COMPLETED.name
 
-    def get_status(self) -> dict:
+    @property
+    def has_map_child(self) -> bool:
+        return any(child_task.is_map for child_task in self.child_tasks or [])
+
+    @staticmethod
+    def get_poll_wait_seconds(attempt: int) -> int:
+        initial_seconds = float(os.environ.get("FLOW_STATUS_POLL_INITIAL_SECONDS", STATUS_POLL_INITIAL_SECONDS))
+        max_seconds = float(os.environ.get("FLOW_STATUS_POLL_MAX_SECONDS", STATUS_POLL_MAX_SECONDS))
+        backoff = float(os.environ.get("FLOW_STATUS_POLL_BACKOFF", STATUS_POLL_BACKOFF))
+        if backoff > 1 and initial_seconds > 0:
+            # No need to grow past the cap, backoff ** attempt overflows a float after about a thousand attempts.
+            attempt = min(attempt, math.ceil(math.log(max(max_seconds / initial_seconds, 1), backoff)))
+        return int(max(1, min(initial_seconds * backoff ** attempt, max_seconds)))
+
+    def get_status(self, attempt: int = 0) -> dict:
+        """
+        Status of the task for the state machine. While parents are pending it waits wait_seconds before asking
+        again with the returned attempt.
+        """
         return {
+            'attempt': attempt + 1,
+            'wait_seconds': self.get_poll_wait_seconds(attempt),
             'parent_status': self.parent_status,
-            'status': self.status
+            'status': self.status,
+            'is_map': self.map_over is not None,
+            'compute': self.compute or ComputeType.BATCH.value,
+            'priority': self.priority or JobPriority.HIGH.name
         }
 
+    def prepare_shards(self) -> dict:
+        """
+        Splits a map task into one shard per item of the output it maps over.
+        """
+        parent = next(parent_task for parent_task in self.parent_tasks if parent_task.task_name == self.map_over)
+        parent_item = TaskModel.get(parent.task_name, parent.run_id)
+        # The gathered output of a map task has one item per shard.
+        shard_count = parent_item.shard_count if parent.is_map else parent_item.output_length
+        if shard_count is None:
+            raise Exception(f"Task {parent.task_name} recorded no output length to map {self.task_name} over!")
+        shard_count = int(shard_count)
+        # Shards only log their metrics, the map task starts when its shards are submitted.
+        self.update(actions=[
+            TaskModel.shard_count.set(shard_count),
+            TaskModel.started.set(datetime.utcnow())
+        ])
+        # Batch job parameters are strings.
+        return {'shards': [str(shard_index) for shard_index in range(shard_count)]}
+
     @classmethod
-    def create_new_task_for_flow(cls, flow_id: str, task_node: TaskNode) -> object:
-        now = datetime.utcnow()
-        parent_tasks = [
-            TaskAttribute(task_name=node.name, run_id="", status=TaskStatus.NOT_AVAILABLE.name) for node in task_node.parents
-        ]
-        child_tasks = [
-            TaskAttribute(task_name=node.name, run_id="", status=TaskStatus.NOT_AVAILABLE.name) for node in task_node.children
-        ]
-        new_task = cls(
+    def build_task_for_flow(cls, flow_id: str, task_node: TaskNode, created: datetime, run_ids: {str: str}) -> object:
+        """
+        Builds the complete item of a task, run_ids holds the run id of every node of the graph.
+        """
+        parent_tasks = [_task_attribute(node, run_ids) for node in task_node.parents]
+        child_tasks = [_task_attribute(node, run_ids) for node in task_node.children]
+        fused_tasks = [_task_attribute(node, run_ids) for node in task_node.fused_tasks]
+        return cls(
             task_name=task_node.name,
-            run_id=str(uuid4()),
+            run_id=run_ids[task_node.name],
             flow_id=flow_id,
-            created=now,
+            created=created,
             status=TaskStatus.CREATED.name,
             parent_tasks=parent_tasks,
-            child_tasks=child_tasks
+            child_tasks=child_tasks,
+            remaining_parents=len(parent_tasks),
+            fused_into=task_node.fused_into.name if task_node.fused_into else None,
+            fused_tasks=fused_tasks,
+            compute=task_node.task.compute,
+            priority=task_node.priority.name,
+            map_over=task_node.task.map_over
         )
-        new_task.save()
-        return new_task
-
-    def update_run_ids(self, task_node: TaskNode):
-        for parent in self.parent_tasks:
-            node = task_node.get_parent(parent.task_name)
-            parent.run_id = node.run_id
-
-        for child in self.child_tasks:
-            node = task_node.get_child(child.task_name)
-            child.run_id = node.run_id
 
-        self.update(actions=[
-            TaskModel.parent_tasks.set(self.parent_tasks),
-            TaskModel.child_tasks.set(self.child_tasks)
-        ])
+    @classmethod
+    def create_tasks_for_flow(cls, flow_id: str, task_graph: Unigraph) -> [object]:
+        """
+        Writes the items of every task of the flow with BatchWriteItem, 25 items per request. Items are complete
+        on their first write, and children are written before their parents so a task that starts as soon as it
+        is inserted always finds its children. The task graph is shared by the flows created concurrently, run ids
+        are kept apart from it.
+        """
+        now = datetime.utcnow()
+        run_ids = {node.name: str(uuid4()) for node in task_graph.topological_order}
+        tasks = [
+            cls.build_task_for_flow(flow_id, node, now, run_ids) for node in reversed(task_graph.topological_order)
+        ]
+        with cls.batch_write() as batch:
+            for task in tasks:
+                batch.save(task)
+        return tasks
 
     @classmethod
     def get_from_sfn_input(cls, event: dict) -> object:
         return cls.get(event["task_name"], event["run_id"])
 
+    @classmethod
+    def get_tasks_for_flow(cls, flow_id: str) -> [object]:
+        return list(cls.flow_id_index.query(flow_id))
+
+    @property
+    def queue_seconds(self) -> float:
+        """
+        Time between the claim of the task and the start of its execution. Tasks started by a compiled state
+        machine are never claimed, their wait for their parents is included.
+        """
+        if self.started is None:
+            return None
+        return (self.started - (self.claimed or self.created)).total_seconds()
+
+    @property
+    def run_seconds(self) -> float:
+        if self.started is None or self.finished is None:
+            return None
+        return (self.finished - self.started).total_seconds()
+
+    def get_phase_seconds(self, phase: str) -> float:
+        if self.phases is None:
+            return None
+        return sum(recorded.seconds for recorded in self.phases if recorded.name == phase)
+
     def update_task_status(self, status: TaskStatus) -> None:
         self.update(actions=[
-            TaskModel.status.set(status.name)
+            TaskModel.status.set(status.name),
+            TaskModel.status_updated.set(datetime.utcnow())
         ])
         return status.name
 
-    def update_parent_task_status(self, parent: object) -> None:
-        for task in self.parent_tasks:
-            if task.task_name == parent.task_name and task.run_id == parent.run_id:
-                task.status = parent.status
+    def update_output_length(self, output_length: int) -> None:
+        self.update(actions=[
+            TaskModel.output_length.set(output_length)
+        ])
+
+    def record_cache_hit(self) -> None:
         self.update(actions=[
-            TaskModel.parent_tasks.set(self.parent_tasks)
+            TaskModel.cache_hits.add(1)
         ])
 
-    def update_child_task_status(self, child: object) -> None:
-        for task in self.child_tasks:
-            if task.task_name == child.task_name and task.run_id == child.run_id:
-                task.status = child.status
+    def record_cache_miss(self) -> None:
         self.update(actions=[
-            TaskModel.child_tasks.set(self.child_tasks)
+            TaskModel.cache_misses.add(1)
         ])
+
+    def record_metrics(self, metrics: TaskMetrics) -> None:
+        self.update(actions=[
+            TaskModel.started.set(metrics.started),
+            TaskModel.finished.set(metrics.finished),
+            TaskModel.phases.set([
+                PhaseAttribute(name=phase.value, started=started, finished=finished)
+                for phase, started, finished in metrics.phases
+            ]),
+            TaskModel.parent_bytes_read.set(metrics.parent_bytes_read),
+            TaskModel.output_bytes_written.set(metrics.output_bytes_written),
+            TaskModel.serialization_seconds.set(metrics.serialization_seconds),
+            TaskModel.cpu_seconds.set(metrics.cpu_seconds),
+            TaskModel.peak_rss_bytes.set(metrics.peak_rss_bytes)
+        ])
+
+    def complete_parent(self, parent_run_id: str) -> bool:
+        """
+        Counts a completed parent once, however many times its completion is delivered, and loads the item. Returns
+        True once every parent is counted, for the call that counted the last one and for redelivered completions
+        after it, so a start that failed after the count is retried.
+        """
+        try:
+            self.update(
+                actions=[
+                    TaskModel.remaining_parents.add(-1),
+                    TaskModel.completed_parents.add({parent_run_id})
+                ],
+                # Never create an item through the update when the child does not exist.
+                condition=TaskModel.remaining_parents.exists() & ~TaskModel.completed_parents.contains(parent_run_id)
+            )
+        except UpdateError as e:
+            if e.cause_response_code != "ConditionalCheckFailedException":
+                raise
+            return self.__load_counted_parent(parent_run_id)
+        return self.remaining_parents == 0
+
+    def __load_counted_parent(self, parent_run_id: str) -> bool:
+        """
+        Loads the item of a redelivered completion by adding the parent to its completed set again, which changes
+        nothing. Unlike refresh it works on an item built from its keys only.
+        """
+        try:
+            self.update(
+                actions=[TaskModel.completed_parents.add({parent_run_id})],
+                condition=TaskModel.completed_parents.contains(parent_run_id)
+            )
+        except UpdateError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                return False
+            raise
+        return self.remaining_parents == 0
+
+    def claim_execution(self) -> bool:
+        """
+        Moves the task from CREATED to PROGRESS once its parents completed. Returns True for the single call that
+        claims it, every other caller must not start the task. Fused tasks are run by the job of their chain and
+        are never claimed.
+        """
+        try:
+            self.update(
+                actions=[TaskModel.status.set(TaskStatus.PROGRESS.name), TaskModel.claimed.set(datetime.utcnow())],
+                condition=(TaskModel.status == TaskStatus.CREATED.name) & (TaskModel.remaining_parents == 0) &
+                TaskModel.fused_into.does_not_exist()
+            )
+        except UpdateError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def release_execution(self) -> None:
+        """
+        Gives back a claim whose execution could not be started, so a retry can claim the task again.
+        """
+        try:
+            self.update(
+                actions=[TaskModel.status.set(TaskStatus.CREATED.name)],
+                condition=TaskModel.status == TaskStatus.PROGRESS.name
+            )
+        except UpdateError as e:
+            if e.cause_response_code != "ConditionalCheckFailedException":
+                raise
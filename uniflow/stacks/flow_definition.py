@@ -0,0 +1,319 @@
+from itertools import count
+from typing import Iterator
+from ..constants import ComputeType, JobPriority
+
+
+class FlowDefinition(object):
+    """
+    Amazon States Language definition running a whole flow in one execution.
+
+    Tasks are first created in the task table with CreateTasks, which returns their run ids. Independent
+    subgraphs of the flow run as branches of a Parallel state. Inside a subgraph, a task that every other task
+    depends on or is a dependency of runs on its own, and the tasks between two such tasks are split again into
+    independent subgraphs, so a task only waits for the tasks it depends on. Subgraphs that can't be split run
+    level by level, a level holds the tasks whose longest path from a source has the same length so it only depends
+    on earlier levels.
+    """
+
+    CREATE_TASKS = "CreateTasks"
+    TASK_COMPLETED = "TaskCompleted"
+    TASK_FAILED = "TaskFailed"
+    PREPARE_SHARDS = "PrepareShards"
+    LAMBDA_TASK_EXECUTOR = "LambdaTaskExecutor"
+
+    def __init__(self, task_graph: object, job_definition: str, job_queues: {JobPriority: str},
+                 functions: {str: str}) -> None:
+        self.__task_graph = task_graph
+        self.__job_definition = job_definition
+        self.__job_queues = job_queues
+        self.__functions = functions
+
+    def __get_components(self) -> [[object]]:
+        """
+        Splits the graph into weakly connected components, each in topological order.
+        """
+        component_of = {}
+        components = []
+        for node in self.__task_graph.topological_order:
+            if node.name in component_of:
+                continue
+            component_of[node.name] = len(components)
+            components.append([])
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                for neighbour in current.parents + current.children:
+                    if neighbour.name not in component_of:
+                        component_of[neighbour.name] = component_of[node.name]
+                        stack.append(neighbour)
+
+        for node in self.__task_graph.topological_order:
+            components[component_of[node.name]].append(node)
+        return components
+
+    @staticmethod
+    def __get_subgraphs(nodes: [object], children: {str: [object]}) -> [[object]]:
+        """
+        Splits tasks into the weakly connected subgraphs they form on their own, each in topological order.
+        """
+        names = {node.name for node in nodes}
+        neighbours = {node.name: [] for node in nodes}
+        for node in nodes:
+            for child in children[node.name]:
+                if child.name in names:
+                    neighbours[node.name].append(child.name)
+                    neighbours[child.name].append(node.name)
+
+        subgraph_of = {}
+        for node in nodes:
+            if node.name in subgraph_of:
+                continue
+            subgraph_of[node.name] = node.name
+            stack = [node.name]
+            while stack:
+                for neighbour in neighbours[stack.pop()]:
+                    if neighbour not in subgraph_of:
+                        subgraph_of[neighbour] = node.name
+                        stack.append(neighbour)
+
+        subgraphs = {}
+        for node in nodes:
+            subgraphs.setdefault(subgraph_of[node.name], []).append(node)
+        return list(subgraphs.values())
+
+    def __get_levels(self, nodes: [object]) -> [[object]]:
+        levels = {}
+        for node in nodes:
+            levels.setdefault(self.__task_graph.get_depth(node.name), []).append(node)
+        return [levels[depth] for depth in sorted(levels)]
+
+    @staticmethod
+    def __get_state_name(node: object, step: str) -> str:
+        # Task names are identifiers, the dot keeps task states apart from every other state.
+        return f"{node.name}.{step}"
+
+    @staticmethod
+    def __get_task_input(node: object, **kwargs) -> dict:
+        return {
+            "task_name": node.name,
+            "flow_id.$": "$.flow_id",
+            "run_id.$": f"$.run_ids.{node.name}",
+            **kwargs
+        }
+
+    def __get_batch_job_state(self, node: object, command: [str], parameters: dict) -> dict:
+        return {
+            "Type": "Task",
+            "Resource": "arn:aws:states:::batch:submitJob.sync",
+            "Parameters": {
+                "JobDefinition": self.__job_definition,
+                "JobQueue": self.__job_queues[node.priority],
+                "JobName": node.name,
+                "Parameters": parameters,
+                "ContainerOverrides": {
+                    "Command": command
+                }
+            },
+            "ResultPath": None
+        }
+
+    def __get_executor_states(self, node: object) -> {str: dict}:
+        command = [
+            "uniflow", "execute", "--task", "Ref::task_name", "--flow-id", "Ref::flow_id", "--run-id", "Ref::run_id"
+        ]
+        if node.task.map_over:
+            shard_state = self.__get_batch_job_state(
+                node,
+                command + ["--shard-index", "Ref::shard_index"],
+                {
+                    "task_name": node.name,
+                    "flow_id.$": "$.flow_id",
+                    "run_id.$": "$.run_id",
+                    "shard_index.$": "$.shard_index"
+                }
+            )
+            return {
+                self.__get_state_name(node, self.PREPARE_SHARDS): {
+                    "Type": "Task",
+                    "Resource": self.__functions[self.PREPARE_SHARDS],
+                    "Parameters": self.__get_task_input(node),
+                    "ResultPath": "$.Shards",
+                    "Next": self.__get_state_name(node, "Run")
+                },
+                self.__get_state_name(node, "Run"): {
+                    "Type": "Map",
+                    "ItemsPath": "$.Shards.shards",
+                    "Parameters": {
+                        "flow_id.$": "$.flow_id",
+                        "run_id.$": f"$.run_ids.{node.name}",
+                        "shard_index.$": "$$.Map.Item.Value"
+                    },
+                    "Iterator": {
+                        "StartAt": self.__get_state_name(node, "RunShard"),
+                        "States": {
+                            self.__get_state_name(node, "RunShard"): {**shard_state, "End": True}
+                        }
+                    },
+                    "ResultPath": None
+                }
+            }
+
+        if node.task.compute == ComputeType.LAMBDA.value:
+            state = {
+                "Type": "Task",
+                "Resource": self.__functions[self.LAMBDA_TASK_EXECUTOR],
+                "Parameters": self.__get_task_input(node),
+                "ResultPath": None
+            }
+        else:
+            state = self.__get_batch_job_state(node, command, self.__get_task_input(node))
+        return {self.__get_state_name(node, "Run"): state}
+
+    def __get_task_states(self, node: object, next_state: str = None) -> (str, {str: dict}):
+        """
+        Returns the name of the first state of the task and its states, the last one moves on to next_state.
+        """
+        executor_states = self.__get_executor_states(node)
+        for state in executor_states.values():
+            state.setdefault("Next", self.__get_state_name(node, self.TASK_COMPLETED))
+            state["Catch"] = [{
+                "ErrorEquals": ["States.ALL"],
+                "ResultPath": "$.Error",
+                "Next": self.__get_state_name(node, self.TASK_FAILED)
+            }]
+
+        completed_state = {
+            "Type": "Task",
+            "Resource": self.__functions[self.TASK_COMPLETED],
+            "Parameters": self.__get_task_input(node),
+            "ResultPath": None
+        }
+        if next_state:
+            completed_state["Next"] = next_state
+        else:
+            completed_state["End"] = True
+
+        states = {
+            **executor_states,
+            self.__get_state_name(node, self.TASK_COMPLETED): completed_state,
+            self.__get_state_name(node, self.TASK_FAILED): {
+                "Type": "Task",
+                "Resource": self.__functions[self.TASK_FAILED],
+                "Parameters": self.__get_task_input(node),
+                "ResultPath": None,
+                "Next": self.__get_state_name(node, "Fail")
+            },
+            self.__get_state_name(node, "Fail"): {
+                "Type": "Fail",
+                "Error": "TaskFailed",
+                "Cause": f"Task {node.name} failed."
+            }
+        }
+        return next(iter(executor_states)), states
+
+    @staticmethod
+    def __get_parallel_state(branches: [(str, {str: dict})], next_state: str = None) -> dict:
+        state = {
+            "Type": "Parallel",
+            "Branches": [{"StartAt": start_at, "States": states} for start_at, states in branches],
+            "ResultPath": None
+        }
+        if next_state:
+            state["Next"] = next_state
+        else:
+            state["End"] = True
+        return state
+
+    def __get_level_states(self, nodes: [object], state_names: Iterator[str],
+                           next_state: str = None) -> (str, {str: dict}):
+        states = {}
+        for level in reversed(self.__get_levels(nodes)):
+            if len(level) == 1:
+                next_state, task_states = self.__get_task_states(level[0], next_state)
+                states.update(task_states)
+                continue
+
+            level_state = self.__get_parallel_state([self.__get_task_states(node) for node in level], next_state)
+            next_state = next(state_names)
+            states[next_state] = level_state
+        return next_state, states
+
+    def __get_subgraph_states(self, nodes: [object], children: {str: [object]}, descendants: {str: {str}},
+                              state_names: Iterator[str], next_state: str = None) -> (str, {str: dict}):
+        subgraphs = self.__get_subgraphs(nodes, children)
+        if len(subgraphs) > 1:
+            branches = [
+                self.__get_subgraph_states(subgraph, children, descendants, state_names) for subgraph in subgraphs
+            ]
+            parallel_state = self.__get_parallel_state(branches, next_state)
+            state_name = next(state_names)
+            return state_name, {state_name: parallel_state}
+
+        # Tasks every other task depends on or is a dependency of split the subgraph into steps run in order.
+        steps = []
+        for node in nodes:
+            if all(
+                other is node or other.name in descendants[node.name] or node.name in descendants[other.name]
+                for other in nodes
+            ):
+                steps.append(node)
+            elif steps and isinstance(steps[-1], list):
+                steps[-1].append(node)
+            else:
+                steps.append([node])
+        if len(steps) == 1 and isinstance(steps[0], list):
+            return self.__get_level_states(nodes, state_names, next_state)
+
+        states = {}
+        for step in reversed(steps):
+            if isinstance(step, list):
+                next_state, step_states = self.__get_subgraph_states(
+                    step, children, descendants, state_names, next_state
+                )
+            else:
+                next_state, step_states = self.__get_task_states(step, next_state)
+            states.update(step_states)
+        return next_state, states
+
+    def __get_component_states(self, index: int, nodes: [object]) -> (str, {str: dict}):
+        # Fused tasks run inside the job of the first task of their chain, which hands over to the children of the
+        # last one.
+        nodes = [node for node in nodes if not node.fused_into]
+        children = {node.name: (node.fused_tasks[-1] if node.fused_tasks else node).children for node in nodes}
+        descendants = {}
+        for node in reversed(nodes):
+            descendants[node.name] = set()
+            for child in children[node.name]:
+                descendants[node.name].update({child.name} | descendants[child.name])
+
+        state_names = (f"Component{index}.Parallel{state_index}" for state_index in count())
+        return self.__get_subgraph_states(nodes, children, descendants, state_names)
+
+    def to_json(self) -> dict:
+        components = self.__get_components()
+        if len(components) == 1:
+            start_at, states = self.__get_component_states(0, components[0])
+        else:
+            branches = []
+            for index, nodes in enumerate(components):
+                component_start_at, component_states = self.__get_component_states(index, nodes)
+                branches.append({"StartAt": component_start_at, "States": component_states})
+            start_at, states = "Flow", {
+                "Flow": {"Type": "Parallel", "Branches": branches, "ResultPath": None, "End": True}
+            }
+
+        return {
+            "StartAt": self.CREATE_TASKS,
+            "States": {
+                self.CREATE_TASKS: {
+                    "Type": "Task",
+                    "Resource": self.__functions[self.CREATE_TASKS],
+                    "Parameters": {
+                        "flow_id.$": "$.flow_id"
+                    },
+                    "ResultPath": "$.run_ids",
+                    "Next": start_at
+                },
+                **states
+            }
+        }
@@ -18,24 +18,42 @@ from pathlib import Path
 
 from uniflow.cdk import LAMBDA_RUNTIME
 from uniflow.docker.batch_container_image import BatchContainerImage
-from ..constants import JobPriority
+from ..constants import ComputeType, JobPriority, LOCAL_CACHE_DIRECTORY, TASK_GRAPH_FILE, LAMBDA_LAYER_DIRECTORY, \
+    STATUS_POLL_INITIAL_SECONDS, STATUS_POLL_MAX_SECONDS, STATUS_POLL_BACKOFF, STREAM_BATCH_SIZE, \
+    STREAM_PARALLELIZATION_FACTOR, STREAM_MAX_CONCURRENCY
 from ..cdk.flow_requirements import FlowRequirements
 from ..cdk.flow_code import FlowCode
+from .flow_definition import FlowDefinition
 
 
 class UniflowStack(core.Stack):
 
-    def __init__(self, scope: core.Construct, id: str, code_dir: Path, flow_name: str, **kwargs) -> None:
+    def __init__(self, scope: core.Construct, id: str, code_dir: Path, flow_name: str, task_graph: object = None,
+                 status_poll_initial_seconds: int = STATUS_POLL_INITIAL_SECONDS,
+                 status_poll_max_seconds: int = STATUS_POLL_MAX_SECONDS, status_poll_backoff: float = STATUS_POLL_BACKOFF,
+                 compile_state_machine: bool = False, stream_batch_size: int = STREAM_BATCH_SIZE,
+                 stream_parallelization_factor: int = STREAM_PARALLELIZATION_FACTOR,
+                 stream_max_concurrency: int = STREAM_MAX_CONCURRENCY, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
         self.__id = id
         self.__code_dir = code_dir
         self.__flow_name = flow_name
+        self.__task_graph = task_graph
+        self.__status_poll_initial_seconds = status_poll_initial_seconds
+        self.__status_poll_max_seconds = status_poll_max_seconds
+        self.__status_poll_backoff = status_poll_backoff
+        self.__compile_state_machine = compile_state_machine
+        self.__stream_batch_size = stream_batch_size
+        self.__stream_parallelization_factor = stream_parallelization_factor
+        self.__stream_max_concurrency = stream_max_concurrency
         self.__vpc = None
         self.__requirements_layer = None
         self.__code_layer = None
         self.__batch_container_image = None
         self.__lambda_functions = []
         self.__batch_job_definitions = {}
+        self.__flow_functions = {}
+        self.__flow_state_machine = None
         self.__task_table = None
         self.__flow_table = None
         self.__rest_api = None
@@ -50,7 +68,11 @@ class UniflowStack(core.Stack):
         self.__create_flow_table()
         self.__create_task_executor_job_definition()
         self.__create_state_machine()
-        self.__add_lambda_to_handle_task_table_events()
+        if self.__compile_state_machine:
+            # Tasks are chained by the flow state machine, task table events are not needed to start them.
+            self.__create_flow_state_machine()
+        else:
+            self.__add_lambda_to_handle_task_table_events()
         self.__add_lambda_to_handle_flow_table_events()
         self.__create_rest_api()
 
@@ -81,7 +103,7 @@ class UniflowStack(core.Stack):
             partition_key=dynamodb_.Attribute(name="TaskName", type=dynamodb_.AttributeType.STRING),
             sort_key=dynamodb_.Attribute(name="RunId", type=dynamodb_.AttributeType.STRING),
             billing_mode=dynamodb_.BillingMode.PAY_PER_REQUEST,
-            stream=dynamodb_.StreamViewType.NEW_IMAGE
+            stream=dynamodb_.StreamViewType.NEW_AND_OLD_IMAGES
         )
 
         self.__task_table.add_local_secondary_index(
@@ -140,6 +162,19 @@ class UniflowStack(core.Stack):
             )
         )
 
+    def __add_stream_event_source_to_lambda_function(self, lambda_function: lambda_.Function,
+                                                     table: dynamodb_.Table) -> None:
+        lambda_function.add_event_source(lambda_event_sources_.DynamoEventSource(
+            table,
+            starting_position=lambda_.StartingPosition.LATEST,
+            batch_size=self.__stream_batch_size,
+            parallelization_factor=self.__stream_parallelization_factor
+        ))
+        # Handlers report the records that failed, so records processed before them are not replayed.
+        for child in lambda_function.node.children:
+            if isinstance(child, lambda_.EventSourceMapping):
+                child.node.default_child.add_property_override("FunctionResponseTypes", ["ReportBatchItemFailures"])
+
     def __add_lambda_to_handle_task_table_events(self) -> None:
         code = f"""
         from uniflow.lambda_handlers import TaskTableEventHandler
@@ -160,14 +195,12 @@ class UniflowStack(core.Stack):
                 "FLOW_NAME": self.__flow_name,
                 "FLOW_TABLE": self.__flow_table.table_name,
                 "TASK_TABLE": self.__task_table.table_name,
-                "TASK_EXECUTATION_STATE_MACHINE_ARN": self.__state_machine.state_machine_arn
+                "TASK_EXECUTATION_STATE_MACHINE_ARN": self.__state_machine.state_machine_arn,
+                "FLOW_STREAM_MAX_CONCURRENCY": str(self.__stream_max_concurrency)
             }
         )
         self.__add_iam_policy_to_lambda_function(lambda_function)
-        lambda_function.add_event_source(lambda_event_sources_.DynamoEventSource(
-            self.__task_table,
-            starting_position=lambda_.StartingPosition.LATEST
-        ))
+        self.__add_stream_event_source_to_lambda_function(lambda_function, self.__task_table)
         self.__lambda_functions.append(lambda_function)
 
     def __add_lambda_to_handle_flow_table_events(self) -> None:
@@ -178,6 +211,16 @@ class UniflowStack(core.Stack):
             handler = FlowTableEventHandler(event, context)
             return handler.execute()
         """
+        environment = {
+            "FLOW_NAME": self.__flow_name,
+            "FLOW_TASK_GRAPH": f"{LAMBDA_LAYER_DIRECTORY}/{TASK_GRAPH_FILE}",
+            "FLOW_TABLE": self.__flow_table.table_name,
+            "TASK_TABLE": self.__task_table.table_name,
+            "TASK_EXECUTATION_STATE_MACHINE_ARN": self.__state_machine.state_machine_arn,
+            "FLOW_STREAM_MAX_CONCURRENCY": str(self.__stream_max_concurrency)
+        }
+        if self.__flow_state_machine:
+            environment["FLOW_STATE_MACHINE_ARN"] = self.__flow_state_machine.ref
         lambda_function = lambda_.Function(
             self,
             f"{self.__id}_FlowTableEventHandler",
@@ -186,18 +229,18 @@ class UniflowStack(core.Stack):
             code=lambda_.InlineCode(textwrap.dedent(code)),
             handler="index.handler",
             timeout=core.Duration.minutes(15),
-            environment={
-                "FLOW_NAME": self.__flow_name,
-                "FLOW_TABLE": self.__flow_table.table_name,
-                "TASK_TABLE": self.__task_table.table_name,
-                "TASK_EXECUTATION_STATE_MACHINE_ARN": self.__state_machine.state_machine_arn
-            }
+            environment=environment
         )
         self.__add_iam_policy_to_lambda_function(lambda_function)
-        lambda_function.add_event_source(lambda_event_sources_.DynamoEventSource(
-            self.__flow_table,
-            starting_position=lambda_.StartingPosition.LATEST
-        ))
+        if self.__flow_state_machine:
+            lambda_function.role.add_to_policy(
+                iam_.PolicyStatement(
+                    effect=iam_.Effect.ALLOW,
+                    resources=[self.__flow_state_machine.ref],
+                    actions=['states:StartExecution']
+                )
+            )
+        self.__add_stream_event_source_to_lambda_function(lambda_function, self.__flow_table)
         self.__lambda_functions.append(lambda_function)
 
     def __create_rest_api(self) -> None:
@@ -219,6 +262,8 @@ class UniflowStack(core.Stack):
                 "FLOW_NAME": self.__flow_name,
                 "FLOW_TABLE": self.__flow_table.table_name,
                 "TASK_TABLE": self.__task_table.table_name,
+                # Flow timelines combine the task items with the task graph.
+                "FLOW_TASK_GRAPH": f"{LAMBDA_LAYER_DIRECTORY}/{TASK_GRAPH_FILE}",
             }
         )
         self.__add_iam_policy_to_lambda_function(lambda_function)
@@ -235,9 +280,17 @@ class UniflowStack(core.Stack):
             image=container_image,
             memory_limit_mib=1024*2,
             job_role=self.__job_definition_role,
+            volumes=[
+                # Shared by every task container on the host so sibling tasks reuse downloaded parent outputs.
+                ecs_.Volume(name="LocalCache", host=ecs_.Host(source_path=LOCAL_CACHE_DIRECTORY))
+            ],
+            mount_points=[
+                ecs_.MountPoint(container_path=LOCAL_CACHE_DIRECTORY, source_volume="LocalCache", read_only=False)
+            ],
             environment={
                 "FLOW": self.__flow_name,
                 "FLOW_DATASTORE": self.__datastore.bucket_name,
+                "FLOW_LOCAL_CACHE_DIRECTORY": LOCAL_CACHE_DIRECTORY,
                 "FLOW_TABLE": self.__flow_table.table_name,
                 "TASK_TABLE": self.__task_table.table_name,
                 "AWS_REGION": self.region
@@ -266,7 +319,7 @@ class UniflowStack(core.Stack):
         self.__code_layer = lambda_.LayerVersion(
             self,
             "code",
-            code=FlowCode(self.code_dir)
+            code=FlowCode(self.code_dir, task_graph=self.__task_graph)
         )
 
     def __create_batch_container_image(self):
@@ -277,7 +330,13 @@ class UniflowStack(core.Stack):
         self.__vpc = ec2_.Vpc(self, f"{self.__id}Vpc", max_azs=3)
 
     def __create_datastore_bucket(self):
-        self.__datastore = s3_.Bucket(self, f"{self.__id}_FlowDatastore",)
+        self.__datastore = s3_.Bucket(
+            self,
+            f"{self.__id}_FlowDatastore",
+            lifecycle_rules=[
+                s3_.LifecycleRule(abort_incomplete_multipart_upload_after=core.Duration.days(1))
+            ]
+        )
 
     def __create_batch_infrastructure(self):
         self.__compute_resources = batch_.ComputeResources(
@@ -328,6 +387,12 @@ class UniflowStack(core.Stack):
             priority=JobPriority.LOW.value
         )
 
+        self.__job_queues = {
+            JobPriority.HIGH: self.__high_priority_job_queue,
+            JobPriority.MEDIUM: self.__medium_priority_job_queue,
+            JobPriority.LOW: self.__low_priority_job_queue
+        }
+
         self.__ecr_repository = ecr_.Repository.from_repository_arn(
             self,
             f"{self.__id}_BatchImageRepository",
@@ -340,7 +405,8 @@ class UniflowStack(core.Stack):
         
         def handler(event, context):
             task = TaskModel.get_from_sfn_input(event)
-            return task.get_status()
+            attempt = event.get("TaskStatus", {{}}).get("Payload", {{}}).get("attempt", 0)
+            return task.get_status(attempt)
         """
         lambda_function = lambda_.Function(
             self,
@@ -353,7 +419,10 @@ class UniflowStack(core.Stack):
             environment={
                 "FLOW_NAME": self.__flow_name,
                 "FLOW_TABLE": self.__flow_table.table_name,
-                "TASK_TABLE": self.__task_table.table_name
+                "TASK_TABLE": self.__task_table.table_name,
+                "FLOW_STATUS_POLL_INITIAL_SECONDS": str(self.__status_poll_initial_seconds),
+                "FLOW_STATUS_POLL_MAX_SECONDS": str(self.__status_poll_max_seconds),
+                "FLOW_STATUS_POLL_BACKOFF": str(self.__status_poll_backoff)
             }
         )
         self.__lambda_functions.append(lambda_function)
@@ -366,39 +435,197 @@ class UniflowStack(core.Stack):
             result_path="$.TaskStatus"
         )
 
+    def __create_batch_submit_job_steps(self, name: str, job_name: str, payload: dict, command: [str],
+                                        **kwargs) -> (sfn_.Choice, [sfn_tasks_.BatchSubmitJob]):
+        """
+        Creates one submit job step per job queue and a choice that picks the step from the priority of the task.
+        """
+        steps = {}
+        for priority, job_queue in self.__job_queues.items():
+            steps[priority] = sfn_tasks_.BatchSubmitJob(
+                self,
+                f"{self.__id}{name}{priority.name.title()}",
+                job_definition=self.__batch_job_definitions[f"{self.__id}_BatchTaskExecutorJobDef"],
+                job_queue=job_queue,
+                job_name=job_name,
+                payload=sfn_.TaskInput.from_object(payload),
+                container_overrides=sfn_tasks_.BatchContainerOverrides(command=command),
+                **kwargs
+            )
+
+        choice = sfn_.Choice(
+            self,
+            f"{self.__id}Select{name}Queue"
+        ).when(
+            sfn_.Condition.string_equals('$.priority', JobPriority.MEDIUM.name),
+            steps[JobPriority.MEDIUM]
+        ).when(
+            sfn_.Condition.string_equals('$.priority', JobPriority.LOW.name),
+            steps[JobPriority.LOW]
+        ).otherwise(
+            steps[JobPriority.HIGH]
+        )
+        return choice, list(steps.values())
+
     def __create_task_executor_step(self) -> sfn_.Task:
-        self.__task_executor_step = sfn_tasks_.BatchSubmitJob(
+        # Exposes the priority at the top level of the state so the map iterator can select the queue the same way.
+        select_priority_step = sfn_.Pass(
+            self,
+            f"{self.__id}SelectTaskPriority",
+            input_path="$.TaskStatus.Payload.priority",
+            result_path="$.priority"
+        )
+        choice, steps = self.__create_batch_submit_job_steps(
+            "SubmitBatchJob",
+            "TaskExecutor",
+            {
+                "task_name.$": "$.task_name",
+                "run_id.$": "$.run_id",
+                "flow_id.$": "$.flow_id"
+            },
+            ["uniflow", "execute", "--task", "Ref::task_name", "--flow-id", "Ref::flow_id",  "--run-id", "Ref::run_id"],
+            result_path="$.TaskExecutionResult"
+        )
+        for step in steps:
+            step.next(self.__task_completed_step)
+        self.__task_executor_step = select_priority_step.next(choice)
+
+    def __create_lambda_task_executor_step(self) -> None:
+        code = f"""
+        from uniflow.lambda_handlers import TaskExecutorHandler
+        
+        def handler(event, context):
+            handler = TaskExecutorHandler(event, context)
+            return handler.execute()
+        """
+        lambda_function = lambda_.Function(
             self,
-            f"{self.__id}SubmitBatchJob",
-            job_definition=self.__batch_job_definitions[f"{self.__id}_BatchTaskExecutorJobDef"],
-            job_queue=self.__high_priority_job_queue,
-            job_name="TaskExecutor",
+            f"{self.__id}_LambdaTaskExecutor",
+            layers=[self.__requirements_layer, self.__code_layer],
+            runtime=LAMBDA_RUNTIME,
+            code=lambda_.InlineCode(textwrap.dedent(code)),
+            handler="index.handler",
+            timeout=core.Duration.minutes(15),
+            memory_size=1024*2,
+            environment={
+                "FLOW": self.__flow_name,
+                "FLOW_DATASTORE": self.__datastore.bucket_name,
+                # Lambda has no host volume shared between invocations.
+                "FLOW_LOCAL_CACHE_MAX_BYTES": "0",
+                "FLOW_TABLE": self.__flow_table.table_name,
+                "TASK_TABLE": self.__task_table.table_name
+            }
+        )
+        self.__lambda_functions.append(lambda_function)
+        self.__add_ddb_policy_to_lambda_function(lambda_function)
+        self.__datastore.grant_read_write(lambda_function)
+        self.__flow_functions[FlowDefinition.LAMBDA_TASK_EXECUTOR] = lambda_function
+
+        self.__lambda_task_executor_step = sfn_tasks_.LambdaInvoke(
+            self,
+            f"{self.__id}InvokeLambdaTaskExecutor",
+            lambda_function=lambda_function,
             payload=sfn_.TaskInput.from_object({
                 "task_name.$": "$.task_name",
                 "run_id.$": "$.run_id",
                 "flow_id.$": "$.flow_id"
             }),
-            container_overrides=sfn_tasks_.BatchContainerOverrides(
-                command=["uniflow", "execute", "--task", "Ref::task_name", "--flow-id", "Ref::flow_id",  "--run-id", "Ref::run_id"]
-            ),
             result_path="$.TaskExecutionResult"
         ).next(
             self.__task_completed_step
         )
 
+    def __create_map_task_executor_step(self) -> None:
+        code = f"""
+        from uniflow.models.task_model import TaskModel
+        
+        def handler(event, context):
+            task = TaskModel.get_from_sfn_input(event)
+            return task.prepare_shards()
+        """
+        lambda_function = lambda_.Function(
+            self,
+            f"{self.__id}_PrepareShards",
+            layers=[self.__requirements_layer, self.__code_layer],
+            runtime=LAMBDA_RUNTIME,
+            code=lambda_.InlineCode(textwrap.dedent(code)),
+            handler="index.handler",
+            timeout=core.Duration.minutes(15),
+            environment={
+                "FLOW_NAME": self.__flow_name,
+                "FLOW_TABLE": self.__flow_table.table_name,
+                "TASK_TABLE": self.__task_table.table_name
+            }
+        )
+        self.__lambda_functions.append(lambda_function)
+        self.__add_ddb_policy_to_lambda_function(lambda_function)
+        self.__flow_functions[FlowDefinition.PREPARE_SHARDS] = lambda_function
+
+        prepare_shards_step = sfn_tasks_.LambdaInvoke(
+            self,
+            f"{self.__id}PrepareShards",
+            lambda_function=lambda_function,
+            result_path="$.Shards"
+        )
+
+        shard_executor_step, _ = self.__create_batch_submit_job_steps(
+            "SubmitBatchShardJob",
+            "TaskShardExecutor",
+            {
+                "task_name.$": "$.task_name",
+                "run_id.$": "$.run_id",
+                "flow_id.$": "$.flow_id",
+                "shard_index.$": "$.shard_index"
+            },
+            [
+                "uniflow", "execute", "--task", "Ref::task_name", "--flow-id", "Ref::flow_id",
+                "--run-id", "Ref::run_id", "--shard-index", "Ref::shard_index"
+            ],
+            result_path="$.TaskExecutionResult",
+            # Keep the map output small, it holds one entry per shard.
+            output_path="$.shard_index"
+        )
+
+        map_step = sfn_.Map(
+            self,
+            f"{self.__id}MapTaskShards",
+            items_path="$.Shards.Payload.shards",
+            parameters={
+                "task_name.$": "$.task_name",
+                "run_id.$": "$.run_id",
+                "flow_id.$": "$.flow_id",
+                "shard_index.$": "$$.Map.Item.Value",
+                "priority.$": "$.TaskStatus.Payload.priority"
+            },
+            result_path="$.TaskExecutionResult"
+        ).iterator(shard_executor_step)
+
+        self.__map_task_executor_step = prepare_shards_step.next(map_step).next(self.__task_completed_step)
+
     def __create_check_task_status_step(self) -> None:
         self.__check_task_status_step = sfn_.Choice(
             self,
             f"{self.__id}CheckTaskParentStatus"
         ).when(
             sfn_.Condition.string_equals('$.TaskStatus.Payload.parent_status', 'COMPLETED'),
-            self.__task_executor_step
+            sfn_.Choice(
+                self,
+                f"{self.__id}CheckTaskExecutor"
+            ).when(
+                sfn_.Condition.boolean_equals('$.TaskStatus.Payload.is_map', True),
+                self.__map_task_executor_step
+            ).when(
+                sfn_.Condition.string_equals('$.TaskStatus.Payload.compute', ComputeType.LAMBDA.value),
+                self.__lambda_task_executor_step
+            ).otherwise(
+                self.__task_executor_step
+            )
         ).when(
             sfn_.Condition.string_equals('$.TaskStatus.Payload.parent_status', 'PENDING'),
             sfn_.Wait(
                 self,
                 f"{self.__id}WaitForParentTasksToComplete",
-                time=sfn_.WaitTime.duration(core.Duration.minutes(1))
+                time=sfn_.WaitTime.seconds_path('$.TaskStatus.Payload.wait_seconds')
             ).next(
                 self.__get_task_status_step
             )
@@ -431,6 +658,7 @@ class UniflowStack(core.Stack):
         )
         self.__lambda_functions.append(lambda_function)
         self.__add_ddb_policy_to_lambda_function(lambda_function)
+        self.__flow_functions[FlowDefinition.TASK_COMPLETED] = lambda_function
 
         self.__task_completed_step = sfn_tasks_.LambdaInvoke(
             self,
@@ -464,6 +692,7 @@ class UniflowStack(core.Stack):
         )
         self.__lambda_functions.append(lambda_function)
         self.__add_ddb_policy_to_lambda_function(lambda_function)
+        self.__flow_functions[FlowDefinition.TASK_FAILED] = lambda_function
 
         self.__task_failed_step = sfn_tasks_.LambdaInvoke(
             self,
@@ -477,6 +706,8 @@ class UniflowStack(core.Stack):
         self.__create_task_completed_step()
         self.__create_task_failed_step()
         self.__create_task_executor_step()
+        self.__create_lambda_task_executor_step()
+        self.__create_map_task_executor_step()
         self.__create_check_task_status_step()
 
         definition = self.__get_task_status_step\
@@ -488,3 +719,79 @@ class UniflowStack(core.Stack):
             definition=definition,
             timeout=core.Duration.hours(24)
         )
+
+    def __create_create_tasks_function(self) -> None:
+        code = f"""
+        import os
+        from uniflow.core.unigraph import Unigraph
+        from uniflow.models.task_model import TaskModel
+        
+        TASK_GRAPH = Unigraph.load(os.environ["FLOW_TASK_GRAPH"])
+        
+        def handler(event, context):
+            tasks = TaskModel.create_tasks_for_flow(event["flow_id"], TASK_GRAPH)
+            return {{task.task_name: task.run_id for task in tasks}}
+        """
+        lambda_function = lambda_.Function(
+            self,
+            f"{self.__id}_CreateTasks",
+            layers=[self.__requirements_layer, self.__code_layer],
+            runtime=LAMBDA_RUNTIME,
+            code=lambda_.InlineCode(textwrap.dedent(code)),
+            handler="index.handler",
+            timeout=core.Duration.minutes(15),
+            environment={
+                "FLOW_NAME": self.__flow_name,
+                "FLOW_TASK_GRAPH": f"{LAMBDA_LAYER_DIRECTORY}/{TASK_GRAPH_FILE}",
+                "FLOW_TABLE": self.__flow_table.table_name,
+                "TASK_TABLE": self.__task_table.table_name
+            }
+        )
+        self.__lambda_functions.append(lambda_function)
+        self.__add_ddb_policy_to_lambda_function(lambda_function)
+        self.__flow_functions[FlowDefinition.CREATE_TASKS] = lambda_function
+
+    def __create_flow_state_machine(self) -> None:
+        """
+        Compiles the task graph into one state machine per flow, a flow run is then a single execution.
+        """
+        self.__create_create_tasks_function()
+
+        role = iam_.Role(
+            self,
+            f"{self.__id}_FlowStateMachineRole",
+            assumed_by=iam_.ServicePrincipal("states.amazonaws.com")
+        )
+        for lambda_function in self.__flow_functions.values():
+            lambda_function.grant_invoke(role)
+        role.add_to_policy(
+            iam_.PolicyStatement(
+                effect=iam_.Effect.ALLOW,
+                resources=["*"],
+                actions=["batch:SubmitJob", "batch:DescribeJobs", "batch:TerminateJob"]
+            )
+        )
+        # submitJob.sync waits for the job through a rule managed by Step Functions.
+        role.add_to_policy(
+            iam_.PolicyStatement(
+                effect=iam_.Effect.ALLOW,
+                resources=[
+                    f"arn:aws:events:{self.region}:{self.account}:rule/StepFunctionsGetEventsForBatchJobsRule"
+                ],
+                actions=["events:PutTargets", "events:PutRule", "events:DescribeRule"]
+            )
+        )
+
+        flow_definition = FlowDefinition(
+            self.__task_graph,
+            self.__batch_job_definitions[f"{self.__id}_BatchTaskExecutorJobDef"].job_definition_arn,
+            {priority: job_queue.job_queue_arn for priority, job_queue in self.__job_queues.items()},
+            {name: lambda_function.function_arn for name, lambda_function in self.__flow_functions.items()}
+        )
+        self.__flow_state_machine = sfn_.CfnStateMachine(
+            self,
+            f"{self.__id}FlowStateMachine",
+            role_arn=role.role_arn,
+            definition_string=self.to_json_string(flow_definition.to_json())
+        )
+        self.__flow_state_machine.node.add_dependency(role)
@@ -1,20 +1,10 @@
-import inspect
 import importlib
 import __main__
 
+from collections.abc import Mapping
 from pathlib import Path
 
 
-def get_methods_with_decorator(cls, decorator_name):
-    source_lines = inspect.getsourcelines(cls)[0]
-    for i, line in enumerate(source_lines):
-        line = line.strip()
-        if line.split('(')[0].strip() == '@' + decorator_name:  # leaving a bit out
-            next_line = source_lines[i+1]
-            name = next_line.split('def')[1].split('(')[0].strip()
-            yield(name)
-
-
 def get_python_path(o):
     # o.__module__ + "." + o.__class__.__qualname__ is an example in
     # this context of H.L. Mencken's "neat, plausible, and wrong."
@@ -37,3 +27,15 @@ def get_flow_class_from_flow(flow):
     module_name, class_name = flow.rsplit(".", 1)
     flow_module = importlib.import_module(module_name)
     return getattr(flow_module, class_name)
+
+
+def get_mapped_over_length(task_name: str, output: object) -> int:
+    """
+    Number of shards of the map tasks mapping over the output of a task. Shards index the output by position, so
+    it must be a sized sequence, mappings would be indexed by key.
+    """
+    if isinstance(output, Mapping) or not hasattr(output, '__len__') or not hasattr(output, '__getitem__'):
+        raise TypeError(
+            f"Task {task_name} is mapped over and must return a sized sequence, got {type(output).__name__}."
+        )
+    return len(output)